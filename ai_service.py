@@ -0,0 +1,429 @@
+"""Shared AI service for many concurrent games.
+
+Games submit position-plus-budget requests to one AIService: best move,
+Monte Carlo playouts or static evaluation. A dispatcher thread groups
+queued requests into batches and hands each batch to one process of a
+pool. The pool size caps the CPU the AI uses however many games are
+running, and a busy pool gets bigger batches with less IPC per request.
+
+The workers share:
+- one TranspositionTable in a multiprocessing.shared_memory block, so a
+  position searched for one game is not searched again for another;
+- the opening book and endgame tablebases, memory-mapped from the same
+  files, so their pages sit in the page cache once.
+
+Every request has a time budget. Requests that are still waiting when it
+runs out fail with TimeoutError. A search that runs out returns its
+deepest finished iteration, and playouts return the games played so far.
+Large playout requests are split across workers. metrics() reports queue
+depth, batch sizes and latency percentiles.
+
+Run on its own, the module load-tests the service with simulated games
+that each ask for their moves in turn and prints the metrics as JSON.
+
+Usage:
+    python ai_service.py                                   # 32 games, medium, 4 workers
+    python ai_service.py --games 64 --difficulty hard --budget 1.0 --playouts 200
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+from checkers import (AI_DEPTHS, RED, TT_ENTRIES, WHITE, Board, Game, SearchStats, TranspositionTable,
+                      square_index)
+
+DEFAULT_BATCH_SIZE = 16  # Most requests handed to a worker at once
+PLAYOUT_CHUNK = 50  # Playout requests are split into pieces of this many games
+LATENCY_WINDOW = 1000  # Latest requests kept for the latency percentiles
+EXPIRED = "expired"  # Worker result of a request whose deadline passed before it started
+
+_game = None
+_table_memory = None
+
+
+def _init_worker(memory_name, entries):
+    """Pool initializer: attach the shared transposition table"""
+    global _game, _table_memory
+    _table_memory = shared_memory.SharedMemory(name=memory_name)
+    _game = Game(None)  # Used for its move generator, search and playouts
+    _game.transposition_table = TranspositionTable(entries, _table_memory.buf)
+
+
+def _best_move(board, turn, depth, deadline):
+    game = _game
+    game.board, game.turn = board, turn
+    game.search_stats = stats = SearchStats(depth)
+
+    book_move = game.book_move()
+    if book_move:
+        piece, move = book_move
+        return {"move": (square_index(piece.row, piece.col), square_index(*move)), "score": None,
+                "depth": 0, "book": True, "nodes": 0, "tt_hits": 0, "tt_probes": 0}
+
+    score, best_move, reached = game.search(board, depth, turn == RED, deadline)
+    move = None
+    if best_move:
+        piece, target = best_move
+        move = (square_index(piece.row, piece.col), square_index(*target))
+    return {"move": move, "score": score, "depth": reached, "book": False, "nodes": stats.nodes,
+            "tt_hits": stats.tt_hits, "tt_probes": stats.tt_probes}
+
+
+def _playouts(board, turn, count, deadline):
+    results = {"RED": 0, "WHITE": 0, "DRAW": 0}
+    for _ in range(count):
+        if time.perf_counter() > deadline:
+            break
+        results[_game._run_playout(board.copy(), turn)] += 1
+    return results
+
+
+def _run_batch(batch, sent):
+    """Worker entry point: run (kind, bitboards, turn, argument, budget) requests in order
+
+    Budgets count from sent, the time.time() the batch was handed to the
+    pool. Returns one (ok, result or error message) per request.
+    """
+    start = time.perf_counter() - max(0.0, time.time() - sent)
+    results = []
+    for kind, bitboards, turn, argument, budget in batch:
+        deadline = start + budget
+        if time.perf_counter() > deadline:
+            results.append((False, EXPIRED))
+            continue
+        try:
+            board = Board.from_bitboards(bitboards)
+            if kind == "move":
+                results.append((True, _best_move(board, turn, argument, deadline)))
+            elif kind == "playouts":
+                results.append((True, _playouts(board, turn, argument, deadline)))
+            else:
+                results.append((True, board.evaluate() if turn == RED else -board.evaluate()))
+        except Exception as e:
+            results.append((False, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list of numbers"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class AIService:
+    """Process pool behind a request queue, shared by every game that needs the AI
+
+    Requests return concurrent.futures.Future objects; asyncio code can
+    await them through asyncio.wrap_future.
+    """
+
+    def __init__(self, workers=None, batch_size=DEFAULT_BATCH_SIZE, tt_entries=TT_ENTRIES):
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.table_memory = shared_memory.SharedMemory(create=True, size=TranspositionTable.size(tt_entries))
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(self.table_memory.name, tt_entries))
+        self.requests = queue.Queue()
+        self.slots = threading.Semaphore(self.workers)  # One batch in flight per worker
+        self.lock = threading.Lock()
+        self.counters = {"submitted": 0, "completed": 0, "expired": 0, "failed": 0, "batches": 0,
+                         "book_moves": 0, "nodes": 0, "tt_hits": 0, "tt_probes": 0}
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def best_move(self, bitboards, turn, depth, budget):
+        """Future of the search result for turn: {"move": (from, to) or None, "score", "depth", "book", "nodes"}"""
+        return self._submit("move", bitboards, turn, depth, budget)
+
+    def playouts(self, bitboards, turn, count, budget):
+        """Future of the {"RED", "WHITE", "DRAW"} results of up to count random playouts"""
+        parts = [self._submit("playouts", bitboards, turn, min(PLAYOUT_CHUNK, count - start), budget)
+                 for start in range(0, count, PLAYOUT_CHUNK)]
+        return self._combine(parts)
+
+    def evaluate(self, bitboards, turn=RED):
+        """Future of Board.evaluate for the position, from turn's point of view"""
+        return self._submit("evaluate", bitboards, turn, None, float("inf"))
+
+    def metrics(self):
+        """Queue, batching, search and latency figures as a JSON-serialisable dict"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            counters = dict(self.counters)
+            in_flight = self.in_flight
+        batched = counters["completed"] + counters["failed"]
+        return {
+            "workers": self.workers,
+            "queue_depth": self.requests.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": in_flight,
+            **counters,
+            "mean_batch_size": round(batched / counters["batches"], 2) if counters["batches"] else 0.0,
+            "tt_hit_rate": round(counters["tt_hits"] / counters["tt_probes"], 4) if counters["tt_probes"] else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p95": round(percentile(latencies, 95) * 1000, 2),
+                "p99": round(percentile(latencies, 99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+    def close(self):
+        """Stop taking requests, wait for the workers and free the shared table"""
+        self.requests.put(None)
+        self.dispatcher.join()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.table_memory.close()
+        self.table_memory.unlink()
+
+    def _submit(self, kind, bitboards, turn, argument, budget):
+        future = Future()
+        now = time.perf_counter()
+        self.requests.put((kind, bitboards, turn, argument, now + budget, now, future))
+        with self.lock:
+            self.counters["submitted"] += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.requests.qsize())
+        return future
+
+    def _combine(self, parts):
+        """One future that sums the playout results of several"""
+        combined = Future()
+        totals = {"RED": 0, "WHITE": 0, "DRAW": 0}
+        state = {"remaining": len(parts), "error": None, "succeeded": False}
+        lock = threading.Lock()
+
+        def part_done(part):
+            with lock:
+                error = CancelledError() if part.cancelled() else part.exception()
+                if error is None:
+                    for result, count in part.result().items():
+                        totals[result] += count
+                    state["succeeded"] = True
+                else:
+                    state["error"] = error
+                state["remaining"] -= 1
+                if state["remaining"]:
+                    return
+            if not combined.set_running_or_notify_cancel():
+                return
+            if state["succeeded"]:
+                combined.set_result(totals)
+            else:
+                combined.set_exception(state["error"])
+
+        def combined_done(combined):
+            # Cancelling the caller's future drops the chunks still queued
+            if combined.cancelled():
+                for part in parts:
+                    part.cancel()
+
+        for part in parts:
+            part.add_done_callback(part_done)
+        combined.add_done_callback(combined_done)
+        return combined
+
+    def _dispatch(self):
+        """Dispatcher loop: wait for a free worker, then send it its share of the queued requests
+
+        A batch holds at most one search, run after the cheaper requests
+        with it, because a search may use its whole budget.
+        """
+        held = None  # A search that did not fit in the previous batch
+        while True:
+            request = held if held is not None else self.requests.get()
+            held = None
+            if request is None:
+                return
+            self.slots.acquire()  # Requests queue up meanwhile and join this batch
+            batch = [request]
+            has_search = request[0] == "move"
+            share = min(self.batch_size, -(-(self.requests.qsize() + 1) // self.workers))
+            while len(batch) < share:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)  # Stop after this batch
+                    break
+                if request[0] == "move" and has_search:
+                    held = request
+                    break
+                has_search = has_search or request[0] == "move"
+                batch.append(request)
+            batch.sort(key=lambda request: request[0] == "move")
+
+            now = time.perf_counter()
+            live = []
+            for request in batch:
+                if not request[6].set_running_or_notify_cancel():
+                    continue  # Cancelled by the caller while queued
+                if request[4] <= now:
+                    self._fail(request, TimeoutError("Deadline passed before the request was started"), "expired")
+                else:
+                    live.append(request)
+            if not live:
+                self.slots.release()
+                continue
+
+            work = [(kind, bitboards, turn, argument, deadline - now)
+                    for kind, bitboards, turn, argument, deadline, _, _ in live]
+            with self.lock:
+                self.counters["batches"] += 1
+                self.in_flight += len(live)
+            try:
+                batch_future = self.pool.submit(_run_batch, work, time.time())
+            except RuntimeError as e:  # The pool has been shut down
+                self.slots.release()
+                with self.lock:
+                    self.in_flight -= len(live)
+                for request in live:
+                    self._fail(request, e, "failed")
+                continue
+            batch_future.add_done_callback(lambda done, live=live: self._finish(live, done))
+
+    def _finish(self, live, done):
+        """Hand the results of a finished batch to the futures of its requests"""
+        self.slots.release()
+        now = time.perf_counter()
+        try:
+            results = done.result()
+        except Exception as e:  # The worker process died
+            results = [(False, f"{type(e).__name__}: {e}")] * len(live)
+
+        with self.lock:
+            self.in_flight -= len(live)
+        for request, (ok, value) in zip(live, results):
+            if not ok:
+                if value == EXPIRED:
+                    self._fail(request, TimeoutError("Deadline passed before the request was started"), "expired")
+                else:
+                    self._fail(request, RuntimeError(value), "failed")
+                continue
+            with self.lock:
+                self.counters["completed"] += 1
+                self.latencies.append(now - request[5])
+                if request[0] == "move":
+                    self.counters["book_moves"] += value["book"]
+                    for name in ("nodes", "tt_hits", "tt_probes"):
+                        self.counters[name] += value[name]
+            request[6].set_result(value)
+
+    def _fail(self, request, error, counter):
+        with self.lock:
+            self.counters[counter] += 1
+        request[6].set_exception(error)
+
+
+def play_game(service, index, moves, depth, budget, playouts, seed, results):
+    """One simulated game: both sides ask the service for every move; fills results[index]"""
+    results[index] = result_counts = {"moves": 0, "timeouts": 0, "latencies": []}
+    rules = Game(None)
+    rng = random.Random(seed + index)
+    board = Board()
+    turn = RED
+
+    for ply in range(moves):
+        options = [(piece, move, skipped) for piece in board.get_all_pieces(turn)
+                   for move, skipped in rules._get_valid_moves_for_simulation(board, piece).items()]
+        if not options:
+            break
+
+        start = time.perf_counter()
+        move_future = service.best_move(board.bitboards(), turn, depth, budget)
+        playout_future = service.playouts(board.bitboards(), turn, playouts, budget) if playouts else None
+        try:
+            result = move_future.result()
+            if playout_future:
+                playout_future.result()
+        except TimeoutError:
+            result_counts["timeouts"] += 1
+            result = {"move": None}
+        result_counts["latencies"].append(time.perf_counter() - start)
+
+        # A few random opening moves keep the games apart
+        chosen = None
+        if ply >= 2 and result["move"]:
+            chosen = next((option for option in options
+                           if (square_index(option[0].row, option[0].col), square_index(*option[1])) == result["move"]),
+                          None)
+        piece, move, skipped = chosen or rng.choice(options)
+        board.move(piece, *move)
+        if skipped:
+            board.remove(skipped)
+        turn = WHITE if turn == RED else RED
+        result_counts["moves"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the shared AI service with simulated games")
+    parser.add_argument("--workers", type=int, default=4, help="AI worker processes")
+    parser.add_argument("--games", type=int, default=32, help="games asking for moves at the same time")
+    parser.add_argument("--moves", type=int, default=12, help="plies played in each game")
+    parser.add_argument("--difficulty", choices=list(AI_DEPTHS), default="medium", help="search depth to ask for")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds each request may take")
+    parser.add_argument("--playouts", type=int, default=0, help="Monte Carlo playouts requested with every move")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="most requests per worker batch")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for the opening moves")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = [None] * args.games
+    with AIService(args.workers, args.batch_size) as service:
+        threads = [threading.Thread(target=play_game, args=(service, index, args.moves, AI_DEPTHS[args.difficulty],
+                                                             args.budget, args.playouts, args.seed, results))
+                   for index in range(args.games)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        metrics = service.metrics()
+
+    moves = sum(result["moves"] for result in results)
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    report = {
+        "games": args.games,
+        "difficulty": args.difficulty,
+        "budget_sec": args.budget,
+        "moves": moves,
+        "moves_per_sec": round(moves / elapsed, 1),
+        "timeouts": sum(result["timeouts"] for result in results),
+        "move_latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+        "service": metrics,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
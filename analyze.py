@@ -0,0 +1,251 @@
+"""Batch position analysis for AI Checkers Master.
+
+Reads positions from text files and scores each one on a pool of worker
+processes: static evaluation, a minimax search (score, best move, depth
+reached) and Monte Carlo win probabilities. Results are written to a JSON
+Lines file as they come in.
+
+Input lines (blank lines and lines starting with # are skipped):
+
+    <32 squares> <r|w> [id]        one position
+    game [id] <from-to> ...        every position of a game from the start
+
+Squares are listed in square_index order (row by row from the top, dark
+squares only) as r/w for men, R/W for kings and . for empty; r or w says
+who is to move. Game moves and best moves use the same 0-31 square
+numbers, e.g. "21-17". Positions without an id are named file:line (and
+file:line:ply for game positions).
+
+Scores are from red's point of view. A position the search finds decided
+(the side to move is stuck, or loses by force within the depth) has no
+score: "score" is null and "result" is "win" or "loss" for red.
+
+Input is streamed: at most --max-in-flight chunks are queued for the
+workers at a time, so memory stays flat however large the input. The
+output doubles as the checkpoint. Run the same command again after an
+interruption and positions already in the output are skipped; a line cut
+short by a crash is dropped.
+
+Usage:
+    python analyze.py positions.txt --output analysis.jsonl
+    python analyze.py games/*.txt --output analysis.jsonl --depth 6 --playouts 200 --workers 8
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+from checkers import (AI_DEPTHS, RED, WHITE, Board, Game, SearchStats, TranspositionTable, square_coords,
+                      square_index)
+
+PIECE_SYMBOLS = {(RED, False): "r", (RED, True): "R", (WHITE, False): "w", (WHITE, True): "W"}
+SYMBOL_PIECES = {symbol: piece for piece, symbol in PIECE_SYMBOLS.items()}
+WORKER_TT_ENTRIES = 1 << 18  # Transposition table entries per worker, kept between positions
+PROGRESS_SECONDS = 10  # Seconds between progress lines
+
+_game = None
+
+
+def parse_position(squares, side):
+    """(board, turn) of a 32-square position string and r/w side to move"""
+    if len(squares) != 32 or side not in ("r", "w"):
+        raise ValueError("a position is 32 squares of r/R/w/W/. and r or w to move")
+    pieces = []
+    for index, symbol in enumerate(squares):
+        if symbol != ".":
+            if symbol not in SYMBOL_PIECES:
+                raise ValueError(f"unknown square symbol {symbol!r}")
+            color, king = SYMBOL_PIECES[symbol]
+            pieces.append((*square_coords(index), color, king))
+    return Board.from_pieces(pieces), RED if side == "r" else WHITE
+
+
+def position_text(board, turn):
+    """The 32-square string and side to move of a position, as parse_position reads them"""
+    squares = ["."] * 32
+    for color in (RED, WHITE):
+        for piece in board.get_all_pieces(color):
+            squares[square_index(piece.row, piece.col)] = PIECE_SYMBOLS[(color, piece.king)]
+    return "".join(squares), "r" if turn == RED else "w"
+
+
+def game_positions(rules, moves):
+    """Yield (board, turn) before each move of a game, then the final position"""
+    board, turn = Board(), RED
+    for move in moves:
+        yield board, turn
+        start, end = (int(square) for square in move.split("-"))
+        piece = board.get_piece(*square_coords(start))
+        target = square_coords(end)
+        legal = rules._get_valid_moves_for_simulation(board, piece) if piece and piece.color == turn else {}
+        if target not in legal:
+            raise ValueError(f"illegal move {move}")
+        board = board.copy()
+        piece = board.get_piece(*square_coords(start))
+        board.move(piece, *target)
+        if legal[target]:
+            board.remove([board.get_piece(skipped.row, skipped.col) for skipped in legal[target]])
+        turn = WHITE if turn == RED else RED
+    yield board, turn
+
+
+def read_positions(paths):
+    """Yield (id, squares, side) for every position in the input files, reading them lazily"""
+    rules = Game(None)  # Used only for its move generator
+    for path in paths:
+        with open(path) as f:
+            for line_number, line in enumerate(f, 1):
+                fields = line.split()
+                if not fields or fields[0].startswith("#"):
+                    continue
+                name = f"{path}:{line_number}"
+                try:
+                    if fields[0] == "game":
+                        moves = fields[1:]
+                        if moves and "-" not in moves[0]:
+                            name, moves = moves[0], moves[1:]
+                        for ply, (board, turn) in enumerate(game_positions(rules, moves)):
+                            yield (f"{name}:{ply}", *position_text(board, turn))
+                    else:
+                        parse_position(fields[0], fields[1] if len(fields) > 1 else "")
+                        yield (fields[2] if len(fields) > 2 else name, fields[0], fields[1])
+                except ValueError as e:
+                    print(f"⚠️ {path}:{line_number}: {e}", file=sys.stderr)
+
+
+def _init_worker(tt_entries):
+    global _game
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the main process
+    _game = Game(None)  # Used for its evaluation, search and playouts
+    _game.transposition_table = TranspositionTable(tt_entries)
+
+
+def analyze_chunk(chunk, depth, playouts, seed):
+    """Worker entry point: analyze a list of (id, squares, side) positions"""
+    results = []
+    for position_id, squares, side in chunk:
+        start = time.perf_counter()
+        board, turn = parse_position(squares, side)
+        _game.search_stats = stats = SearchStats(depth)
+        score, best_move, reached = _game.search(board, depth, turn == RED)
+        score = score if turn == RED else -score  # Both from red's point of view
+        result = {
+            "id": position_id,
+            "position": f"{squares} {side}",
+            "eval": round(board.evaluate(), 4),
+            "score": None if math.isinf(score) else round(score, 4),
+            "depth": reached,
+            "best_move": None,
+            "nodes": stats.nodes,
+        }
+        if math.isinf(score):
+            result["result"] = "win" if score > 0 else "loss"  # JSON has no infinity
+        if best_move:
+            piece, target = best_move
+            result["best_move"] = f"{square_index(piece.row, piece.col)}-{square_index(*target)}"
+        if playouts:
+            random.seed(f"{seed}:{position_id}")  # The same input gives the same probabilities
+            counts = {"RED": 0, "WHITE": 0, "DRAW": 0}
+            for _ in range(playouts):
+                counts[_game._run_playout(board.copy(), turn)] += 1
+            result["win_probability"] = {name.lower(): count / playouts for name, count in counts.items()}
+        result["time_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        results.append(result)
+    return results
+
+
+def load_checkpoint(path):
+    """Ids already in the output file; a last line cut short by a crash is removed"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            f.truncate(complete)
+    for line in data[:complete].splitlines():
+        if line.strip():
+            done.add(json.loads(line)["id"])
+    return done
+
+
+def chunks_of(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def analyze(args):
+    """Run the pipeline; returns the number of positions analyzed"""
+    done = load_checkpoint(args.output)
+    if done:
+        print(f"♻️ Resuming: {len(done)} positions already in {args.output}", file=sys.stderr)
+    pending = ((position_id, squares, side) for position_id, squares, side in read_positions(args.inputs)
+               if position_id not in done)
+
+    analyzed = 0
+    start = last_report = time.perf_counter()
+    pool = ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(WORKER_TT_ENTRIES,))
+    with open(args.output, "a") as out:
+        def collect(finished):
+            nonlocal analyzed
+            for future in finished:
+                for result in future.result():
+                    out.write(json.dumps(result, allow_nan=False) + "\n")
+                    analyzed += 1
+            out.flush()  # Everything written counts as done if the run is interrupted
+
+        in_flight = set()
+        try:
+            for chunk in chunks_of(pending, args.chunk_size):
+                if len(in_flight) >= args.max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                in_flight.add(pool.submit(analyze_chunk, chunk, args.depth, args.playouts, args.seed))
+
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_SECONDS:
+                    last_report = now
+                    print(f"📈 {analyzed} positions, {analyzed / (now - start):.1f}/s", file=sys.stderr)
+            collect(in_flight)
+        finally:
+            pool.shutdown(cancel_futures=True)  # Queued chunks are redone on resume
+    return analyzed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze checkers positions in batch")
+    parser.add_argument("inputs", nargs="+", help="position or game files")
+    parser.add_argument("--output", required=True, help="JSON Lines file to write (and resume from)")
+    parser.add_argument("--depth", type=int, default=AI_DEPTHS["medium"], help="search depth per position")
+    parser.add_argument("--playouts", type=int, default=100, help="Monte Carlo playouts per position (0 for none)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=8, help="positions sent to a worker at once")
+    parser.add_argument("--max-in-flight", type=int, help="most chunks queued at once (default: 4 per worker)")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for the playouts")
+    args = parser.parse_args()
+    args.max_in_flight = args.max_in_flight or 4 * args.workers
+
+    start = time.perf_counter()
+    try:
+        analyzed = analyze(args)
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrupted; run the same command again to resume from {args.output}", file=sys.stderr)
+        return 130
+    elapsed = time.perf_counter() - start
+    print(f"✅ {analyzed} positions analyzed in {elapsed:.1f}s ({analyzed / elapsed if elapsed else 0:.1f}/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""Benchmark harness for the AI Checkers Master hot paths.
+
+Measures minimax search, board evaluation, board copying, Monte Carlo
+playouts and wire protocol throughput on a fixed suite of positions and
+prints the results as JSON.
+
+Usage:
+    python benchmark.py                              # run and print JSON
+    python benchmark.py --output results.json        # also write to a file
+    python benchmark.py --save-baseline              # store results as the baseline
+    python benchmark.py --compare                    # compare against the baseline
+"""
+
+import argparse
+import json
+import pickle
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+import protocol
+from checkers import AI_DEPTHS, RED, SIDES, WHITE, ROWS, COLS, Board, Game, SearchStats
+
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.10  # Allowed relative slowdown before a metric counts as a regression
+
+# Fixed suite of positions: r/w are men, R/W are kings, "." is empty
+POSITIONS = {
+    "opening": {
+        "turn": RED,
+        "rows": [
+            ".w.w.w.w",
+            "w.w.w.w.",
+            ".w.w.w.w",
+            "........",
+            "........",
+            "r.r.r.r.",
+            ".r.r.r.r",
+            "r.r.r.r.",
+        ],
+    },
+    "midgame": {
+        "turn": WHITE,
+        "rows": [
+            ".w.w...w",
+            "w...w.w.",
+            ".w...w..",
+            "..w.r...",
+            ".r...w..",
+            "r...r.r.",
+            ".r.r...r",
+            "r...r...",
+        ],
+    },
+    "endgame": {
+        "turn": RED,
+        "rows": [
+            "........",
+            "......w.",
+            ".W......",
+            "........",
+            "...r.R..",
+            "........",
+            ".....r..",
+            "........",
+        ],
+    },
+}
+
+
+def build_board(rows):
+    """Create a Board from a list of row strings"""
+    pieces = []
+    for row in range(ROWS):
+        for col in range(COLS):
+            symbol = rows[row][col]
+            if symbol != ".":
+                pieces.append((row, col, RED if symbol in "rR" else WHITE, symbol in "RW"))
+    return Board.from_pieces(pieces)
+
+
+def make_game(position):
+    """Create a headless Game set up on one of the suite positions"""
+    game = Game(None, game_mode="human_vs_ai", ai_difficulty="hard")
+    game.board = build_board(position["rows"])
+    game.turn = position["turn"]
+    return game
+
+
+def bench_search(results, difficulties):
+    """Minimax nodes per second and time to depth for each difficulty"""
+    for name, position in POSITIONS.items():
+        for difficulty in difficulties:
+            game = make_game(position)
+            depth = AI_DEPTHS[difficulty]
+            game.search_stats = stats = SearchStats(depth)
+            is_red_player = position["turn"] == RED
+
+            start = time.perf_counter()
+            game.minimax(game.board, depth, float('-inf'), float('inf'), True, is_red_player)
+            elapsed = time.perf_counter() - start
+
+            prefix = f"search.{difficulty}.{name}"
+            results[f"{prefix}.time_to_depth_sec"] = elapsed
+            results[f"{prefix}.nodes"] = stats.nodes
+            results[f"{prefix}.leaf_evals"] = stats.leaf_evals
+            results[f"{prefix}.cutoffs"] = stats.cutoffs
+            results[f"{prefix}.nodes_per_sec"] = stats.nodes / elapsed if elapsed > 0 else 0.0
+
+
+def best_of(repeats, func):
+    """Run func repeats times and return the fastest wall time"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_evaluate(results, iterations, repeats):
+    """Board.evaluate calls per second"""
+    for name, position in POSITIONS.items():
+        board = build_board(position["rows"])
+
+        def run():
+            for _ in range(iterations):
+                board.evaluate()
+
+        elapsed = best_of(repeats, run)
+        results[f"evaluate.{name}.calls_per_sec"] = iterations / elapsed
+
+
+def bench_copy(results, iterations, repeats):
+    """Board.copy cost in microseconds per copy"""
+    for name, position in POSITIONS.items():
+        board = build_board(position["rows"])
+
+        def run():
+            for _ in range(iterations):
+                board.copy()
+
+        elapsed = best_of(repeats, run)
+        results[f"copy.{name}.cost_us"] = elapsed / iterations * 1e6
+
+
+def bench_playouts(results, playouts, seed):
+    """Monte Carlo playouts per second from each position"""
+    for name, position in POSITIONS.items():
+        game = make_game(position)
+        random.seed(seed)
+
+        start = time.perf_counter()
+        for _ in range(playouts):
+            game._run_playout(game.board.copy(), game.turn)
+        elapsed = time.perf_counter() - start
+
+        results[f"playouts.{name}.playouts_per_sec"] = playouts / elapsed
+
+
+def bench_protocol(results, iterations, repeats):
+    """Wire protocol messages encoded and parsed per second on one core, and frame sizes"""
+    board = build_board(POSITIONS["midgame"]["rows"])
+    turn = SIDES[POSITIONS["midgame"]["turn"]]
+    move_frame = protocol.encode_move(9, 13)
+    state_frame = protocol.encode_state(board.bitboards(), turn, last_move=(9, 13))
+    results["protocol.move.frame_bytes"] = len(move_frame)
+    results["protocol.state.frame_bytes"] = len(state_frame)
+    results["protocol.pickle_board.frame_bytes"] = len(pickle.dumps(board))  # What pickling a Board would send
+    
+    def encode_moves():
+        for _ in range(iterations):
+            protocol.encode_move(9, 13)
+    
+    def encode_states():
+        for _ in range(iterations):
+            protocol.encode_state(board.bitboards(), turn, last_move=(9, 13))
+    
+    def pickle_boards():
+        for _ in range(iterations):
+            pickle.dumps(board)
+    
+    def parse(stream, decode):
+        # Received in 64 KiB chunks, as a socket would deliver them
+        frames = protocol.FrameBuffer()
+        data = memoryview(stream)
+        while data:
+            space = frames.writable()
+            chunk = min(len(space), len(data), 64 * 1024)
+            space[:chunk] = data[:chunk]
+            data = data[chunk:]
+            frames.advance(chunk)
+            for _, payload in frames.frames():
+                decode(payload)
+    
+    move_stream = move_frame * iterations
+    state_stream = state_frame * iterations
+    results["protocol.move.encode_per_sec"] = iterations / best_of(repeats, encode_moves)
+    results["protocol.move.parse_per_sec"] = iterations / best_of(repeats, lambda: parse(move_stream, protocol.decode_move))
+    results["protocol.state.encode_per_sec"] = iterations / best_of(repeats, encode_states)
+    results["protocol.state.parse_per_sec"] = iterations / best_of(repeats, lambda: parse(state_stream, protocol.decode_state))
+    results["protocol.pickle_board.encode_per_sec"] = iterations / best_of(repeats, pickle_boards)
+
+
+def bench_memory(results, difficulties, playouts, seed):
+    """Peak traced memory of one search per difficulty and of a playout batch"""
+    position = POSITIONS["midgame"]
+
+    for difficulty in difficulties:
+        game = make_game(position)
+        tracemalloc.start()
+        game.minimax(game.board, AI_DEPTHS[difficulty], float('-inf'), float('inf'), True, False)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"memory.search.{difficulty}.peak_bytes"] = peak
+
+    game = make_game(position)
+    random.seed(seed)
+    tracemalloc.start()
+    for _ in range(playouts):
+        game._run_playout(game.board.copy(), game.turn)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["memory.playouts.peak_bytes"] = peak
+
+    try:
+        import resource
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["memory.process.max_rss_bytes"] = max_rss if sys.platform == "darwin" else max_rss * 1024
+    except ImportError:
+        pass
+
+
+def run_benchmarks(args):
+    """Run the whole suite and return the JSON report"""
+    results = {}
+    bench_search(results, args.difficulties)
+    bench_evaluate(results, args.iterations, args.repeats)
+    bench_copy(results, args.iterations, args.repeats)
+    bench_playouts(results, args.playouts, args.seed)
+    bench_protocol(results, args.iterations, args.repeats)
+    bench_memory(results, args.difficulties, args.playouts, args.seed)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "difficulties": args.difficulties,
+            "iterations": args.iterations,
+            "playouts": args.playouts,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def metric_direction(name):
+    """Return 1 if higher is better, -1 if lower is better, 0 if informational"""
+    if name.endswith("_per_sec"):
+        return 1
+    if name.endswith(("_sec", "_us", "_bytes")):
+        return -1
+    return 0
+
+
+def compare(report, baseline, tolerance):
+    """Compare a report against a baseline and return (lines, regressions)"""
+    lines = []
+    regressions = []
+    current = report["results"]
+    previous = baseline["results"]
+
+    for name in sorted(current):
+        if name not in previous:
+            lines.append(f"  NEW   {name}: {current[name]:.6g}")
+            continue
+
+        old, new = previous[name], current[name]
+        change = (new - old) / old if old else 0.0
+        direction = metric_direction(name)
+
+        status = "      "
+        if direction and change * direction < -tolerance:
+            status = "SLOWER"
+            regressions.append(name)
+        elif direction and change * direction > tolerance:
+            status = "FASTER"
+        elif not direction and new != old:
+            status = "CHANGE"
+
+        lines.append(f"  {status} {name}: {old:.6g} -> {new:.6g} ({change:+.1%})")
+
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search, evaluation and playout throughput")
+    parser.add_argument("--difficulties", nargs="+", choices=list(AI_DEPTHS), default=list(AI_DEPTHS),
+                        help="difficulties to search at (default: all)")
+    parser.add_argument("--iterations", type=int, default=5000, help="calls per evaluate/copy timing run")
+    parser.add_argument("--repeats", type=int, default=5, help="timing runs per evaluate/copy metric (best is kept)")
+    parser.add_argument("--playouts", type=int, default=50, help="Monte Carlo playouts per position")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for playouts")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to save or compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare this run against the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative change allowed before a metric is a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args)
+    output = json.dumps(report, indent=2)
+    print(output)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output + "\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(report, baseline, args.tolerance)
+        print(f"Comparison against {args.baseline}:", file=sys.stderr)
+        for line in lines:
+            print(line, file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,20 +7,53 @@ import random
 import time
 import threading
 import json
+import logging
 import socket
-import pickle
 from copy import deepcopy
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import uuid
 from datetime import datetime
 import math
+import mmap
+import struct
+import sqlite3
+import cProfile
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import protocol
 
 # Firebase configuration - Replace with your actual Firebase config
 FIREBASE_API_KEY = "Api key"
 FIREBASE_AUTH_URL = "url"
+FIREBASE_TOKEN_URL = "https://securetoken.googleapis.com/v1/token"  # Exchanges refresh tokens for ID tokens
 FIREBASE_PROJECT_ID = "ai-checkers-master"  # Replace with your project ID
-FIRESTORE_URL = f"https://firestore.googleapis.com/v1/projects/{FIREBASE_PROJECT_ID}/databases/(default)/documents"
+FIRESTORE_DATABASE = f"projects/{FIREBASE_PROJECT_ID}/databases/(default)"
+FIRESTORE_URL = f"https://firestore.googleapis.com/v1/{FIRESTORE_DATABASE}/documents"
+HTTP_TIMEOUT = (5, 10)  # Connect and read timeouts (seconds) for Firebase requests
+HTTP_POOL_SIZE = 4  # Keep-alive connections kept open per host
+TOKEN_REFRESH_MARGIN = 300  # Refresh the ID token this many seconds before it expires
+
+# Point every Firebase URL at a local stand-in server instead (see firebase_emulator.py)
+FIREBASE_EMULATOR_URL = os.environ.get("FIREBASE_EMULATOR_URL")
+if FIREBASE_EMULATOR_URL:
+    FIREBASE_AUTH_URL = f"{FIREBASE_EMULATOR_URL}/identitytoolkit.googleapis.com/v1/accounts"
+    FIREBASE_TOKEN_URL = f"{FIREBASE_EMULATOR_URL}/securetoken.googleapis.com/v1/token"
+    FIRESTORE_URL = f"{FIREBASE_EMULATOR_URL}/v1/{FIRESTORE_DATABASE}/documents"
+
+# Local copy of the player's stats, including games not yet sent to Firestore
+STATS_DB_FILE = "stats.db"
+STATS_RETRY_BASE_DELAY = 1.0  # Seconds before the first retry; doubles after each failure
+STATS_RETRY_MAX_DELAY = 60.0
+
+# Online matches are played through game_server.py
+GAME_SERVER = os.environ.get("CHECKERS_SERVER", "127.0.0.1:8765")  # host:port of the game server
+
+# Autosave of the local game in progress (see SessionJournal)
+SESSION_FILE = "session.journal"
+SESSION_SNAPSHOT_RECORDS = 16  # Journal records between snapshots
+SESSION_FSYNC_SECONDS = 1.0  # Longest a journaled move waits to reach the disk
 
 # Initialize pygame module
 pygame.init()
@@ -34,6 +67,45 @@ BOARD_OFFSET_X = 50
 BOARD_OFFSET_Y = 80
 SIDE_PANEL_X = BOARD_OFFSET_X + BOARD_SIZE + 20
 
+# AI search depth for each difficulty
+AI_DEPTHS = {"easy": 2, "medium": 4, "hard": 6}
+
+# Leaf evaluator for each difficulty: "classic" (Board.evaluate) or "net" (the value network in
+# VALUE_NET_FILE, trained by train_value_net.py; classic is used while there is none)
+AI_EVALUATORS = {"easy": "classic", "medium": "classic", "hard": "classic"}
+VALUE_NET_FILE = "value_net.npz"
+
+# Search statistics log (one JSON object per AI move)
+SEARCH_LOG_FILE = "search_stats.log"
+SLOW_MOVE_SECONDS = 2.0  # AI moves slower than this are logged as warnings
+search_logger = logging.getLogger("checkers.search")
+
+# Opening book
+OPENING_BOOK_FILE = "opening_book.bin"
+ZOBRIST_SEED = 20250529  # Fixed so position hashes are stable across runs
+
+# Endgame tablebases
+TABLEBASE_DIR = "tablebases"
+TABLEBASE_WIN_SCORE = 1000  # Search score of a tablebase win, minus the plies needed
+
+# Evaluation weights (tune_eval.py fits them to self-play results)
+EVAL_FEATURES = ("material", "kings", "advancement", "center", "back_row")
+DEFAULT_EVAL_WEIGHTS = {"material": 1.0, "kings": 0.5, "advancement": 0.05, "center": 0.02, "back_row": 0.0}
+EVAL_WEIGHTS_FILE = "eval_weights.json"
+
+# Transposition table
+TT_ENTRIES = 1 << 20  # Slots in the table (a power of two, 16 bytes each)
+DEADLINE_CHECK_NODES = 1024  # Searches with a deadline look at the clock this often
+
+# Frame profiling
+FRAME_BUDGET_MS = 1000 / 60
+PROFILE_FRAMES = 300  # Frames recorded by one cProfile capture
+
+# Idle rendering
+ANIMATION_FPS = int(os.environ.get("CHECKERS_ANIMATION_FPS", "30"))  # Frame rate while something on screen moves
+IDLE_WAIT_MS = 1000  # Longest the main loop sleeps waiting for an event when nothing moves
+REDRAW_EVENT = pygame.USEREVENT + 1  # Posted by background work that has new results to show
+
 # Colors
 RED = (255, 50, 50)
 WHITE = (240, 240, 240)
@@ -55,20 +127,234 @@ FONT_LARGE = pygame.font.SysFont('Arial', 48, bold=True)
 FONT_MEDIUM = pygame.font.SysFont('Arial', 32)
 FONT_SMALL = pygame.font.SysFont('Arial', 22)
 FONT_TINY = pygame.font.SysFont('Arial', 18)
+TEXT_CACHE_BYTES = 8 * 1024 * 1024  # Memory cap for cached text surfaces
 
 # Set up display
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("AI CHECKERS MASTER")
 
+class FrameProfiler:
+    """Frame time percentiles and per-subsystem time breakdown for the main loop"""
+    SUBSYSTEMS = ("events", "render", "ai", "monte_carlo", "network")
+    
+    def __init__(self, history=240):
+        self.frame_times = deque(maxlen=history)  # Time between frame starts (ms)
+        self.busy_times = deque(maxlen=history)   # Time spent working in each frame (ms)
+        self.subsystem_times = {name: deque(maxlen=history) for name in self.SUBSYSTEMS}
+        self.current = dict.fromkeys(self.SUBSYSTEMS, 0.0)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.frame_start = None
+        self.show_overlay = False
+        
+        # cProfile capture
+        self.profile = None
+        self.profile_frames_left = 0
+        self.profile_file = None
+    
+    def add(self, name, seconds):
+        """Charge time to a subsystem for the current frame (safe from any thread)"""
+        with self.lock:
+            self.current[name] += seconds
+    
+    @contextmanager
+    def section(self, name):
+        """Time a block as belonging to a subsystem
+        
+        Sections may nest; time spent in an inner section is not charged
+        to the outer one, so the breakdown adds up to the frame time.
+        """
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        
+        now = time.perf_counter()
+        if stack:
+            outer = stack[-1]
+            self.add(outer[0], now - outer[1])
+        entry = [name, now]
+        stack.append(entry)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            stack.pop()
+            self.add(name, now - entry[1])
+            if stack:
+                stack[-1][1] = now
+    
+    def begin_frame(self):
+        """Mark the start of a frame"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_times.append((now - self.frame_start) * 1000)
+        self.frame_start = now
+    
+    def end_frame(self):
+        """Mark the end of a frame's work and roll the subsystem times into history"""
+        if self.frame_start is None:
+            return
+        self.busy_times.append((time.perf_counter() - self.frame_start) * 1000)
+        
+        with self.lock:
+            for name in self.SUBSYSTEMS:
+                self.subsystem_times[name].append(self.current[name] * 1000)
+                self.current[name] = 0.0
+        
+        if self.profile:
+            self.profile_frames_left -= 1
+            if self.profile_frames_left <= 0:
+                self.stop_capture()
+    
+    def percentile(self, values, pct):
+        """Return the pct-th percentile of values (0 if empty)"""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def start_capture(self, frames=PROFILE_FRAMES):
+        """Record a cProfile session of the next frames (main thread only)"""
+        if self.profile:
+            return
+        self.profile_file = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+        self.profile_frames_left = frames
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        print(f"⏺️ Recording cProfile for {frames} frames...")
+    
+    def stop_capture(self):
+        """Stop the cProfile session and write it to disk"""
+        if not self.profile:
+            return
+        self.profile.disable()
+        self.profile.dump_stats(self.profile_file)
+        print(f"💾 Profile saved to {self.profile_file} (view with: python -m pstats {self.profile_file})")
+        self.profile = None
+        self.profile_frames_left = 0
+    
+    def handle_key(self, key):
+        """Handle profiler hotkeys (F3 overlay, F4 cProfile capture)"""
+        if key == pygame.K_F3:
+            self.show_overlay = not self.show_overlay
+        elif key == pygame.K_F4:
+            self.start_capture()
+    
+    def draw_overlay(self, win):
+        """Draw frame time percentiles and the per-subsystem breakdown; returns the area drawn"""
+        if not self.show_overlay:
+            return None
+        
+        frames = list(self.frame_times)
+        busy = list(self.busy_times)
+        over_budget = sum(1 for t in busy if t > FRAME_BUDGET_MS)
+        lines = [
+            (f"Frame p50 {self.percentile(frames, 50):.1f}  p95 {self.percentile(frames, 95):.1f}  "
+             f"p99 {self.percentile(frames, 99):.1f} ms", WHITE),
+            (f"Busy p50 {self.percentile(busy, 50):.1f}  p95 {self.percentile(busy, 95):.1f}  "
+             f"max {max(busy, default=0):.1f} ms", WHITE),
+            (f"Over budget: {over_budget}/{len(busy)} frames", RED if over_budget else GREEN)
+        ]
+        for name in self.SUBSYSTEMS:
+            times = self.subsystem_times[name]
+            average = sum(times) / len(times) if times else 0.0
+            lines.append((f"{name:<12}{average:6.2f} ms avg  {max(times, default=0):6.1f} max", LIGHT_GRAY))
+        if self.profile:
+            lines.append((f"● cProfile: {self.profile_frames_left} frames left", RED))
+        
+        overlay = pygame.Surface((380, len(lines) * 20 + 10), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 190))
+        for i, (line, color) in enumerate(lines):
+            overlay.blit(FONT_TINY.render(line, True, color), (8, 5 + i * 20))
+        return win.blit(overlay, (10, 10))
+
+PROFILER = FrameProfiler()
+
+_http_session = None
+
+def get_http_session():
+    """Shared requests session, so Firebase calls reuse keep-alive connections"""
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        _http_session.mount("https://", adapter)
+        _http_session.mount("http://", adapter)
+    return _http_session
+
+class TokenManager:
+    """Holds the Firebase ID token and refreshes it before it expires"""
+    def __init__(self, api_key, token_url=FIREBASE_TOKEN_URL):
+        self.api_key = api_key
+        self.token_url = token_url
+        self.id_token = None
+        self.refresh_token = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+    
+    def set_tokens(self, id_token, refresh_token, expires_in):
+        """Store the tokens returned by a sign-in or refresh"""
+        self.id_token = id_token
+        self.refresh_token = refresh_token
+        self.expires_at = time.monotonic() + int(expires_in)
+    
+    def get_token(self, force_refresh=False):
+        """A valid ID token, refreshed first if it is about to expire; None if none can be had"""
+        with self.lock:
+            if not self.refresh_token:
+                return self.id_token
+            if force_refresh or time.monotonic() > self.expires_at - TOKEN_REFRESH_MARGIN:
+                self.refresh()
+            return self.id_token if time.monotonic() < self.expires_at else None
+    
+    def refresh(self):
+        """Exchange the refresh token for a new ID token"""
+        try:
+            with PROFILER.section("network"):
+                response = get_http_session().post(f"{self.token_url}?key={self.api_key}", timeout=HTTP_TIMEOUT,
+                                                   data={"grant_type": "refresh_token",
+                                                         "refresh_token": self.refresh_token})
+            data = response.json()
+            if 'error' in data:
+                print(f"❌ Token refresh failed: {data['error'].get('message')}")
+                return False
+            self.set_tokens(data['id_token'], data['refresh_token'], data['expires_in'])
+            return True
+        except Exception as e:
+            print(f"❌ Token refresh failed: {e}")
+            return False
+
 class FirestoreAuth:
     def __init__(self):
         self.api_key = FIREBASE_API_KEY
         self.auth_url = FIREBASE_AUTH_URL
         self.firestore_url = FIRESTORE_URL
-        self.id_token = None
+        self.tokens = TokenManager(self.api_key)
         self.local_id = None
-        self.refresh_token = None
+        self.stats_queue = StatsWriteQueue(self)
         
+    @property
+    def id_token(self):
+        return self.tokens.id_token
+    
+    @property
+    def refresh_token(self):
+        return self.tokens.refresh_token
+    
+    def authorized_request(self, method, url, **kwargs):
+        """Send a Firestore request with the current ID token, refreshing it once if it was rejected"""
+        token = self.tokens.get_token()
+        session = get_http_session()
+        with PROFILER.section("network"):
+            response = session.request(method, url, headers={"Authorization": f"Bearer {token}"},
+                                       timeout=HTTP_TIMEOUT, **kwargs)
+            if response.status_code == 401 and self.tokens.refresh_token:
+                token = self.tokens.get_token(force_refresh=True)
+                response = session.request(method, url, headers={"Authorization": f"Bearer {token}"},
+                                           timeout=HTTP_TIMEOUT, **kwargs)
+        return response
+    
     def sign_up(self, email, password):
         """Create a new user account"""
         try:
@@ -79,7 +365,8 @@ class FirestoreAuth:
                 "returnSecureToken": True
             }
             
-            response = requests.post(url, json=payload)
+            with PROFILER.section("network"):
+                response = get_http_session().post(url, json=payload, timeout=HTTP_TIMEOUT)
             data = response.json()
             
             if 'error' in data:
@@ -94,12 +381,12 @@ class FirestoreAuth:
                 else:
                     return False, error_message
             
-            self.id_token = data['idToken']
+            self.tokens.set_tokens(data['idToken'], data['refreshToken'], data['expiresIn'])
             self.local_id = data['localId']
-            self.refresh_token = data['refreshToken']
             
             # Create user profile in Firestore
             self.create_user_profile(data['localId'], email)
+            self.stats_queue.start()
             
             return True, "Account created successfully!"
         except requests.exceptions.RequestException:
@@ -117,7 +404,8 @@ class FirestoreAuth:
                 "returnSecureToken": True
             }
             
-            response = requests.post(url, json=payload)
+            with PROFILER.section("network"):
+                response = get_http_session().post(url, json=payload, timeout=HTTP_TIMEOUT)
             data = response.json()
             
             if 'error' in data:
@@ -134,9 +422,9 @@ class FirestoreAuth:
                 else:
                     return False, error_message
             
-            self.id_token = data['idToken']
+            self.tokens.set_tokens(data['idToken'], data['refreshToken'], data['expiresIn'])
             self.local_id = data['localId']
-            self.refresh_token = data['refreshToken']
+            self.stats_queue.start()
             
             return True, "Login successful!"
         except requests.exceptions.RequestException:
@@ -148,10 +436,6 @@ class FirestoreAuth:
         """Create a user profile in Firestore"""
         try:
             url = f"{self.firestore_url}/users/{user_id}"
-            headers = {
-                "Authorization": f"Bearer {self.id_token}",
-                "Content-Type": "application/json"
-            }
             
             # Firestore document structure
             payload = {
@@ -165,7 +449,7 @@ class FirestoreAuth:
                 }
             }
             
-            response = requests.patch(url, json=payload, headers=headers)
+            response = self.authorized_request("PATCH", url, json=payload)
             print(f"✅ User profile created in Firestore: {response.status_code}")
             return response.ok
         except Exception as e:
@@ -179,11 +463,7 @@ class FirestoreAuth:
         
         try:
             url = f"{self.firestore_url}/users/{self.local_id}"
-            headers = {
-                "Authorization": f"Bearer {self.id_token}"
-            }
-            
-            response = requests.get(url, headers=headers)
+            response = self.authorized_request("GET", url)
             if response.ok:
                 data = response.json()
                 if 'fields' in data:
@@ -202,45 +482,452 @@ class FirestoreAuth:
         
         return None
     
-    def update_user_stats(self, win=False):
-        """Update user statistics after a game"""
+    def update_user_stats(self, win=False, game_id=None):
+        """Record a finished game in one atomic commit
+        
+        The counters are incremented by the server, so concurrent sessions
+        never overwrite each other. The commit also creates
+        users/{uid}/games/{game_id} with an exists=false precondition, so
+        retrying a game that was already recorded changes nothing.
+        
+        Returns the server's counters after the update ({} if the game was
+        already recorded), or None if the write failed.
+        """
         if not self.local_id or not self.id_token:
-            return False
+            return None
         
         try:
-            profile = self.get_user_profile()
-            if not profile:
-                return False
+            url = f"{self.firestore_url}:commit"
+            user_document = f"{FIRESTORE_DATABASE}/documents/users/{self.local_id}"
+            game_id = game_id or uuid.uuid4().hex
             
-            url = f"{self.firestore_url}/users/{self.local_id}"
-            headers = {
-                "Authorization": f"Bearer {self.id_token}",
-                "Content-Type": "application/json"
+            payload = {
+                "writes": [
+                    {
+                        "update": {
+                            "name": f"{user_document}/games/{game_id}",
+                            "fields": {
+                                "win": {"booleanValue": win},
+                                "finished_at": {"timestampValue": datetime.now().isoformat() + "Z"}
+                            }
+                        },
+                        "currentDocument": {"exists": False}
+                    },
+                    {
+                        "transform": {
+                            "document": user_document,
+                            "fieldTransforms": [
+                                {"fieldPath": "wins", "increment": {"integerValue": "1" if win else "0"}},
+                                {"fieldPath": "losses", "increment": {"integerValue": "0" if win else "1"}},
+                                {"fieldPath": "games_played", "increment": {"integerValue": "1"}},
+                                {"fieldPath": "last_updated", "setToServerValue": "REQUEST_TIME"}
+                            ]
+                        }
+                    }
+                ]
             }
             
-            # Update stats
-            new_games_played = profile.get('games_played', 0) + 1
-            new_wins = profile.get('wins', 0) + (1 if win else 0)
-            new_losses = profile.get('losses', 0) + (0 if win else 1)
+            response = self.authorized_request("POST", url, json=payload)
+            data = response.json()
             
-            payload = {
-                "fields": {
-                    "email": {"stringValue": profile.get('email', '')},
-                    "username": {"stringValue": profile.get('username', '')},
-                    "wins": {"integerValue": str(new_wins)},
-                    "losses": {"integerValue": str(new_losses)},
-                    "games_played": {"integerValue": str(new_games_played)},
-                    "created_at": {"timestampValue": profile.get('created_at', datetime.now().isoformat() + "Z")},
-                    "last_updated": {"timestampValue": datetime.now().isoformat() + "Z"}
-                }
-            }
+            if 'error' in data:
+                # The game document already exists: an earlier attempt went through
+                if data['error'].get('status') in ("ALREADY_EXISTS", "FAILED_PRECONDITION"):
+                    print(f"📊 Game {game_id} was already recorded")
+                    return {}
+                print(f"❌ Error updating stats: {data['error'].get('message')}")
+                return None
             
-            response = requests.patch(url, json=payload, headers=headers)
-            print(f"📊 Stats updated: Games={new_games_played}, Wins={new_wins}, Losses={new_losses}")
-            return response.ok
+            # Transform results hold the counters after the increment
+            counters = {}
+            results = data['writeResults'][1].get('transformResults', [])
+            if len(results) >= 3:
+                wins, losses, games_played = (int(value['integerValue']) for value in results[:3])
+                counters = {"wins": wins, "losses": losses, "games_played": games_played}
+                print(f"📊 Stats updated: Games={games_played}, Wins={wins}, Losses={losses}")
+            return counters if response.ok else None
         except Exception as e:
             print(f"❌ Error updating stats: {e}")
-            return False
+            return None
+
+class LocalStatsStore:
+    """SQLite copy of each user's stats, readable instantly and offline
+    
+    profiles holds the counters as last seen on Firestore; pending_games
+    holds finished games not yet written there. The stats shown are the
+    server counters plus the pending games, which is what Firestore will
+    hold once the write queue has caught up.
+    """
+    def __init__(self, path=STATS_DB_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.version = 0  # Bumped on every change so screens know to re-read
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    user_id TEXT PRIMARY KEY,
+                    email TEXT,
+                    username TEXT,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    games_played INTEGER NOT NULL DEFAULT 0,
+                    synced_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS pending_games (
+                    game_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    win INTEGER NOT NULL,
+                    finished_at TEXT NOT NULL
+                );
+            """)
+    
+    def _set_counters(self, user_id, wins, losses, games_played, email=None, username=None):
+        self.connection.execute("""
+            INSERT INTO profiles (user_id, email, username, wins, losses, games_played, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                email = COALESCE(excluded.email, email),
+                username = COALESCE(excluded.username, username),
+                wins = excluded.wins, losses = excluded.losses,
+                games_played = excluded.games_played, synced_at = excluded.synced_at
+        """, (user_id, email, username, wins, losses, games_played, datetime.now().isoformat()))
+    
+    def save_profile(self, user_id, profile):
+        """Replace the server counters with a freshly fetched Firestore profile"""
+        with self.lock, self.connection:
+            self._set_counters(user_id, profile.get('wins', 0), profile.get('losses', 0),
+                               profile.get('games_played', 0), profile.get('email'), profile.get('username'))
+            self.version += 1
+    
+    def add_game(self, game_id, user_id, win, finished_at):
+        """Record a finished game that still has to be written to Firestore"""
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO pending_games VALUES (?, ?, ?, ?)",
+                                    (game_id, user_id, int(win), finished_at))
+            self.version += 1
+    
+    def pending_games(self, user_id=None):
+        """Games not yet written, oldest first, optionally for one user"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT game_id, user_id, win, finished_at FROM pending_games "
+                "WHERE ? IS NULL OR user_id = ? ORDER BY rowid", (user_id, user_id)).fetchall()
+        return [{"game_id": game_id, "user_id": owner, "win": bool(win), "finished_at": finished_at}
+                for game_id, owner, win, finished_at in rows]
+    
+    def complete_game(self, game_id, user_id, counters=None):
+        """Drop a written game, taking the server counters it returned if there are any"""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM pending_games WHERE game_id = ?", (game_id,))
+            if counters:
+                self._set_counters(user_id, counters['wins'], counters['losses'], counters['games_played'])
+            self.version += 1
+    
+    def get_stats(self, user_id):
+        """Server counters plus pending games, with sync details"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT email, username, wins, losses, games_played, synced_at FROM profiles WHERE user_id = ?",
+                (user_id,)).fetchone()
+            pending_wins, pending_games = self.connection.execute(
+                "SELECT COALESCE(SUM(win), 0), COUNT(*) FROM pending_games WHERE user_id = ?",
+                (user_id,)).fetchone()
+        
+        email, username, wins, losses, games_played, synced_at = row or (None, None, 0, 0, 0, None)
+        return {
+            "email": email,
+            "username": username,
+            "wins": wins + pending_wins,
+            "losses": losses + pending_games - pending_wins,
+            "games_played": games_played + pending_games,
+            "pending": pending_games,
+            "synced_at": synced_at
+        }
+
+_stats_store = None
+
+def get_stats_store():
+    """Shared local stats store, opened on first use"""
+    global _stats_store
+    if _stats_store is None:
+        _stats_store = LocalStatsStore(STATS_DB_FILE)
+    return _stats_store
+
+class StatsWriteQueue:
+    """Background sync between the local stats store and Firestore
+    
+    enqueue() only records the game in the local store (so it survives a
+    crash) and wakes the worker thread. The worker refreshes the stored
+    profile when asked and sends pending games of the signed-in user to
+    Firestore, retrying with exponential backoff until they succeed.
+    """
+    def __init__(self, auth, store=None):
+        self.auth = auth
+        self.store = store
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.sync_requested = False
+    
+    def start(self):
+        """Start the worker thread and fetch the signed-in user's profile"""
+        with self.condition:
+            self.store = self.store or get_stats_store()
+            self.sync_requested = True
+            if self.thread is not None:
+                self.condition.notify()  # A different user may have signed in
+                return
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        pending = self.store.pending_games(self.auth.local_id)
+        if pending:
+            print(f"📤 {len(pending)} stats update(s) waiting to be sent")
+    
+    def stop(self, timeout=1.0):
+        """Stop the worker; games not sent yet stay in the local store"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+    
+    def enqueue(self, win):
+        """Record the result of a finished game for the signed-in user"""
+        game_id = uuid.uuid4().hex
+        self.store = self.store or get_stats_store()
+        self.store.add_game(game_id, self.auth.local_id, win, datetime.now().isoformat() + "Z")
+        with self.condition:
+            self.condition.notify()
+        return game_id
+    
+    def request_sync(self):
+        """Ask the worker to refresh the stored profile from Firestore"""
+        with self.condition:
+            self.sync_requested = True
+            self.condition.notify()
+    
+    def _next_entry(self):
+        if not self.auth.local_id or not self.auth.id_token:
+            return None
+        pending = self.store.pending_games(self.auth.local_id)
+        return pending[0] if pending else None
+    
+    def _run(self):
+        """Worker loop: refresh the profile when asked, then send pending games one at a time"""
+        failures = 0
+        while True:
+            with self.condition:
+                while not self.stopping and not self.sync_requested and self._next_entry() is None:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                sync = self.sync_requested
+                self.sync_requested = False
+                entry = self._next_entry()
+            
+            if sync and self.auth.local_id:
+                profile = self.auth.get_user_profile()
+                if profile:
+                    self.store.save_profile(self.auth.local_id, profile)
+            if entry is None:
+                continue
+            
+            counters = self.auth.update_user_stats(win=entry["win"], game_id=entry["game_id"])
+            if counters is not None:
+                self.store.complete_game(entry["game_id"], entry["user_id"], counters)
+                failures = 0
+                continue
+            
+            # Exponential backoff with jitter, cut short by stop()
+            failures += 1
+            delay = min(STATS_RETRY_MAX_DELAY, STATS_RETRY_BASE_DELAY * 2 ** (failures - 1))
+            with self.condition:
+                if not self.stopping:
+                    self.condition.wait(delay * random.uniform(0.5, 1.0))
+
+class SpriteAtlas:
+    """Pre-rendered checker piece sprites, so drawing a piece is a single blit
+    
+    Board pieces get one square-sized sprite per colour, king and selected
+    state. Decorative pieces are cached per colour, radius and style, and
+    static background layers by name. The cache is rebuilt when the square
+    size or display format changes.
+    """
+    def __init__(self):
+        self.square_size = None
+        self.display = None
+        self.pieces = {}
+        self.decorations = {}
+        self.layers = {}
+    
+    def rebuild(self):
+        """Drop every cached sprite and render the board piece sprites again"""
+        self.square_size = SQUARE_SIZE
+        self.display = pygame.display.get_surface()
+        self.pieces = {}
+        self.decorations = {}
+        self.layers = {}
+        for color in (RED, WHITE):
+            for king in (False, True):
+                for selected in (False, True):
+                    self.pieces[(color, king, selected)] = self._render_board_piece(color, king, selected)
+    
+    def _check_size(self):
+        if self.square_size != SQUARE_SIZE or self.display is not pygame.display.get_surface():
+            self.rebuild()
+    
+    def _new_surface(self, size):
+        surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        return surface.convert_alpha() if self.display else surface
+    
+    @staticmethod
+    def _draw_gradient(surface, color, center, radius, rings, shade_step):
+        """Concentric circles lightening towards the edge of the piece"""
+        for i in range(rings, 0, -1):
+            shade = shade_step * i
+            if color == RED:
+                draw_color = (min(255, color[0] + shade), 
+                             max(0, color[1] - shade), 
+                             max(0, color[2] - shade))
+            else:
+                draw_color = (min(255, color[0] + shade), 
+                             min(255, color[1] + shade), 
+                             min(255, color[2] + shade))
+            
+            pygame.draw.circle(surface, draw_color, center, radius - (rings - i))
+    
+    def _render_board_piece(self, color, king, selected):
+        """Render a board piece, with its selection glow, centred in a square"""
+        surface = self._new_surface(SQUARE_SIZE)
+        center = (SQUARE_SIZE // 2, SQUARE_SIZE // 2)
+        radius = SQUARE_SIZE // 2 - Piece.PADDING
+        
+        # Glow effect if selected
+        if selected:
+            pygame.draw.circle(surface, GLOW_BLUE, center, radius + Piece.GLOW_SIZE)
+        
+        self._draw_gradient(surface, color, center, radius, 5, 20)
+        pygame.draw.circle(surface, BLACK, center, radius + 1, 1)
+        
+        # King crown
+        if king:
+            crown_radius = radius // 2
+            pygame.draw.circle(surface, GOLD, center, crown_radius)
+            pygame.draw.circle(surface, BLACK, center, crown_radius, 1)
+        
+        return surface
+    
+    def board_piece(self, color, king, selected):
+        """Square-sized sprite for a board piece, blitted at the square's top-left corner"""
+        self._check_size()
+        return self.pieces[(color, king, selected)]
+    
+    def decoration(self, color, radius, king=False, rings=5, shade_step=20, outline_width=2,
+                   crown_radius=None, crown_width=1, shadow_offset=2):
+        """Sprite for a decorative piece with a drop shadow
+        
+        Returns (surface, offset); blit the surface at the piece centre minus offset.
+        """
+        self._check_size()
+        key = (color, radius, king, rings, shade_step, outline_width, crown_radius, crown_width, shadow_offset)
+        sprite = self.decorations.get(key)
+        if sprite is None:
+            offset = radius + 1
+            surface = self._new_surface(2 * radius + 2 + shadow_offset)
+            center = (offset, offset)
+            
+            pygame.draw.circle(surface, (0, 0, 0), (offset + shadow_offset, offset + shadow_offset), radius)
+            self._draw_gradient(surface, color, center, radius, rings, shade_step)
+            pygame.draw.circle(surface, BLACK, center, radius, outline_width)
+            
+            if king:
+                crown = radius // 2 if crown_radius is None else crown_radius
+                pygame.draw.circle(surface, GOLD, center, crown)
+                pygame.draw.circle(surface, BLACK, center, crown, crown_width)
+            
+            sprite = self.decorations[key] = (surface, offset)
+        return sprite
+
+    def layer(self, name, render):
+        """Static background layer, rendered by render() the first time it is asked for"""
+        self._check_size()
+        if name not in self.layers:
+            surface = render()
+            self.layers[name] = surface.convert_alpha() if surface.get_flags() & pygame.SRCALPHA else surface.convert()
+        return self.layers[name]
+    
+    @staticmethod
+    def render_fade(width, height, color, top_alpha, bottom_alpha):
+        """Panel background fading from top_alpha to bottom_alpha, one row at a time"""
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        for i in range(height):
+            alpha = int(top_alpha - (i / height) * (top_alpha - bottom_alpha))
+            pygame.draw.rect(surface, (*color, alpha), (0, i, width, 1))
+        return surface
+
+SPRITES = SpriteAtlas()
+
+class TextCache:
+    """Rendered text surfaces keyed by font, text, antialias and colour
+    
+    Least recently used surfaces are evicted once the cache holds more than
+    max_bytes of pixel data. Returned surfaces are shared and must not be
+    modified.
+    """
+    def __init__(self, max_bytes=TEXT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _size(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+    
+    def render(self, font, text, antialias, color):
+        """Drop-in replacement for font.render(text, antialias, color)"""
+        key = (font, text, antialias, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        self.bytes += self._size(surface)
+        
+        # Evict least recently used surfaces, always keeping the newest
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, evicted = self.surfaces.popitem(last=False)
+            self.bytes -= self._size(evicted)
+        return surface
+    
+    def clear(self):
+        """Drop every cached surface"""
+        self.surfaces.clear()
+        self.bytes = 0
+
+TEXT_CACHE = TextCache()
+
+class AnimationClock:
+    """Measures elapsed time in 60 fps frames, so animations keep their speed at any frame rate"""
+    MAX_STEP = 10  # Frames one step may advance, so animations don't jump after an idle pause
+    
+    def __init__(self):
+        self.last_tick = pygame.time.get_ticks()
+    
+    def step(self):
+        """Frames elapsed since the previous step"""
+        now = pygame.time.get_ticks()
+        frames = min((now - self.last_tick) * 60 / 1000, self.MAX_STEP)
+        self.last_tick = now
+        return frames
 
 class AnimatedPiece:
     """Animated checker piece for decorative purposes"""
@@ -256,44 +943,19 @@ class AnimatedPiece:
         self.float_offset = 0
         self.king = random.choice([True, False])
         
-    def update(self):
+    def update(self, frames=1):
         """Update animation"""
-        self.angle += 0.02 * self.speed
+        self.angle += 0.02 * self.speed * frames
         self.float_offset = math.sin(self.angle) * 3
         
     def draw(self, win):
         """Draw animated piece"""
-        # Draw shadow
-        shadow_x = int(self.x + 2)
-        shadow_y = int(self.y + self.float_offset + 2)
-        pygame.draw.circle(win, (0, 0, 0, 50), (shadow_x, shadow_y), int(self.radius))
-        
-        # Draw piece
         piece_x = int(self.x)
         piece_y = int(self.y + self.float_offset)
         
-        # Gradient effect
-        for i in range(5, 0, -1):
-            shade = 20 * i
-            if self.color == RED:
-                draw_color = (min(255, self.color[0] + shade), 
-                             max(0, self.color[1] - shade), 
-                             max(0, self.color[2] - shade))
-            else:
-                draw_color = (min(255, self.color[0] + shade), 
-                             min(255, self.color[1] + shade), 
-                             min(255, self.color[2] + shade))
-            
-            pygame.draw.circle(win, draw_color, (piece_x, piece_y), int(self.radius - (5 - i)))
-        
-        # Draw outline
-        pygame.draw.circle(win, BLACK, (piece_x, piece_y), int(self.radius), 2)
-        
-        # Draw king crown if applicable
-        if self.king:
-            crown_radius = int(self.radius // 2)
-            pygame.draw.circle(win, GOLD, (piece_x, piece_y), crown_radius)
-            pygame.draw.circle(win, BLACK, (piece_x, piece_y), crown_radius, 1)
+        # Shadow, gradient, outline and crown come pre-rendered
+        sprite, offset = SPRITES.decoration(self.color, int(self.radius), self.king)
+        win.blit(sprite, (piece_x - offset, piece_y - offset))
 
 class LoginScreen:
     def __init__(self, win):
@@ -310,6 +972,7 @@ class LoginScreen:
         self.animated_pieces = []
         self.board_pattern = []
         self.title_pulse = 0
+        self.animation_clock = AnimationClock()
         self.create_background_elements()
         
     def create_background_elements(self):
@@ -333,10 +996,12 @@ class LoginScreen:
             speed = random.uniform(0.5, 1.5)
             self.animated_pieces.append(AnimatedPiece(x, y, color, speed))
     
-    def draw_background(self):
-        """Draw animated checkerboard background"""
+    def render_background(self):
+        """Render the static checkerboard pattern behind the animated pieces"""
+        layer = pygame.Surface((WIDTH, HEIGHT))
+        
         # Fill with dark background
-        self.win.fill((20, 20, 30))
+        layer.fill((20, 20, 30))
         
         # Draw subtle checkerboard pattern
         pattern_size = 40
@@ -346,11 +1011,32 @@ class LoginScreen:
                 # Make it very subtle
                 alpha_color = (color[0] // 8, color[1] // 8, color[2] // 8)
                 rect = pygame.Rect(col * pattern_size, row * pattern_size, pattern_size, pattern_size)
-                pygame.draw.rect(self.win, alpha_color, rect)
+                pygame.draw.rect(layer, alpha_color, rect)
+        
+        return layer
+    
+    @staticmethod
+    def render_button():
+        """Render the login button's vertical gradient"""
+        button_surface = pygame.Surface((150, 50), pygame.SRCALPHA)
+        for i in range(50):
+            ratio = i / 50
+            color = (
+                int(BLUE[0] * (1 - ratio * 0.3)),
+                int(BLUE[1] * (1 - ratio * 0.3)),
+                int(BLUE[2] * (1 - ratio * 0.3))
+            )
+            pygame.draw.rect(button_surface, color, (0, i, 150, 1))
+        return button_surface
+    
+    def draw_background(self, frames=1):
+        """Draw animated checkerboard background"""
+        # Static pattern is rendered once and reused every frame
+        self.win.blit(SPRITES.layer("login_background", self.render_background), (0, 0))
         
         # Draw animated pieces
         for piece in self.animated_pieces:
-            piece.update()
+            piece.update(frames)
             piece.draw(self.win)
         
         # Draw decorative border
@@ -362,11 +1048,13 @@ class LoginScreen:
         
     def draw(self):
         """Draw login screen with enhanced design"""
+        frames = self.animation_clock.step()
+        
         # Draw animated background
-        self.draw_background()
+        self.draw_background(frames)
         
         # Update title pulse
-        self.title_pulse += 0.05
+        self.title_pulse += 0.05 * frames
         
         # Draw main title with enhanced effects
         title_glow = (math.sin(self.title_pulse) + 1) / 2
@@ -377,12 +1065,12 @@ class LoginScreen:
         )
         
         # Draw title shadow
-        shadow_text = FONT_LARGE.render("AI CHECKERS MASTER", True, (0, 0, 0))
+        shadow_text = TEXT_CACHE.render(FONT_LARGE, "AI CHECKERS MASTER", True, (0, 0, 0))
         shadow_rect = shadow_text.get_rect(center=(WIDTH//2 + 3, 103))
         self.win.blit(shadow_text, shadow_rect)
         
         # Draw main title
-        title_text = FONT_LARGE.render("AI CHECKERS MASTER", True, title_color)
+        title_text = FONT_LARGE.render("AI CHECKERS MASTER", True, title_color)  # Colour changes every frame
         title_rect = title_text.get_rect(center=(WIDTH//2, 100))
         
         # Create enhanced glow effect
@@ -397,7 +1085,7 @@ class LoginScreen:
         self.win.blit(title_text, title_rect)
         
         # Draw subtitle
-        subtitle_text = FONT_MEDIUM.render("🏆 Master the Game of Strategy 🏆", True, GOLD)
+        subtitle_text = TEXT_CACHE.render(FONT_MEDIUM, "🏆 Master the Game of Strategy 🏆", True, GOLD)
         subtitle_rect = subtitle_text.get_rect(center=(WIDTH//2, 150))
         self.win.blit(subtitle_text, subtitle_rect)
         
@@ -412,33 +1100,11 @@ class LoginScreen:
             offset_x = math.cos(self.title_pulse + i) * 5
             offset_y = math.sin(self.title_pulse + i) * 3
             
-            # Draw piece
+            # Draw piece (the first two wear a king crown)
             piece_x = int(x + offset_x)
             piece_y = int(y + offset_y)
-            
-            # Shadow
-            pygame.draw.circle(self.win, (0, 0, 0, 100), (piece_x + 2, piece_y + 2), 20)
-            
-            # Piece with gradient
-            for j in range(5, 0, -1):
-                shade = 15 * j
-                if color == RED:
-                    draw_color = (min(255, color[0] + shade), 
-                                 max(0, color[1] - shade), 
-                                 max(0, color[2] - shade))
-                else:
-                    draw_color = (min(255, color[0] + shade), 
-                                 min(255, color[1] + shade), 
-                                 min(255, color[2] + shade))
-                
-                pygame.draw.circle(self.win, draw_color, (piece_x, piece_y), 20 - (5 - j))
-            
-            pygame.draw.circle(self.win, BLACK, (piece_x, piece_y), 20, 2)
-            
-            # King crown
-            if i < 2:
-                pygame.draw.circle(self.win, GOLD, (piece_x, piece_y), 10)
-                pygame.draw.circle(self.win, BLACK, (piece_x, piece_y), 10, 1)
+            sprite, sprite_offset = SPRITES.decoration(color, 20, king=i < 2, shade_step=15, crown_radius=10)
+            self.win.blit(sprite, (piece_x - sprite_offset, piece_y - sprite_offset))
         
         # Draw mode toggle with enhanced styling
         mode_text = "Login" if self.mode == "login" else "Register"
@@ -448,7 +1114,7 @@ class LoginScreen:
         pygame.draw.rect(self.win, (70, 70, 90), toggle_button, border_radius=17)
         pygame.draw.rect(self.win, BLUE, toggle_button, 2, border_radius=17)
         
-        mode_toggle_text = FONT_SMALL.render(toggle_text, True, BLUE)
+        mode_toggle_text = TEXT_CACHE.render(FONT_SMALL, toggle_text, True, BLUE)
         mode_toggle_rect = mode_toggle_text.get_rect(center=toggle_button.center)
         self.win.blit(mode_toggle_text, mode_toggle_rect)
         
@@ -456,22 +1122,18 @@ class LoginScreen:
         form_rect = pygame.Rect(WIDTH//2 - 180, HEIGHT//2 - 120, 360, 280)
         
         # Form background with gradient effect
-        form_surface = pygame.Surface((form_rect.width, form_rect.height), pygame.SRCALPHA)
-        for i in range(form_rect.height):
-            alpha = int(200 - (i / form_rect.height) * 50)
-            color = (50, 50, 70, alpha)
-            pygame.draw.rect(form_surface, color, (0, i, form_rect.width, 1))
-        
+        form_surface = SPRITES.layer("login_form", lambda: SPRITES.render_fade(form_rect.width, form_rect.height,
+                                                                               (50, 50, 70), 200, 150))
         self.win.blit(form_surface, form_rect.topleft)
         pygame.draw.rect(self.win, GOLD, form_rect, 3, border_radius=15)
         
         # Form title with icon
-        form_title = FONT_MEDIUM.render(f"👤 {mode_text}", True, WHITE)
+        form_title = TEXT_CACHE.render(FONT_MEDIUM, f"👤 {mode_text}", True, WHITE)
         form_title_rect = form_title.get_rect(center=(WIDTH//2, form_rect.y + 40))
         self.win.blit(form_title, form_title_rect)
         
         # Email field with enhanced styling
-        email_label = FONT_SMALL.render("📧 Email Address:", True, WHITE)
+        email_label = TEXT_CACHE.render(FONT_SMALL, "📧 Email Address:", True, WHITE)
         self.win.blit(email_label, (form_rect.x + 30, form_rect.y + 80))
         
         email_rect = pygame.Rect(form_rect.x + 30, form_rect.y + 110, 300, 45)
@@ -490,7 +1152,7 @@ class LoginScreen:
         if len(display_email) > 30:
             display_email = display_email[:30] + "..."
         
-        email_text = FONT_SMALL.render(display_email, True, WHITE)
+        email_text = TEXT_CACHE.render(FONT_SMALL, display_email, True, WHITE)
         self.win.blit(email_text, (email_rect.x + 15, email_rect.y + 12))
         
         # Cursor for email field
@@ -502,7 +1164,7 @@ class LoginScreen:
                 pygame.draw.line(self.win, WHITE, (cursor_x, cursor_y1), (cursor_x, cursor_y2), 2)
         
         # Password field with enhanced styling
-        password_label = FONT_SMALL.render("🔒 Password:", True, WHITE)
+        password_label = TEXT_CACHE.render(FONT_SMALL, "🔒 Password:", True, WHITE)
         self.win.blit(password_label, (form_rect.x + 30, form_rect.y + 170))
         
         password_rect = pygame.Rect(form_rect.x + 30, form_rect.y + 200, 300, 45)
@@ -518,7 +1180,7 @@ class LoginScreen:
         
         # Password text (asterisks)
         password_display = "●" * len(self.password_input)
-        password_text = FONT_SMALL.render(password_display, True, WHITE)
+        password_text = TEXT_CACHE.render(FONT_SMALL, password_display, True, WHITE)
         self.win.blit(password_text, (password_rect.x + 15, password_rect.y + 12))
         
         # Cursor for password field
@@ -533,21 +1195,11 @@ class LoginScreen:
         button_rect = pygame.Rect(form_rect.x + 105, form_rect.y + 260, 150, 50)
         
         # Button gradient
-        button_surface = pygame.Surface((button_rect.width, button_rect.height), pygame.SRCALPHA)
-        for i in range(button_rect.height):
-            ratio = i / button_rect.height
-            color = (
-                int(BLUE[0] * (1 - ratio * 0.3)),
-                int(BLUE[1] * (1 - ratio * 0.3)),
-                int(BLUE[2] * (1 - ratio * 0.3))
-            )
-            pygame.draw.rect(button_surface, color, (0, i, button_rect.width, 1))
-        
-        self.win.blit(button_surface, button_rect.topleft)
+        self.win.blit(SPRITES.layer("login_button", self.render_button), button_rect.topleft)
         pygame.draw.rect(self.win, WHITE, button_rect, 2, border_radius=25)
         
         # Button text
-        button_text = FONT_SMALL.render(f"🚀 {mode_text}", True, WHITE)
+        button_text = TEXT_CACHE.render(FONT_SMALL, f"🚀 {mode_text}", True, WHITE)
         button_text_rect = button_text.get_rect(center=button_rect.center)
         self.win.blit(button_text, button_text_rect)
         
@@ -580,7 +1232,7 @@ class LoginScreen:
             
             # Draw each line
             for i, line in enumerate(lines):
-                error_text = FONT_SMALL.render(f"⚠️ {line}", True, RED)
+                error_text = TEXT_CACHE.render(FONT_SMALL, f"⚠️ {line}", True, RED)
                 error_rect = error_text.get_rect(center=(WIDTH//2, error_y + i * 25))
                 self.win.blit(error_text, error_rect)
         
@@ -591,14 +1243,14 @@ class LoginScreen:
             pygame.draw.rect(self.win, (20, 100, 20, 200), success_bg, border_radius=10)
             pygame.draw.rect(self.win, GREEN, success_bg, 2, border_radius=10)
             
-            success_text = FONT_SMALL.render(f"✅ {self.success_message}", True, GREEN)
+            success_text = TEXT_CACHE.render(FONT_SMALL, f"✅ {self.success_message}", True, GREEN)
             success_rect = success_text.get_rect(center=(WIDTH//2, success_y + 12))
             self.win.blit(success_text, success_rect)
         
         # Firestore indicator with enhanced styling
         firestore_bg = pygame.Rect(5, HEIGHT - 35, 250, 30)
         pygame.draw.rect(self.win, (20, 60, 20, 150), firestore_bg, border_radius=15)
-        firestore_text = FONT_TINY.render("💾 Powered by Cloud Firestore", True, (100, 200, 100))
+        firestore_text = TEXT_CACHE.render(FONT_TINY, "💾 Powered by Cloud Firestore", True, (100, 200, 100))
         self.win.blit(firestore_text, (15, HEIGHT - 30))
     
     def handle_event(self, event):
@@ -702,6 +1354,8 @@ class GameMenu:
             "Human vs AI (Easy)",
             "Human vs AI (Medium)",
             "Human vs AI (Hard)",
+            "Online Match",
+            "Watch Live",
             "View Statistics",
             "Logout"
         ]
@@ -709,9 +1363,11 @@ class GameMenu:
         self.game_mode = None
         self.show_stats = False
         self.user_stats = None
+        self.stats_version = None
         
         # Animation variables
         self.menu_pulse = 0
+        self.animation_clock = AnimationClock()
         self.floating_pieces = []
         self.create_menu_decorations()
     
@@ -725,8 +1381,11 @@ class GameMenu:
             speed = random.uniform(0.3, 0.8)
             self.floating_pieces.append(AnimatedPiece(x, y, color, speed))
     
-    def draw_background(self):
-        """Draw animated background for menu"""
+    @staticmethod
+    def render_background():
+        """Render the static gradient behind the floating pieces"""
+        layer = pygame.Surface((WIDTH, HEIGHT))
+        
         # Gradient background
         for y in range(HEIGHT):
             ratio = y / HEIGHT
@@ -735,35 +1394,52 @@ class GameMenu:
                 int(20 + ratio * 30),
                 int(40 + ratio * 20)
             )
-            pygame.draw.line(self.win, color, (0, y), (WIDTH, y))
+            pygame.draw.line(layer, color, (0, y), (WIDTH, y))
+        
+        return layer
+    
+    @staticmethod
+    def render_corner():
+        """Render one decorative checkerboard corner"""
+        corner_size = 60
+        corner = pygame.Surface((corner_size, corner_size))
+        for row in range(corner_size // 10):
+            for col in range(corner_size // 10):
+                if (row + col) % 2 == 0:
+                    color = BROWN
+                else:
+                    color = CREAM
+                
+                # Make it subtle
+                alpha_color = (color[0] // 4, color[1] // 4, color[2] // 4)
+                pygame.draw.rect(corner, alpha_color, (col * 10, row * 10, 10, 10))
+        return corner
+    
+    def draw_background(self, frames=1):
+        """Draw animated background for menu"""
+        # Gradient background
+        self.win.blit(SPRITES.layer("menu_background", self.render_background), (0, 0))
         
         # Draw floating pieces
         for piece in self.floating_pieces:
-            piece.update()
+            piece.update(frames)
             piece.draw(self.win)
         
         # Draw decorative checkerboard corners
-        corner_size = 60
+        corner = SPRITES.layer("menu_corner", self.render_corner)
+        corner_size = corner.get_width()
         for corner_x, corner_y in [(0, 0), (WIDTH - corner_size, 0), (0, HEIGHT - corner_size), (WIDTH - corner_size, HEIGHT - corner_size)]:
-            for row in range(corner_size // 10):
-                for col in range(corner_size // 10):
-                    if (row + col) % 2 == 0:
-                        color = BROWN
-                    else:
-                        color = CREAM
-                    
-                    # Make it subtle
-                    alpha_color = (color[0] // 4, color[1] // 4, color[2] // 4)
-                    rect = pygame.Rect(corner_x + col * 10, corner_y + row * 10, 10, 10)
-                    pygame.draw.rect(self.win, alpha_color, rect)
+            self.win.blit(corner, (corner_x, corner_y))
     
     def draw(self):
         """Draw the game menu with enhanced design"""
+        frames = self.animation_clock.step()
+        
         # Draw animated background
-        self.draw_background()
+        self.draw_background(frames)
         
         # Update animation
-        self.menu_pulse += 0.03
+        self.menu_pulse += 0.03 * frames
         
         if self.show_stats:
             self.draw_stats()
@@ -781,12 +1457,12 @@ class GameMenu:
         )
         
         # Title shadow
-        shadow_text = FONT_LARGE.render("AI CHECKERS MASTER", True, (0, 0, 0))
+        shadow_text = TEXT_CACHE.render(FONT_LARGE, "AI CHECKERS MASTER", True, (0, 0, 0))
         shadow_rect = shadow_text.get_rect(center=(WIDTH//2 + 3, 103))
         self.win.blit(shadow_text, shadow_rect)
         
         # Main title
-        title_text = FONT_LARGE.render("AI CHECKERS MASTER", True, title_color)
+        title_text = FONT_LARGE.render("AI CHECKERS MASTER", True, title_color)  # Colour changes every frame
         title_rect = title_text.get_rect(center=(WIDTH//2, 100))
         
         # Enhanced glow effect
@@ -801,7 +1477,7 @@ class GameMenu:
         self.win.blit(title_text, title_rect)
         
         # Draw welcome message with crown
-        welcome_text = FONT_MEDIUM.render(f"👑 Welcome, {self.username}! 👑", True, GOLD)
+        welcome_text = TEXT_CACHE.render(FONT_MEDIUM, f"👑 Welcome, {self.username}! 👑", True, GOLD)
         welcome_rect = welcome_text.get_rect(center=(WIDTH//2, 180))
         
         # Welcome message background
@@ -812,20 +1488,16 @@ class GameMenu:
         self.win.blit(welcome_text, welcome_rect)
         
         # Draw enhanced menu options
-        menu_rect = pygame.Rect(WIDTH//2 - 200, 230, 400, 420)
+        menu_rect = pygame.Rect(WIDTH//2 - 200, 230, 400, 90 + len(self.options) * 55)
         
         # Menu background with gradient
-        menu_surface = pygame.Surface((menu_rect.width, menu_rect.height), pygame.SRCALPHA)
-        for i in range(menu_rect.height):
-            alpha = int(180 - (i / menu_rect.height) * 60)
-            color = (40, 40, 60, alpha)
-            pygame.draw.rect(menu_surface, color, (0, i, menu_rect.width, 1))
-        
+        menu_surface = SPRITES.layer("menu_panel", lambda: SPRITES.render_fade(menu_rect.width, menu_rect.height,
+                                                                               (40, 40, 60), 180, 120))
         self.win.blit(menu_surface, menu_rect.topleft)
         pygame.draw.rect(self.win, GOLD, menu_rect, 3, border_radius=20)
         
         # Menu title
-        menu_title = FONT_MEDIUM.render("🎮 Game Modes", True, WHITE)
+        menu_title = TEXT_CACHE.render(FONT_MEDIUM, "🎮 Game Modes", True, WHITE)
         menu_title_rect = menu_title.get_rect(center=(WIDTH//2, menu_rect.y + 30))
         self.win.blit(menu_title, menu_title_rect)
         
@@ -854,10 +1526,10 @@ class GameMenu:
                 text_color = LIGHT_GRAY
             
             # Option icons and text
-            icons = ["👥", "🤖", "🧠", "🔥", "📊", "🚪"]
+            icons = ["👥", "🤖", "🧠", "🔥", "🌐", "👀", "📊", "🚪"]
             option_text = f"{icons[i]} {option}"
             
-            text_surface = FONT_SMALL.render(option_text, True, text_color)
+            text_surface = TEXT_CACHE.render(FONT_SMALL, option_text, True, text_color)
             text_rect = text_surface.get_rect(center=option_rect.center)
             self.win.blit(text_surface, text_rect)
             
@@ -876,7 +1548,7 @@ class GameMenu:
         # Firestore indicator
         firestore_bg = pygame.Rect(5, HEIGHT - 35, 280, 30)
         pygame.draw.rect(self.win, (20, 60, 20, 150), firestore_bg, border_radius=15)
-        firestore_text = FONT_TINY.render("💾 Your progress saved in Cloud Firestore", True, (100, 200, 100))
+        firestore_text = TEXT_CACHE.render(FONT_TINY, "💾 Your progress saved in Cloud Firestore", True, (100, 200, 100))
         self.win.blit(firestore_text, (15, HEIGHT - 30))
     
     def draw_menu_decorations(self):
@@ -895,37 +1567,26 @@ class GameMenu:
             piece_x = int(x + offset_x)
             piece_y = int(y + offset_y)
             
-            # Shadow
-            pygame.draw.circle(self.win, (0, 0, 0, 80), (piece_x + 3, piece_y + 3), 25)
-            
-            # Piece with gradient
-            for j in range(6, 0, -1):
-                shade = 20 * j
-                if color == RED:
-                    draw_color = (min(255, color[0] + shade), 
-                                 max(0, color[1] - shade), 
-                                 max(0, color[2] - shade))
-                else:
-                    draw_color = (min(255, color[0] + shade), 
-                                 min(255, color[1] + shade), 
-                                 min(255, color[2] + shade))
-                
-                pygame.draw.circle(self.win, draw_color, (piece_x, piece_y), 25 - (6 - j))
-            
-            pygame.draw.circle(self.win, BLACK, (piece_x, piece_y), 25, 3)
-            
-            # King crown
-            pygame.draw.circle(self.win, GOLD, (piece_x, piece_y), 12)
-            pygame.draw.circle(self.win, BLACK, (piece_x, piece_y), 12, 2)
+            # Crowned piece with gradient and shadow
+            sprite, sprite_offset = SPRITES.decoration(color, 25, king=True, rings=6, outline_width=3,
+                                                       crown_radius=12, crown_width=2, shadow_offset=3)
+            self.win.blit(sprite, (piece_x - sprite_offset, piece_y - sprite_offset))
     
     def draw_stats(self):
         """Draw user statistics with enhanced styling"""
+        # Re-read the local store whenever the background sync has changed it
+        if self.firebase_auth and self.firebase_auth.local_id:
+            store = get_stats_store()
+            if self.stats_version != store.version:
+                self.stats_version = store.version
+                self.user_stats = store.get_stats(self.firebase_auth.local_id)
+        
         # Back button with enhanced styling
         back_rect = pygame.Rect(50, 150, 120, 50)
         pygame.draw.rect(self.win, (70, 70, 90), back_rect, border_radius=25)
         pygame.draw.rect(self.win, BLUE, back_rect, 3, border_radius=25)
         
-        back_text = FONT_SMALL.render("← Back", True, WHITE)
+        back_text = TEXT_CACHE.render(FONT_SMALL, "← Back", True, WHITE)
         back_text_rect = back_text.get_rect(center=back_rect.center)
         self.win.blit(back_text, back_text_rect)
         
@@ -933,21 +1594,27 @@ class GameMenu:
         stats_rect = pygame.Rect(WIDTH//2 - 250, 200, 500, 400)
         
         # Stats background with gradient
-        stats_surface = pygame.Surface((stats_rect.width, stats_rect.height), pygame.SRCALPHA)
-        for i in range(stats_rect.height):
-            alpha = int(200 - (i / stats_rect.height) * 50)
-            color = (40, 40, 70, alpha)
-            pygame.draw.rect(stats_surface, color, (0, i, stats_rect.width, 1))
-        
+        stats_surface = SPRITES.layer("stats_panel", lambda: SPRITES.render_fade(stats_rect.width, stats_rect.height,
+                                                                                 (40, 40, 70), 200, 150))
         self.win.blit(stats_surface, stats_rect.topleft)
         pygame.draw.rect(self.win, GOLD, stats_rect, 4, border_radius=20)
         
         # Stats title
-        stats_title = FONT_MEDIUM.render("📊 Your Game Statistics", True, WHITE)
+        stats_title = TEXT_CACHE.render(FONT_MEDIUM, "📊 Your Game Statistics", True, WHITE)
         stats_title_rect = stats_title.get_rect(center=(WIDTH//2, 240))
         self.win.blit(stats_title, stats_title_rect)
         
         if self.user_stats:
+            # Sync status
+            if self.user_stats['pending']:
+                sync_text = f"⏳ {self.user_stats['pending']} game(s) waiting to sync"
+            elif self.user_stats['synced_at']:
+                sync_text = f"☁️ Synced {self.user_stats['synced_at'][11:16]}"
+            else:
+                sync_text = "☁️ Not synced yet"
+            sync_render = TEXT_CACHE.render(FONT_TINY, sync_text, True, LIGHT_GRAY)
+            self.win.blit(sync_render, sync_render.get_rect(center=(WIDTH//2, 270)))
+            
             y_offset = 300
             games = self.user_stats.get('games_played', 0)
             wins = self.user_stats.get('wins', 0)
@@ -968,15 +1635,15 @@ class GameMenu:
                 pygame.draw.rect(self.win, color, item_rect, 2, border_radius=15)
                 
                 # Icon
-                icon_text = FONT_MEDIUM.render(icon, True, color)
+                icon_text = TEXT_CACHE.render(FONT_MEDIUM, icon, True, color)
                 self.win.blit(icon_text, (item_rect.x + 20, item_rect.y + 10))
                 
                 # Label
-                label_text = FONT_SMALL.render(label, True, WHITE)
+                label_text = TEXT_CACHE.render(FONT_SMALL, label, True, WHITE)
                 self.win.blit(label_text, (item_rect.x + 70, item_rect.y + 15))
                 
                 # Value
-                value_text = FONT_SMALL.render(value, True, color)
+                value_text = TEXT_CACHE.render(FONT_SMALL, value, True, color)
                 value_rect = value_text.get_rect(right=item_rect.right - 20, centery=item_rect.centery)
                 self.win.blit(value_text, value_rect)
                 
@@ -984,19 +1651,19 @@ class GameMenu:
             
             # Achievement badges
             if games >= 10:
-                badge_text = FONT_SMALL.render("🎖️ Veteran Player", True, GOLD)
+                badge_text = TEXT_CACHE.render(FONT_SMALL, "🎖️ Veteran Player", True, GOLD)
                 badge_rect = badge_text.get_rect(center=(WIDTH//2, y_offset + 20))
                 self.win.blit(badge_text, badge_rect)
             
             if win_rate >= 70:
-                master_text = FONT_SMALL.render("👑 Checkers Master", True, GOLD)
+                master_text = TEXT_CACHE.render(FONT_SMALL, "👑 Checkers Master", True, GOLD)
                 master_rect = master_text.get_rect(center=(WIDTH//2, y_offset + 50))
                 self.win.blit(master_text, master_rect)
                 
         else:
             # Loading animation
             loading_dots = "." * (int(time.time() * 2) % 4)
-            loading_text = FONT_SMALL.render(f"Loading your stats{loading_dots}", True, LIGHT_GRAY)
+            loading_text = TEXT_CACHE.render(FONT_SMALL, f"Loading your stats{loading_dots}", True, LIGHT_GRAY)
             loading_rect = loading_text.get_rect(center=(WIDTH//2, 400))
             self.win.blit(loading_text, loading_rect)
     
@@ -1013,7 +1680,7 @@ class GameMenu:
                     return None
             else:
                 # Check if any menu option was clicked
-                menu_rect = pygame.Rect(WIDTH//2 - 200, 230, 400, 420)
+                menu_rect = pygame.Rect(WIDTH//2 - 200, 230, 400, 90 + len(self.options) * 55)
                 for i, option in enumerate(self.options):
                     option_rect = pygame.Rect(menu_rect.x + 30, menu_rect.y + 70 + i * 55, 340, 45)
                     if option_rect.collidepoint(mouse_pos):
@@ -1049,11 +1716,18 @@ class GameMenu:
             else:
                 self.ai_difficulty = "hard"
             return "start_game"
+        elif selected == "Online Match":
+            self.game_mode = "online"
+            return "start_game"
+        elif selected == "Watch Live":
+            self.game_mode = "spectate"
+            return "start_game"
         elif selected == "View Statistics":
             self.show_stats = True
-            # Load user stats
+            # Stats are read from the local store at once; a background sync refreshes them
+            self.stats_version = None
             if self.firebase_auth:
-                self.user_stats = self.firebase_auth.get_user_profile()
+                self.firebase_auth.stats_queue.request_sync()
             return None
         elif selected == "Logout":
             return "logout"
@@ -1089,38 +1763,9 @@ class Piece:
 
     def draw(self, win):
         """Draw the piece on the board with enhanced visuals"""
-        radius = SQUARE_SIZE // 2 - self.PADDING
-        
-        # Draw glow effect if selected
-        if self.selected:
-            glow_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, GLOW_BLUE, 
-                             (SQUARE_SIZE//2, SQUARE_SIZE//2), 
-                             radius + self.GLOW_SIZE)
-            win.blit(glow_surface, (self.x - SQUARE_SIZE//2, self.y - SQUARE_SIZE//2))
-        
-        # Draw piece with gradient effect
-        for i in range(5, 0, -1):
-            shade = 20 * i
-            if self.color == RED:
-                draw_color = (min(255, self.color[0] + shade), 
-                             max(0, self.color[1] - shade), 
-                             max(0, self.color[2] - shade))
-            else:
-                draw_color = (min(255, self.color[0] + shade), 
-                             min(255, self.color[1] + shade), 
-                             min(255, self.color[2] + shade))
-            
-            pygame.draw.circle(win, draw_color, (self.x, self.y), radius - (5 - i))
-        
-        # Draw outline
-        pygame.draw.circle(win, BLACK, (self.x, self.y), radius + 1, 1)
-        
-        # Draw king crown
-        if self.king:
-            crown_radius = radius // 2
-            pygame.draw.circle(win, GOLD, (self.x, self.y), crown_radius)
-            pygame.draw.circle(win, BLACK, (self.x, self.y), crown_radius, 1)
+        # Gradient, outline, crown and selection glow are pre-rendered per state
+        sprite = SPRITES.board_piece(self.color, self.king, self.selected)
+        win.blit(sprite, (self.x - SQUARE_SIZE//2, self.y - SQUARE_SIZE//2))
 
     def move(self, row, col):
         """Move the piece to a new position"""
@@ -1137,6 +1782,93 @@ class Piece:
         copy_piece.king = self.king
         return copy_piece
 
+def square_index(row, col):
+    """Index (0-31) of a dark square, counted row by row from the top"""
+    return row * 4 + col // 2
+
+def square_coords(index):
+    """(row, col) of a dark square index"""
+    row = index // 4
+    return row, (index % 4) * 2 + (1 - row % 2)
+
+def square_rect(row, col):
+    """Screen rectangle of a board square"""
+    return pygame.Rect(BOARD_OFFSET_X + col * SQUARE_SIZE, BOARD_OFFSET_Y + row * SQUARE_SIZE,
+                       SQUARE_SIZE, SQUARE_SIZE)
+
+def piece_kind(piece):
+    """Piece type index: 0 red man, 1 red king, 2 white man, 3 white king"""
+    return (0 if piece.color == RED else 2) + (1 if piece.king else 0)
+
+def move_changes(piece, move, skipped):
+    """(input turned on, inputs turned off) by a move, as value network inputs (kind * 32 + square)"""
+    kind = piece_kind(piece)
+    removed = [kind * 32 + square_index(piece.row, piece.col)]
+    if not piece.king and move[0] == (0 if piece.color == RED else ROWS - 1):
+        kind += 1  # Crowned
+    for captured in skipped:
+        removed.append(piece_kind(captured) * 32 + square_index(captured.row, captured.col))
+    return kind * 32 + square_index(*move), removed
+
+def _make_zobrist_keys():
+    """Random 64-bit keys for every (square, piece type) pair plus the side to move"""
+    rng = random.Random(ZOBRIST_SEED)
+    piece_keys = [[rng.getrandbits(64) for _ in range(4)] for _ in range(32)]
+    return piece_keys, rng.getrandbits(64)
+
+ZOBRIST_PIECES, ZOBRIST_RED_TO_MOVE = _make_zobrist_keys()
+
+# Squares each piece type may stand on (men never stand on their promotion row)
+TABLEBASE_SQUARES = (list(range(4, 32)), list(range(32)), list(range(0, 28)), list(range(32)))
+
+def material_signature(board):
+    """(red men, red kings, white men, white kings) on the board"""
+    counts = [0, 0, 0, 0]
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.board[row][col]
+            if piece != 0:
+                counts[piece_kind(piece)] += 1
+    return tuple(counts)
+
+def tablebase_size(signature):
+    """Number of index slots in the table for a material signature"""
+    size = 2
+    for kind, count in enumerate(signature):
+        size *= math.comb(len(TABLEBASE_SQUARES[kind]), count)
+    return size
+
+def tablebase_index(squares_by_kind, turn):
+    """Perfect hash of a position into its signature's table
+    
+    squares_by_kind holds the sorted square indices of each piece type. Each
+    type's squares are ranked with the combinatorial number system and the
+    ranks are combined with the side to move, so no two positions collide.
+    """
+    index = 0
+    for kind, squares in enumerate(squares_by_kind):
+        allowed = TABLEBASE_SQUARES[kind]
+        offset = allowed[0]
+        rank = 0
+        for i, square in enumerate(squares):
+            rank += math.comb(square - offset, i + 1)
+        index = index * math.comb(len(allowed), len(squares)) + rank
+    return index * 2 + (0 if turn == RED else 1)
+
+def load_eval_weights(path=EVAL_WEIGHTS_FILE):
+    """Evaluation weights in EVAL_FEATURES order: tuned ones from path if it exists, otherwise the defaults"""
+    weights = dict(DEFAULT_EVAL_WEIGHTS)
+    try:
+        with open(path) as f:
+            weights.update(json.load(f)["weights"])
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ Ignoring {path}: {e}")
+    return tuple(float(weights[name]) for name in EVAL_FEATURES)
+
+EVAL_WEIGHTS = load_eval_weights()
+
 class Board:
     def __init__(self):
         self.board = []
@@ -1144,26 +1876,29 @@ class Board:
         self.red_kings = self.white_kings = 0
         self.create_board()
 
-    def draw_squares(self, win):
-        """Draw the checkerboard pattern with enhanced visuals"""
-        # Draw board background
+    def draw_frame(self, win):
+        """Draw the frame behind the squares"""
         pygame.draw.rect(win, DARK_GRAY, 
                        (BOARD_OFFSET_X - 10, BOARD_OFFSET_Y - 10, 
                         BOARD_SIZE + 20, BOARD_SIZE + 20), 
                         border_radius=5)
+
+    def draw_squares(self, win):
+        """Draw the checkerboard pattern with enhanced visuals"""
+        # Draw board background
+        self.draw_frame(win)
         
         for row in range(ROWS):
             for col in range(COLS):
-                if (row + col) % 2 == 0:
-                    color = LIGHT_GRAY
-                else:
-                    color = BLACK
-                
                 # Draw square
-                pygame.draw.rect(win, color, 
-                               (BOARD_OFFSET_X + col * SQUARE_SIZE, 
-                                BOARD_OFFSET_Y + row * SQUARE_SIZE, 
-                                SQUARE_SIZE, SQUARE_SIZE))
+                pygame.draw.rect(win, LIGHT_GRAY if (row + col) % 2 == 0 else BLACK, square_rect(row, col))
+
+    def draw_square(self, win, row, col):
+        """Draw one square and the piece standing on it"""
+        pygame.draw.rect(win, LIGHT_GRAY if (row + col) % 2 == 0 else BLACK, square_rect(row, col))
+        piece = self.board[row][col]
+        if piece != 0:
+            piece.draw(win)
 
     def create_board(self):
         """Initialize the board with pieces in starting positions"""
@@ -1251,42 +1986,739 @@ class Board:
                     pieces.append(piece)
         return pieces
         
-    def evaluate(self):
-        """Evaluate the board state (positive is good for RED, negative for WHITE)"""
-        # Basic evaluation: piece count and king count
-        piece_value = (self.red_left - self.white_left)
-        king_value = (self.red_kings - self.white_kings) * 0.5
+    @classmethod
+    def from_pieces(cls, pieces):
+        """Create a board holding only the given (row, col, color, king) pieces"""
+        board = cls.__new__(cls)
+        board.board = [[0] * COLS for _ in range(ROWS)]
+        board.red_left = board.white_left = 0
+        board.red_kings = board.white_kings = 0
+        
+        for row, col, color, king in pieces:
+            piece = Piece(row, col, color)
+            if king:
+                piece.make_king()
+            board.board[row][col] = piece
+            if color == RED:
+                board.red_left += 1
+                board.red_kings += 1 if king else 0
+            else:
+                board.white_left += 1
+                board.white_kings += 1 if king else 0
         
-        # Advanced evaluation: position value
-        position_value = 0
+        return board
+    
+    def bitboards(self):
+        """One 32-bit mask of dark squares per piece type (see piece_kind)"""
+        bitboards = [0, 0, 0, 0]
+        bit = 1
+        for row in range(ROWS):
+            for col in range(1 - row % 2, COLS, 2):  # Dark squares only, in square_index order
+                piece = self.board[row][col]
+                if piece != 0:
+                    bitboards[piece_kind(piece)] |= bit
+                bit <<= 1
+        return tuple(bitboards)
+    
+    @classmethod
+    def from_bitboards(cls, bitboards):
+        """Create a board from the masks returned by bitboards"""
+        pieces = []
+        for kind, bits in enumerate(bitboards):
+            while bits:
+                lowest = bits & -bits
+                row, col = square_coords(lowest.bit_length() - 1)
+                pieces.append((row, col, RED if kind < 2 else WHITE, kind % 2 == 1))
+                bits ^= lowest
+        return cls.from_pieces(pieces)
+    
+    def hash_key(self, turn):
+        """64-bit Zobrist hash of the position with turn to move"""
+        key = ZOBRIST_RED_TO_MOVE if turn == RED else 0
         for row in range(ROWS):
             for col in range(COLS):
                 piece = self.board[row][col]
                 if piece != 0:
-                    # Pieces closer to promotion are more valuable
-                    if piece.color == RED:
-                        position_value += (ROWS - 1 - row) * 0.05
-                    else:
-                        position_value -= row * 0.05
-                    
-                    # Center control is valuable
-                    center_distance = abs(col - 3.5) + abs(row - 3.5)
+                    key ^= ZOBRIST_PIECES[square_index(row, col)][piece_kind(piece)]
+        return key
+    
+    def eval_features(self):
+        """Red-minus-white values of the evaluation features, in EVAL_FEATURES order"""
+        kings = advancement = center = back_row = 0
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.board[row][col]
+                if piece != 0:
+                    # Pieces closer to promotion and nearer the center are more valuable;
+                    # men left on the home row stop the opponent from crowning
+                    center_value = 7 - abs(col - 3.5) - abs(row - 3.5)
                     if piece.color == RED:
-                        position_value += (7 - center_distance) * 0.02
+                        advancement += ROWS - 1 - row
+                        center += center_value
+                        if piece.king:
+                            kings += 1
+                        elif row == ROWS - 1:
+                            back_row += 1
                     else:
-                        position_value -= (7 - center_distance) * 0.02
-        
-        return piece_value + king_value + position_value
+                        advancement -= row
+                        center -= center_value
+                        if piece.king:
+                            kings -= 1
+                        elif row == 0:
+                            back_row -= 1
+        return (self.red_left - self.white_left, kings, advancement, center, back_row)
+    
+    def evaluate(self):
+        """Evaluate the board state (positive is good for RED, negative for WHITE)"""
+        material, kings, advancement, center, back_row = self.eval_features()
+        w_material, w_kings, w_advancement, w_center, w_back_row = EVAL_WEIGHTS
+        return (w_material * material + w_kings * kings + w_advancement * advancement
+                + w_center * center + w_back_row * back_row)
 
-class Game:
-    def __init__(self, win, username=None, game_mode="human_vs_human", ai_difficulty=None, firebase_auth=None):
-        self.win = win
-        self.username = username
-        self.board = Board()
-        self.turn = RED
-        self.selected = None
-        self.valid_moves = {}
-        self.game_over = False
+class OpeningBook:
+    """Read-only opening book memory-mapped from a sorted binary table
+    
+    The file is a header followed by fixed-size records (position hash,
+    from square, to square, weight) sorted by hash, so a position's moves
+    are found by binary search without parsing the file.
+    """
+    MAGIC = b"CKOB"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHI")   # magic, version, record size, record count
+    RECORD = struct.Struct("<QBBH")    # position hash, from square, to square, weight
+    KEY = struct.Struct("<Q")
+    
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is empty")
+        
+        magic, version, record_size, self.count = self.HEADER.unpack_from(self.mmap, 0)
+        expected_size = self.HEADER.size + self.count * self.RECORD.size
+        if magic != self.MAGIC or version != self.VERSION or record_size != self.RECORD.size or len(self.mmap) != expected_size:
+            self.close()
+            raise ValueError(f"{path} is not a valid opening book")
+    
+    def close(self):
+        """Release the memory map and file"""
+        self.mmap.close()
+        self.file.close()
+    
+    def _key_at(self, index):
+        return self.KEY.unpack_from(self.mmap, self.HEADER.size + index * self.RECORD.size)[0]
+    
+    def lookup(self, key):
+        """Return [(from_square, to_square, weight), ...] stored for a position hash"""
+        # Binary search for the first record with this key
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        
+        entries = []
+        offset = self.HEADER.size + low * self.RECORD.size
+        while low < self.count:
+            record_key, from_square, to_square, weight = self.RECORD.unpack_from(self.mmap, offset)
+            if record_key != key:
+                break
+            entries.append((from_square, to_square, weight))
+            low += 1
+            offset += self.RECORD.size
+        return entries
+    
+    def choose(self, board, turn):
+        """Pick a weighted random book move, returned as ((from_row, from_col), (to_row, to_col)) or None"""
+        entries = self.lookup(board.hash_key(turn))
+        if not entries:
+            return None
+        from_square, to_square, _ = random.choices(entries, weights=[entry[2] for entry in entries])[0]
+        return square_coords(from_square), square_coords(to_square)
+    
+    @classmethod
+    def write(cls, path, records):
+        """Write (key, from_square, to_square, weight) records as a sorted book file"""
+        records = sorted(records)
+        with open(path, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.RECORD.size, len(records)))
+            for record in records:
+                f.write(cls.RECORD.pack(*record))
+
+class EndgameTablebase:
+    """Exact win/loss/draw results for positions with few pieces
+    
+    Each material signature has its own file in the tablebase directory: a
+    header followed by one 16-bit entry per tablebase_index slot, holding
+    the result for the side to move in the low two bits and the number of
+    plies to the end of the game above them. Files are memory-mapped on
+    first use.
+    """
+    MAGIC = b"CKTB"
+    VERSION = 1
+    HEADER = struct.Struct("<4sH4BI")  # magic, version, signature, entry count
+    ENTRY = struct.Struct("<H")
+    INVALID, DRAW, WIN, LOSS = 0, 1, 2, 3
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.max_pieces = 0
+        for name in os.listdir(directory):
+            signature = self.parse_filename(name)
+            if signature:
+                self.max_pieces = max(self.max_pieces, sum(signature))
+    
+    @staticmethod
+    def filename(signature):
+        return "tb_{}{}{}{}.bin".format(*signature)
+    
+    @staticmethod
+    def parse_filename(name):
+        """Material signature of a table file name, or None"""
+        if name.startswith("tb_") and name.endswith(".bin") and len(name) == 11 and name[3:7].isdigit():
+            return tuple(int(digit) for digit in name[3:7])
+        return None
+    
+    def _table(self, signature):
+        """Memory map of a signature's table, or None if it was not generated"""
+        if signature in self.tables:
+            return self.tables[signature]
+        
+        with self.lock:
+            if signature not in self.tables:
+                table = None
+                path = os.path.join(self.directory, self.filename(signature))
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    magic, version, *file_signature, count = self.HEADER.unpack_from(table, 0)
+                    if (magic != self.MAGIC or version != self.VERSION or tuple(file_signature) != signature
+                            or count != tablebase_size(signature)
+                            or len(table) != self.HEADER.size + count * self.ENTRY.size):
+                        print(f"❌ Ignoring invalid tablebase file {path}")
+                        table.close()
+                        table = None
+                self.tables[signature] = table
+        return self.tables[signature]
+    
+    def probe(self, board, turn):
+        """Return (result, plies) for turn to move, or None if the position is not covered"""
+        if board.red_left + board.white_left > self.max_pieces or not board.red_left or not board.white_left:
+            return None
+        
+        squares_by_kind = ([], [], [], [])
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board.board[row][col]
+                if piece != 0:
+                    squares_by_kind[piece_kind(piece)].append(square_index(row, col))
+        
+        table = self._table(tuple(len(squares) for squares in squares_by_kind))
+        if table is None:
+            return None
+        
+        offset = self.HEADER.size + tablebase_index(squares_by_kind, turn) * self.ENTRY.size
+        entry = self.ENTRY.unpack_from(table, offset)[0]
+        result = entry & 3
+        if result == self.INVALID:
+            return None
+        return result, entry >> 2
+
+_endgame_tablebase = None
+_endgame_tablebase_loaded = False
+
+def get_endgame_tablebase():
+    """Open the endgame tablebases on first use; returns None if none were generated"""
+    global _endgame_tablebase, _endgame_tablebase_loaded
+    if not _endgame_tablebase_loaded:
+        _endgame_tablebase_loaded = True
+        if os.path.isdir(TABLEBASE_DIR):
+            tablebase = EndgameTablebase(TABLEBASE_DIR)
+            if tablebase.max_pieces:
+                _endgame_tablebase = tablebase
+                print(f"🏁 Endgame tablebases loaded: up to {tablebase.max_pieces} pieces")
+    return _endgame_tablebase
+
+_opening_book = None
+_opening_book_loaded = False
+
+def get_opening_book():
+    """Load the opening book on first use; returns None if there is no usable book"""
+    global _opening_book, _opening_book_loaded
+    if not _opening_book_loaded:
+        _opening_book_loaded = True
+        if os.path.exists(OPENING_BOOK_FILE):
+            try:
+                _opening_book = OpeningBook(OPENING_BOOK_FILE)
+                print(f"📖 Opening book loaded: {_opening_book.count} moves")
+            except (OSError, ValueError) as e:
+                print(f"❌ Error loading opening book: {e}")
+    return _opening_book
+
+_value_net = None
+_value_net_loaded = False
+
+def get_value_net():
+    """Load the value network on first use; returns None if there is no usable network"""
+    global _value_net, _value_net_loaded
+    if not _value_net_loaded:
+        _value_net_loaded = True
+        if os.path.exists(VALUE_NET_FILE):
+            try:
+                from value_net import ValueNet  # NumPy is only needed when a network is used
+                _value_net = ValueNet.load(VALUE_NET_FILE)
+                print(f"🧠 Value network loaded: {'-'.join(map(str, _value_net.hidden))} hidden units")
+            except ImportError:
+                print("❌ The value network needs NumPy: pip install numpy")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ Error loading value network: {e}")
+    return _value_net
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when the search deadline has passed"""
+
+class TranspositionTable:
+    """Fixed-size hash table of search results shared by every search that uses it
+    
+    The table lives in any writable buffer: a bytearray for one process or
+    a multiprocessing.shared_memory block for a pool of workers. Each slot
+    is two 64-bit words, the packed result (score, depth, bound, best move)
+    and the position key XORed with it. A reader only accepts a slot whose
+    words agree with the key, so a slot half-written by another process
+    reads as a miss instead of a wrong result and no locks are needed.
+    
+    Scores are stored from red's point of view.
+    """
+    ENTRY = struct.Struct("<QQ")
+    EXACT, LOWER, UPPER = 0, 1, 2
+    NO_SQUARE = 63
+    
+    def __init__(self, entries=TT_ENTRIES, buffer=None):
+        if entries & (entries - 1):
+            raise ValueError("Transposition table size must be a power of two")
+        self.mask = entries - 1
+        self.buffer = buffer if buffer is not None else bytearray(self.size(entries))
+        self.evaluator = None  # Leaf evaluator the stored scores came from (see use_evaluator)
+    
+    @classmethod
+    def size(cls, entries):
+        """Bytes of buffer needed for a table of entries slots"""
+        return entries * cls.ENTRY.size
+    
+    def probe(self, key):
+        """(score, depth, bound, (from square, to square) or None) stored for key, or None"""
+        check, data = self.ENTRY.unpack_from(self.buffer, (key & self.mask) * self.ENTRY.size)
+        if check ^ data != key or not data:
+            return None
+        score = struct.unpack("<f", struct.pack("<I", data & 0xFFFFFFFF))[0]
+        from_square, to_square = (data >> 42) & 63, (data >> 48) & 63
+        move = None if from_square == self.NO_SQUARE else (from_square, to_square)
+        return score, (data >> 32) & 0xFF, (data >> 40) & 3, move
+    
+    def store(self, key, score, depth, bound, move=None):
+        """Save a result, keeping a deeper one already stored for the same position"""
+        offset = (key & self.mask) * self.ENTRY.size
+        check, data = self.ENTRY.unpack_from(self.buffer, offset)
+        if data and check ^ data == key and (data >> 32) & 0xFF > depth:
+            return
+        from_square, to_square = move if move else (self.NO_SQUARE, 0)
+        data = (struct.unpack("<I", struct.pack("<f", score))[0] | min(depth, 255) << 32 | bound << 40 |
+                from_square << 42 | to_square << 48)
+        self.ENTRY.pack_into(self.buffer, offset, key ^ data, data)
+    
+    def clear(self):
+        self.buffer[:] = bytes(len(self.buffer))
+    
+    def use_evaluator(self, name):
+        """Clear the table if its scores came from another leaf evaluator"""
+        if name != self.evaluator:
+            if self.evaluator is not None:
+                self.clear()
+            self.evaluator = name
+
+_transposition_table = None
+
+def get_transposition_table():
+    """The process's own transposition table, created on first use"""
+    global _transposition_table
+    if _transposition_table is None:
+        _transposition_table = TranspositionTable()
+    return _transposition_table
+
+class SearchStats:
+    """Counters filled in by Game.minimax during one AI search"""
+    def __init__(self, depth=0):
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs_by_move = {}  # Move index at the node -> number of beta cutoffs
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tb_hits = 0
+        self.depth = depth
+        self.elapsed = 0.0
+        self.book_hit = False
+    
+    def record_cutoff(self, move_index):
+        """Count a beta cutoff caused by the move_index-th move tried at a node"""
+        self.cutoffs_by_move[move_index] = self.cutoffs_by_move.get(move_index, 0) + 1
+    
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_by_move.values())
+    
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def as_dict(self):
+        """Return the statistics as a JSON-serialisable dict"""
+        return {
+            "nodes": self.nodes,
+            "leaf_evals": self.leaf_evals,
+            "cutoffs": self.cutoffs,
+            "cutoffs_by_move": {str(index): count for index, count in sorted(self.cutoffs_by_move.items())},
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tb_hits": self.tb_hits,
+            "depth": self.depth,
+            "book_hit": self.book_hit,
+            "elapsed": round(self.elapsed, 4),
+            "nodes_per_second": round(self.nodes_per_second, 1)
+        }
+
+SIDES = {RED: protocol.SIDE_RED, WHITE: protocol.SIDE_WHITE}  # Colours as they are sent to the server
+COLORS_BY_SIDE = {side: color for color, side in SIDES.items()}
+
+class NetworkClient:
+    """Connection to a match on game_server.py
+    
+    The server owns the board; the client sends move requests and mirrors
+    the positions it gets back, using the binary frames of protocol.py. A
+    reader thread keeps the newest state for the game loop to pick up and
+    posts REDRAW_EVENT, so an idle window still shows the opponent's moves.
+    With watch=True the client is a spectator of the featured match: it gets
+    one keyframe, then applies the server's move deltas to it. A player's
+    Firebase ID token goes first, so the server can rate the match by the
+    account it verifies rather than by the name.
+    """
+    def __init__(self, address, username=None, watch=False, id_token=None):
+        host, port = address.rsplit(":", 1)
+        self.sock = socket.create_connection((host, int(port)), timeout=HTTP_TIMEOUT[0])
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.lock = threading.Lock()
+        self.room = None
+        self.color = None  # Set when the server pairs us with an opponent
+        self.opponent = None
+        self.players = None  # (red name, white name) of the match we watch
+        self.bitboards = None  # Position the next delta applies to
+        self.state = None  # Newest state not yet applied by the game
+        self.probability = None  # Newest playout results from the server not yet applied
+        self.server_probability = False  # The server sends win probabilities, so we don't run playouts
+        self.connected = True
+        if watch:
+            self.send(protocol.encode_watch())
+        else:
+            if id_token:
+                self.send(protocol.encode_auth(id_token))
+            self.send(protocol.encode_join(username or "Guest"))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def send(self, data):
+        """Send one encoded frame; a dead connection is noticed by the reader thread"""
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            self.connected = False
+    
+    def send_move(self, start, end):
+        """Ask the server to move the piece on start to end, both (row, col)"""
+        self.send(protocol.encode_move(square_index(*start), square_index(*end)))
+    
+    def poll(self):
+        """Return the newest state not yet applied, or None"""
+        with self.lock:
+            state, self.state = self.state, None
+        return state
+    
+    def poll_probability(self):
+        """Return the newest playout results from the server not yet applied, or None"""
+        with self.lock:
+            probability, self.probability = self.probability, None
+        return probability
+    
+    def close(self):
+        """Leave the match and close the connection"""
+        if self.connected:
+            self.send(protocol.encode_leave())
+        self.connected = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+    
+    def _run(self):
+        """Reader loop: receive straight into a frame buffer and handle each frame"""
+        frames = protocol.FrameBuffer()
+        try:
+            while True:
+                received = self.sock.recv_into(frames.writable())
+                if not received:
+                    break
+                frames.advance(received)
+                for kind, payload in frames.frames():
+                    self.handle_message(kind, payload)
+        except (OSError, protocol.ProtocolError):
+            pass
+        finally:
+            self.connected = False
+            self.wake()
+    
+    def handle_message(self, kind, payload):
+        """Record what a server message changes"""
+        if kind == protocol.START:
+            side, self.room, self.opponent = protocol.decode_start(payload)
+            self.color = COLORS_BY_SIDE[side]
+        elif kind == protocol.WATCHING:
+            self.room, *players = protocol.decode_watching(payload)
+            self.players = tuple(players)
+        elif kind == protocol.STATE:
+            bitboards, turn, winner, _ = protocol.decode_state(payload)
+            self.publish(bitboards, turn, winner)
+        elif kind == protocol.DELTA:
+            start, end, captured, crowned, turn, winner = protocol.decode_delta(payload)
+            if self.bitboards is None:
+                raise protocol.ProtocolError("Delta before the first keyframe")
+            self.publish(protocol.apply_delta(self.bitboards, start, end, captured, crowned), turn, winner)
+        elif kind == protocol.PROBABILITY:
+            red_wins, white_wins, draws = protocol.decode_probability(payload)
+            with self.lock:
+                self.probability = {"RED": red_wins, "WHITE": white_wins, "DRAW": draws}
+            self.server_probability = True
+        elif kind == protocol.ERROR:
+            print(f"⚠️ Game server: {protocol.decode_error(payload)}")
+        self.wake()
+    
+    def publish(self, bitboards, turn, winner):
+        """Make a position the newest state for the game loop"""
+        self.bitboards = bitboards
+        state = {
+            "board": Board.from_bitboards(bitboards),
+            "turn": COLORS_BY_SIDE[turn],
+            "winner": COLORS_BY_SIDE.get(winner)
+        }
+        with self.lock:
+            self.state = state
+    
+    @staticmethod
+    def wake():
+        """Wake the main loop if it is waiting for events"""
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(REDRAW_EVENT))
+
+class SessionJournal:
+    """Append-only autosave of a local game, so it can be resumed after the window closes
+    
+    The file holds a header (user, mode, difficulty), a snapshot of the
+    whole undo/redo line as 17-byte positions, then one small record per
+    move, undo or redo. Every SESSION_SNAPSHOT_RECORDS records the writer
+    replaces the file with a fresh header and snapshot, so resuming replays
+    at most that many moves. The game thread only packs a record and hands
+    it over; a writer thread appends it and fsyncs at most every
+    SESSION_FSYNC_SECONDS.
+    """
+    RECORD = struct.Struct("<BH")  # Record type, payload length
+    POSITION = struct.Struct("<4IB")  # Bitboards per piece type, side to move
+    SNAPSHOT_COUNTS = struct.Struct("<HH")  # Positions before and after the current one
+    SQUARES = struct.Struct("<BB")
+    HEADER, SNAPSHOT, MOVE, UNDO, REDO = 1, 2, 3, 4, 5
+    
+    def __init__(self, path, username, game_mode, ai_difficulty, game):
+        self.path = path
+        self.header = self._record(self.HEADER, protocol.pack_text(username or "") + protocol.pack_text(game_mode) +
+                                   protocol.pack_text(ai_difficulty or ""))
+        # Mirror of the game's undo/redo line, as packed positions
+        self.history = [self.pack(state['board'], state['turn']) for state in game.move_history]
+        self.current = self.pack(game.board, game.turn)
+        self.future = [self.pack(state['board'], state['turn']) for state in game.future_moves]
+        self.since_snapshot = 0
+        
+        self.condition = threading.Condition()
+        self.pending = []  # Records not yet written
+        self.rewrite = self._snapshot()  # Header and snapshot to start the file over with
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    @classmethod
+    def pack(cls, board, turn):
+        return cls.POSITION.pack(*board.bitboards(), SIDES[turn])
+    
+    @classmethod
+    def unpack(cls, position):
+        """(board, turn) of a packed position"""
+        *bitboards, side = cls.POSITION.unpack(position)
+        return Board.from_bitboards(bitboards), COLORS_BY_SIDE[side]
+    
+    def record_move(self, start, end, board, turn):
+        """Journal a move from square start to end that left board with turn to move"""
+        self.history.append(self.current)
+        self.current = self.pack(board, turn)
+        self.future.clear()
+        self._append(self._record(self.MOVE, self.SQUARES.pack(start, end)))
+    
+    def record_undo(self):
+        self.future.append(self.current)
+        self.current = self.history.pop()
+        self._append(self._record(self.UNDO))
+    
+    def record_redo(self):
+        self.history.append(self.current)
+        self.current = self.future.pop()
+        self._append(self._record(self.REDO))
+    
+    def close(self, timeout=1.0):
+        """Write and fsync everything journaled, then stop the writer"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join(timeout)
+    
+    def discard(self):
+        """Stop journaling and delete the file; there is nothing left to resume"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+    
+    @classmethod
+    def load(cls, path):
+        """Read a journal: its header, the snapshot's line and the records after it, or None"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        
+        session = None
+        offset = 0
+        try:
+            while offset + cls.RECORD.size <= len(data):
+                kind, length = cls.RECORD.unpack_from(data, offset)
+                start = offset + cls.RECORD.size
+                offset = start + length
+                if offset > len(data):
+                    break  # Cut short by a crash mid-write
+                payload = data[start:offset]
+                if kind == cls.HEADER:
+                    username, position = protocol.unpack_text(payload, 0)
+                    game_mode, position = protocol.unpack_text(payload, position)
+                    ai_difficulty, _ = protocol.unpack_text(payload, position)
+                    session = {"username": username, "game_mode": game_mode, "ai_difficulty": ai_difficulty or None}
+                elif kind == cls.SNAPSHOT:
+                    before, after = cls.SNAPSHOT_COUNTS.unpack_from(payload)
+                    size = cls.POSITION.size
+                    positions = [payload[i:i + size] for i in range(cls.SNAPSHOT_COUNTS.size, len(payload), size)]
+                    if len(positions) != before + 1 + after:
+                        raise ValueError("Snapshot size does not match its counts")
+                    session.update(history=positions[:before], current=positions[before],
+                                   future=positions[before + 1:], records=[])
+                elif kind == cls.MOVE:
+                    session["records"].append((kind, *cls.SQUARES.unpack(payload)))
+                elif kind in (cls.UNDO, cls.REDO):
+                    session["records"].append((kind, None, None))
+                else:
+                    raise ValueError(f"Unknown record type {kind}")
+        except (struct.error, ValueError, TypeError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable saved game {path}: {e}")
+            return None
+        return session if session and "current" in session else None
+    
+    def _record(self, kind, payload=b""):
+        return self.RECORD.pack(kind, len(payload)) + payload
+    
+    def _snapshot(self):
+        payload = (self.SNAPSHOT_COUNTS.pack(len(self.history), len(self.future)) + b"".join(self.history) +
+                   self.current + b"".join(self.future))
+        return self.header + self._record(self.SNAPSHOT, payload)
+    
+    def _append(self, record):
+        self.since_snapshot += 1
+        with self.condition:
+            if self.since_snapshot >= SESSION_SNAPSHOT_RECORDS:
+                # The snapshot already holds everything still pending
+                self.since_snapshot = 0
+                self.pending = []
+                self.rewrite = self._snapshot()
+            else:
+                self.pending.append(record)
+            self.condition.notify()
+    
+    def _run(self):
+        """Writer loop: write records as they come, fsync in batches"""
+        file = None
+        last_sync = time.monotonic()
+        unsynced = False
+        try:
+            while True:
+                with self.condition:
+                    while not (self.stopping or self.pending or self.rewrite):
+                        wait = last_sync + SESSION_FSYNC_SECONDS - time.monotonic() if unsynced else None
+                        if wait is not None and wait <= 0:
+                            break
+                        self.condition.wait(wait)
+                    rewrite, self.rewrite = self.rewrite, None
+                    records, self.pending = self.pending, []
+                    stopping = self.stopping
+                
+                if rewrite:
+                    # Start the file over: written aside, fsynced, then renamed into place
+                    if file:
+                        file.close()
+                    with open(f"{self.path}.tmp", "wb") as f:
+                        f.write(rewrite)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(f"{self.path}.tmp", self.path)
+                    file = open(self.path, "ab")
+                    last_sync = time.monotonic()
+                    unsynced = False
+                if records:
+                    file.write(b"".join(records))
+                    file.flush()  # In the OS now, so it survives the process
+                    unsynced = True
+                if unsynced and (stopping or time.monotonic() - last_sync >= SESSION_FSYNC_SECONDS):
+                    os.fsync(file.fileno())
+                    last_sync = time.monotonic()
+                    unsynced = False
+                if stopping:
+                    return
+        except OSError as e:
+            print(f"⚠️ Autosave stopped: {e}")
+        finally:
+            if file:
+                file.close()
+
+class Game:
+    def __init__(self, win, username=None, game_mode="human_vs_human", ai_difficulty=None, firebase_auth=None,
+                 network=None):
+        self.win = win
+        self.username = username
+        self.board = Board()
+        self.turn = RED
+        self.selected = None
+        self.valid_moves = {}
+        self.game_over = False
         self.winner = None
         self.turn_indicator_time = 0
         self.clock = pygame.time.Clock()
@@ -1301,6 +2733,23 @@ class Game:
         self.ai_difficulty = ai_difficulty
         self.ai_color = WHITE  # AI plays as white by default
         self.ai_thinking = False
+        self.search_stats = SearchStats()
+        self.last_search_stats = None
+        self.show_search_stats = False
+        self.transposition_table = get_transposition_table() if game_mode == "human_vs_ai" else None
+        use_net = game_mode == "human_vs_ai" and AI_EVALUATORS.get(ai_difficulty) == "net"
+        self.value_net = get_value_net() if use_net else None  # Leaf evaluator of the search, Board.evaluate if None
+        self.accumulator = None  # The value network's first-layer sums along the search line
+        if self.transposition_table is not None:
+            self.transposition_table.use_evaluator("net" if self.value_net else "classic")
+        self.search_deadline = None  # time.perf_counter() value after which minimax gives up
+        
+        # Online play: the server owns the board and this game mirrors it
+        self.network = network
+        self.player_color = None  # Our colour once the server has paired us
+        self.players = None  # (red name, white name) when spectating
+        self.journal = None  # SessionJournal autosaving a local game
+        self.move_pending = False
         
         # Undo/Redo functionality
         self.move_history = []
@@ -1321,69 +2770,212 @@ class Game:
             "redo": pygame.Rect(BOARD_OFFSET_X + 110, HEIGHT - 100, 100, 40),
             "menu": pygame.Rect(WIDTH - 150, HEIGHT - 100, 100, 40)
         }
+        
+        # Retained scene: only regions whose state changed are redrawn each frame
+        title_rect = pygame.Rect((0, 0), FONT_LARGE.size("AI CHECKERS MASTER"))
+        title_rect.center = (WIDTH//2, 40)
+        self.title_rect = title_rect.inflate(40, 20)
+        self.monte_carlo_rect = pygame.Rect(SIDE_PANEL_X, BOARD_OFFSET_Y + 80, WIDTH - SIDE_PANEL_X, 300)
+        self.search_stats_rect = pygame.Rect(SIDE_PANEL_X, BOARD_OFFSET_Y + 475, WIDTH - SIDE_PANEL_X, 180)
+        self.turn_rect = pygame.Rect(BOARD_OFFSET_X, HEIGHT - 75, BOARD_SIZE, 75)
+        self.counters_rect = pygame.Rect(BOARD_OFFSET_X, BOARD_OFFSET_Y - 30, BOARD_SIZE, 28)
+        self.scene = {}
+        self.static_layer = None
+        self.winner_layer = None
+        self.overlay_rects = []
+        self.full_redraw = True
+        self.pulse_size = 0
+        self.animation_clock = AnimationClock()
 
     def update(self):
         """Update the game display"""
-        self.clock.tick(60)
-        self.draw_background()
-        self.board.draw(self.win)
-        self.draw_valid_moves()
-        self.draw_side_panel()
-        self.draw_ui()
+        self.clock.tick(ANIMATION_FPS)
+        if self.network:
+            self.sync_network()
+        dirty_rects = self.render()
         
         # Make AI move if it's AI's turn
-        if (self.game_mode == "human_vs_ai" and 
-            ((self.turn == WHITE and self.ai_color == WHITE) or 
-             (self.turn == RED and self.ai_color == RED)) and
-            not self.game_over and not self.ai_thinking):
+        if self.ai_to_move():
             self.ai_thinking = True
             self.ai_move()
             self.ai_thinking = False
         
-        pygame.display.update()
+        pygame.display.update(dirty_rects)
 
-    def draw_background(self):
-        """Draw animated background elements"""
-        # Fill background
-        self.win.fill((30, 30, 40))
-        
+    def ai_to_move(self):
+        """Whether the AI should make the next move"""
+        return (self.game_mode == "human_vs_ai" and 
+                ((self.turn == WHITE and self.ai_color == WHITE) or 
+                 (self.turn == RED and self.ai_color == RED)) and
+                not self.game_over and not self.ai_thinking)
+
+    def is_animating(self):
+        """Whether the screen changes without input: move markers, simulations, the AI or the winner message"""
+        return bool(self.valid_moves) or self.monte_carlo_running or self.game_over or self.ai_to_move()
+
+    def invalidate(self):
+        """Force the next frame to repaint the whole window"""
+        self.full_redraw = True
+        self.winner_layer = None
+
+    def render(self):
+        """Repaint the parts of the scene that changed and return their rectangles"""
         # Animate title glow
-        self.title_glow += 0.05 * self.title_glow_dir
+        self.title_glow += 0.05 * self.title_glow_dir * self.animation_clock.step()
         if self.title_glow > 1 or self.title_glow < 0:
             self.title_glow_dir *= -1
+            self.title_glow = min(max(self.title_glow, 0), 1)
+        current_time = pygame.time.get_ticks()
+        self.pulse_size = int(5 * (0.5 + 0.5 * abs(pygame.math.Vector2(0, 1).rotate(current_time / 5).y)))
         
-        # Draw glowing title
-        title_text = FONT_LARGE.render("AI CHECKERS MASTER", True, 
-                                     (0, 200 + int(55 * self.title_glow), 
-                                     255))
-        title_rect = title_text.get_rect(center=(WIDTH//2, 40))
+        regions = self.scene_regions()
         
-        # Create glow effect
-        glow_surface = pygame.Surface((title_rect.width + 40, title_rect.height + 20), pygame.SRCALPHA)
-        pygame.draw.rect(glow_surface, (0, 100, 150, 30), 
-                         (0, 0, title_rect.width + 40, title_rect.height + 20), 
-                         border_radius=10)
-        self.win.blit(glow_surface, (title_rect.x - 20, title_rect.y - 10))
-        self.win.blit(title_text, title_rect)
+        if self.game_over:
+            dirty_rects = self.render_game_over(regions)
+        elif self.full_redraw or self.winner_layer is not None:
+            self.static_layer = self.build_static_layer()
+            self.repaint(self.win.get_rect(), regions)
+            self.winner_layer = None
+            dirty_rects = [self.win.get_rect()]
+        else:
+            dirty_rects = [rect for key, rect, state in regions if self.scene.get(key) != state]
+            dirty_rects.extend(self.overlay_rects)
+            for rect in dirty_rects:
+                self.repaint(rect, regions)
+        
+        self.scene = {key: state for key, rect, state in regions}
+        self.full_redraw = False
+        
+        # The profiler overlay sits on top; its old area is restored next frame
+        overlay_rect = PROFILER.draw_overlay(self.win)
+        self.overlay_rects = [overlay_rect] if overlay_rect else []
+        return dirty_rects + [rect for rect in self.overlay_rects if rect not in dirty_rects]
 
-    def draw_side_panel(self):
-        """Draw side panel with Monte Carlo results"""
+    def repaint(self, rect, regions):
+        """Redraw everything that overlaps rect, clipped to it"""
+        self.win.set_clip(rect)
+        self.win.blit(self.static_layer, rect, rect)
+        for key, region_rect, state in regions:
+            if region_rect.colliderect(rect):
+                self.draw_region(key)
+        self.win.set_clip(None)
+
+    def scene_regions(self):
+        """List the (key, rect, state) of every dynamic part of the screen, in drawing order"""
+        regions = [("title", self.title_rect, int(55 * self.title_glow))]
+        
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.board.get_piece(row, col)
+                state = (piece.color, piece.king, piece.selected) if piece != 0 else None
+                marker = self.pulse_size if (row, col) in self.valid_moves else None
+                regions.append((("square", row, col), square_rect(row, col), (state, marker)))
+        
+        results = tuple(self.monte_carlo_results.values())
+        dots = int(time.time() * 2) % 4 if self.monte_carlo_running else None
+        regions.append(("monte_carlo", self.monte_carlo_rect, (results, self.monte_carlo_total, dots)))
+        regions.append(("search_stats", self.search_stats_rect, (self.show_search_stats, self.last_search_stats)))
+        regions.append(("turn", self.turn_rect, (self.turn, self.ai_thinking, self.player_color)))
+        regions.append(("counters", self.counters_rect, (self.board.red_left, self.board.white_left)))
+        
+        if self.show_buttons:
+            regions.append(("undo", self.buttons["undo"], bool(self.move_history)))
+            regions.append(("redo", self.buttons["redo"], bool(self.future_moves)))
+            regions.append(("menu", self.buttons["menu"], True))
+        return regions
+
+    def draw_region(self, key):
+        """Draw one dynamic part of the screen"""
+        if key == "title":
+            self.draw_title()
+        elif key == "monte_carlo":
+            self.draw_monte_carlo_results()
+        elif key == "search_stats":
+            if self.show_search_stats:
+                self.draw_search_stats(self.search_stats_rect.y)
+        elif key == "turn":
+            self.draw_turn_indicator()
+        elif key == "counters":
+            self.draw_piece_counters()
+        elif key in self.buttons:
+            self.draw_button(key)
+        else:
+            _, row, col = key
+            self.board.draw_square(self.win, row, col)
+            if (row, col) in self.valid_moves:
+                self.draw_valid_move(row, col)
+
+    def build_static_layer(self):
+        """Render the parts of the screen that never change during a game"""
+        layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+        
+        # Fill background
+        layer.fill((30, 30, 40))
+        self.board.draw_frame(layer)
+        
         # Draw panel background
         panel_rect = pygame.Rect(SIDE_PANEL_X, BOARD_OFFSET_Y, WIDTH - SIDE_PANEL_X - 20, BOARD_SIZE)
-        pygame.draw.rect(self.win, PANEL_BG, panel_rect, border_radius=10)
+        pygame.draw.rect(layer, PANEL_BG, panel_rect, border_radius=10)
         
         # Draw panel title
-        panel_title = FONT_MEDIUM.render("Win Probability", True, WHITE)
-        self.win.blit(panel_title, (SIDE_PANEL_X + 10, BOARD_OFFSET_Y + 20))
+        panel_title = TEXT_CACHE.render(FONT_MEDIUM, "Win Probability", True, WHITE)
+        layer.blit(panel_title, (SIDE_PANEL_X + 10, BOARD_OFFSET_Y + 20))
         
         # Draw separator line
-        pygame.draw.line(self.win, LIGHT_GRAY, 
+        pygame.draw.line(layer, LIGHT_GRAY, 
                        (SIDE_PANEL_X + 10, BOARD_OFFSET_Y + 60), 
                        (WIDTH - 30, BOARD_OFFSET_Y + 60), 2)
         
-        # Draw Monte Carlo results
         y_offset = BOARD_OFFSET_Y + 80
         
+        # Draw game mode info
+        mode_text = ""
+        if self.game_mode == "human_vs_human":
+            mode_text = "Mode: Human vs Human"
+        elif self.game_mode == "human_vs_ai":
+            mode_text = f"Mode: Human vs AI ({self.ai_difficulty.capitalize()})"
+        elif self.game_mode == "online":
+            mode_text = "Mode: Online"
+            if self.player_color:
+                mode_text += " (Red)" if self.player_color == RED else " (White)"
+        elif self.game_mode == "spectate":
+            mode_text = "Mode: Watching"
+            if self.players:
+                mode_text += f" {self.players[0] or '?'} vs {self.players[1] or '?'}"
+        
+        mode_render = TEXT_CACHE.render(FONT_SMALL, mode_text, True, LIGHT_GRAY)
+        layer.blit(mode_render, (SIDE_PANEL_X + 10, y_offset + 300))
+        
+        # Draw player info if available
+        if self.username:
+            player_text = TEXT_CACHE.render(FONT_SMALL, f"Player: {self.username}", True, LIGHT_GRAY)
+            layer.blit(player_text, (SIDE_PANEL_X + 10, y_offset + 330))
+        
+        # Firestore indicator
+        firestore_text = TEXT_CACHE.render(FONT_TINY, "💾 Firestore", True, (100, 200, 100))
+        layer.blit(firestore_text, (SIDE_PANEL_X + 10, y_offset + 360))
+        
+        return layer
+
+    def draw_title(self):
+        """Draw the glowing title"""
+        title_text = TEXT_CACHE.render(FONT_LARGE, "AI CHECKERS MASTER", True, 
+                                       (0, 200 + int(55 * self.title_glow), 
+                                       255))
+        title_rect = title_text.get_rect(center=(WIDTH//2, 40))
+        
+        # Create glow effect
+        glow_surface = pygame.Surface((title_rect.width + 40, title_rect.height + 20), pygame.SRCALPHA)
+        pygame.draw.rect(glow_surface, (0, 100, 150, 30), 
+                         (0, 0, title_rect.width + 40, title_rect.height + 20), 
+                         border_radius=10)
+        self.win.blit(glow_surface, (title_rect.x - 20, title_rect.y - 10))
+        self.win.blit(title_text, title_rect)
+
+    def draw_monte_carlo_results(self):
+        """Draw the Monte Carlo win probabilities in the side panel"""
+        y_offset = self.monte_carlo_rect.y
+        
         if self.monte_carlo_total > 0:
             # Calculate percentages
             red_pct = (self.monte_carlo_results["RED"] / self.monte_carlo_total) * 100
@@ -1396,43 +2988,55 @@ class Game:
             self.draw_probability_bar("DRAW", draw_pct, y_offset + 160)
             
             # Show total simulations
-            total_text = FONT_SMALL.render(f"Simulations: {self.monte_carlo_total}", True, LIGHT_GRAY)
+            total_text = TEXT_CACHE.render(FONT_SMALL, f"Simulations: {self.monte_carlo_total}", True, LIGHT_GRAY)
             self.win.blit(total_text, (SIDE_PANEL_X + 10, y_offset + 240))
             
             # Show loading animation if simulation is running
             if self.monte_carlo_running:
                 dots = "." * (int(time.time() * 2) % 4)
-                running_text = FONT_SMALL.render(f"Simulating{dots}", True, GREEN)
+                running_text = TEXT_CACHE.render(FONT_SMALL, f"Simulating{dots}", True, GREEN)
                 self.win.blit(running_text, (SIDE_PANEL_X + 10, y_offset + 270))
         else:
             # Show waiting message
             if self.monte_carlo_running:
                 dots = "." * (int(time.time() * 2) % 4)
-                waiting_text = FONT_MEDIUM.render(f"Calculating{dots}", True, BLUE)
+                waiting_text = TEXT_CACHE.render(FONT_MEDIUM, f"Calculating{dots}", True, BLUE)
                 self.win.blit(waiting_text, (SIDE_PANEL_X + 20, y_offset + 100))
             else:
-                waiting_text = FONT_MEDIUM.render("Waiting for move", True, LIGHT_GRAY)
+                waiting_text = TEXT_CACHE.render(FONT_MEDIUM, "Waiting for move", True, LIGHT_GRAY)
                 self.win.blit(waiting_text, (SIDE_PANEL_X + 10, y_offset + 100))
+    
+    def draw_search_stats(self, y_position):
+        """Draw the statistics of the last AI search"""
+        stats = self.last_search_stats
+        if stats is None:
+            lines = ["Search: -"]
+        elif stats.book_hit:
+            lines = ["Book move", f"Time: {stats.elapsed:.2f}s"]
+        else:
+            first_move_cutoffs = stats.cutoffs_by_move.get(0, 0)
+            first_pct = (first_move_cutoffs / stats.cutoffs * 100) if stats.cutoffs else 0
+            lines = [
+                f"Depth: {stats.depth}",
+                f"Nodes: {stats.nodes}",
+                f"Leaves: {stats.leaf_evals}",
+                f"Cutoffs: {stats.cutoffs}",
+                f"1st cut: {first_pct:.0f}%",
+                f"TT: {stats.tt_hits}/{stats.tt_probes}",
+                f"TB: {stats.tb_hits}",
+                f"Time: {stats.elapsed:.2f}s",
+                f"NPS: {stats.nodes_per_second:.0f}"
+            ]
         
-        # Draw game mode info
-        mode_text = ""
-        if self.game_mode == "human_vs_human":
-            mode_text = "Mode: Human vs Human"
-        elif self.game_mode == "human_vs_ai":
-            mode_text = f"Mode: Human vs AI ({self.ai_difficulty.capitalize()})"
-        
-        mode_render = FONT_SMALL.render(mode_text, True, LIGHT_GRAY)
-        self.win.blit(mode_render, (SIDE_PANEL_X + 10, y_offset + 300))
-        
-        # Draw player info if available
-        if self.username:
-            player_text = FONT_SMALL.render(f"Player: {self.username}", True, LIGHT_GRAY)
-            self.win.blit(player_text, (SIDE_PANEL_X + 10, y_offset + 330))
-        
-        # Firestore indicator
-        firestore_text = FONT_TINY.render("💾 Firestore", True, (100, 200, 100))
-        self.win.blit(firestore_text, (SIDE_PANEL_X + 10, y_offset + 360))
+        for i, line in enumerate(lines):
+            text = TEXT_CACHE.render(FONT_TINY, line, True, ORANGE)
+            self.win.blit(text, (SIDE_PANEL_X + 10, y_position + i * 20))
 
+    def handle_key(self, key):
+        """Handle keyboard shortcuts during a game"""
+        if key == pygame.K_F2:
+            self.show_search_stats = not self.show_search_stats
+    
     def draw_probability_bar(self, player, percentage, y_position):
         """Draw a probability bar for a player"""
         # Set color based on player
@@ -1447,11 +3051,11 @@ class Game:
             text = "DRAW"
             
         # Draw label
-        label = FONT_SMALL.render(text, True, color)
+        label = TEXT_CACHE.render(FONT_SMALL, text, True, color)
         self.win.blit(label, (SIDE_PANEL_X + 10, y_position))
         
         # Draw percentage
-        pct_text = FONT_SMALL.render(f"{percentage:.1f}%", True, color)
+        pct_text = TEXT_CACHE.render(FONT_SMALL, f"{percentage:.1f}%", True, color)
         self.win.blit(pct_text, (SIDE_PANEL_X + 10, y_position + 25))
         
         # Draw bar background
@@ -1469,15 +3073,21 @@ class Game:
                             fill_width, 20), 
                             border_radius=5)
 
-    def draw_ui(self):
-        """Draw user interface elements"""
-        # Draw turn indicator
+    def draw_turn_indicator(self):
+        """Draw whose turn it is below the board"""
         turn_text = "RED'S TURN" if self.turn == RED else "WHITE'S TURN"
         if self.game_mode == "human_vs_ai" and self.turn == self.ai_color:
             turn_text += " (AI Thinking...)" if self.ai_thinking else " (AI)"
+        elif self.game_mode == "online":
+            if self.player_color is None:
+                turn_text = "WAITING FOR OPPONENT..."
+            else:
+                turn_text += " (You)" if self.turn == self.player_color else " (Opponent)"
+        elif self.game_mode == "spectate" and self.players is None:
+            turn_text = "WAITING FOR A LIVE MATCH..."
         
         text_color = RED if self.turn == RED else WHITE
-        text = FONT_MEDIUM.render(turn_text, True, text_color)
+        text = TEXT_CACHE.render(FONT_MEDIUM, turn_text, True, text_color)
         text_rect = text.get_rect(center=(BOARD_OFFSET_X + BOARD_SIZE//2, HEIGHT - 40))
         
         # Draw background for turn indicator
@@ -1486,50 +3096,35 @@ class Game:
                         text_rect.width + 40, text_rect.height + 20), 
                        border_radius=10)
         self.win.blit(text, text_rect)
-        
-        # Draw piece counters
-        red_text = FONT_SMALL.render(f"RED: {self.board.red_left}", True, RED)
-        white_text = FONT_SMALL.render(f"WHITE: {self.board.white_left}", True, WHITE)
+
+    def draw_piece_counters(self):
+        """Draw the number of pieces each side has left"""
+        red_text = TEXT_CACHE.render(FONT_SMALL, f"RED: {self.board.red_left}", True, RED)
+        white_text = TEXT_CACHE.render(FONT_SMALL, f"WHITE: {self.board.white_left}", True, WHITE)
         self.win.blit(red_text, (BOARD_OFFSET_X, BOARD_OFFSET_Y - 30))
         self.win.blit(white_text, (BOARD_OFFSET_X + BOARD_SIZE - white_text.get_width(), BOARD_OFFSET_Y - 30))
+
+    def draw_button(self, name):
+        """Draw the undo, redo or menu button"""
+        if name == "undo":
+            color = BLUE if self.move_history else DARK_GRAY
+        elif name == "redo":
+            color = BLUE if self.future_moves else DARK_GRAY
+        else:
+            color = BLUE
         
-        # Draw buttons if enabled
-        if self.show_buttons:
-            # Undo button
-            pygame.draw.rect(self.win, BLUE if self.move_history else DARK_GRAY, self.buttons["undo"], border_radius=5)
-            undo_text = FONT_SMALL.render("Undo", True, WHITE)
-            undo_rect = undo_text.get_rect(center=self.buttons["undo"].center)
-            self.win.blit(undo_text, undo_rect)
-            
-            # Redo button
-            pygame.draw.rect(self.win, BLUE if self.future_moves else DARK_GRAY, self.buttons["redo"], border_radius=5)
-            redo_text = FONT_SMALL.render("Redo", True, WHITE)
-            redo_rect = redo_text.get_rect(center=self.buttons["redo"].center)
-            self.win.blit(redo_text, redo_rect)
-            
-            # Menu button
-            pygame.draw.rect(self.win, BLUE, self.buttons["menu"], border_radius=5)
-            menu_text = FONT_SMALL.render("Menu", True, WHITE)
-            menu_rect = menu_text.get_rect(center=self.buttons["menu"].center)
-            self.win.blit(menu_text, menu_rect)
-        
-        # Draw winner message
-        if self.game_over:
-            self.display_winner()
+        pygame.draw.rect(self.win, color, self.buttons[name], border_radius=5)
+        text = TEXT_CACHE.render(FONT_SMALL, name.capitalize(), True, WHITE)
+        text_rect = text.get_rect(center=self.buttons[name].center)
+        self.win.blit(text, text_rect)
 
-    def draw_valid_moves(self):
-        """Highlight valid moves for the selected piece with animation"""
-        current_time = pygame.time.get_ticks()
-        pulse_size = int(5 * (0.5 + 0.5 * abs(pygame.math.Vector2(0, 1).rotate(current_time / 5).y)))
+    def draw_valid_move(self, row, col):
+        """Draw the pulsing marker of a valid move"""
+        center = square_rect(row, col).center
         
-        for move, skipped in self.valid_moves.items():
-            row, col = move
-            center_x = BOARD_OFFSET_X + col * SQUARE_SIZE + SQUARE_SIZE // 2
-            center_y = BOARD_OFFSET_Y + row * SQUARE_SIZE + SQUARE_SIZE // 2
-            
-            # Draw pulsing green circle
-            pygame.draw.circle(self.win, GREEN, (center_x, center_y), 15 + pulse_size)
-            pygame.draw.circle(self.win, BLACK, (center_x, center_y), 15 + pulse_size, 1)
+        # Draw pulsing green circle
+        pygame.draw.circle(self.win, GREEN, center, 15 + self.pulse_size)
+        pygame.draw.circle(self.win, BLACK, center, 15 + self.pulse_size, 1)
 
     def get_valid_moves(self, piece):
         """Calculate all valid moves for a piece"""
@@ -1648,6 +3243,10 @@ class Game:
             
         row, col = result
         
+        # Online, only our own pieces move, on our turn, and once per turn
+        if self.network and (self.turn != self.player_color or self.move_pending):
+            return False
+        
         if self.selected:
             result = self._move(row, col)
             if not result:
@@ -1669,11 +3268,21 @@ class Game:
         """Move the selected piece to the specified position"""
         piece = self.board.get_piece(row, col)
         if self.selected and piece == 0 and (row, col) in self.valid_moves:
+            if self.network:
+                # The server checks the move and sends back the new position
+                self.network.send_move((self.selected.row, self.selected.col), (row, col))
+                self.move_pending = True
+                self.selected.selected = False
+                self.selected = None
+                self.valid_moves = {}
+                return True
+            
             # Store current state before making move
             self.store_move()
             
             # Get skipped pieces before making the move
             skipped = self.valid_moves[(row, col)]
+            start = (self.selected.row, self.selected.col)
             
             # Make the move
             self.board.move(self.selected, row, col)
@@ -1681,9 +3290,20 @@ class Game:
                 self.board.remove(skipped)
             
             self.change_turn()
+            self.journal_move(start, (row, col))
             return True
         return False
     
+    def journal_move(self, start, end):
+        """Autosave a move; a finished game has nothing to resume"""
+        if self.journal is None:
+            return
+        if self.game_over:
+            self.journal.discard()
+            self.journal = None
+        else:
+            self.journal.record_move(square_index(*start), square_index(*end), self.board, self.turn)
+    
     def store_move(self):
         """Store the current game state for undo functionality"""
         current_state = {
@@ -1711,6 +3331,8 @@ class Game:
         
         # Restore previous state
         previous_state = self.move_history.pop()
+        if self.journal:
+            self.journal.record_undo()
         self.board = previous_state['board']
         self.turn = previous_state['turn']
         self.game_over = previous_state['game_over']
@@ -1740,6 +3362,8 @@ class Game:
         
         # Restore future state
         future_state = self.future_moves.pop()
+        if self.journal:
+            self.journal.record_redo()
         self.board = future_state['board']
         self.turn = future_state['turn']
         self.game_over = future_state['game_over']
@@ -1753,6 +3377,46 @@ class Game:
         
         return True
 
+    def resume_session(self, session):
+        """Restore a game read by SessionJournal.load: the snapshot's undo/redo line, then the moves after it"""
+        def state(position):
+            board, turn = SessionJournal.unpack(position)
+            return {'board': board, 'turn': turn, 'game_over': False, 'winner': None}
+        
+        self.move_history = [state(position) for position in session["history"]]
+        self.future_moves = [state(position) for position in session["future"]]
+        self.board, self.turn = SessionJournal.unpack(session["current"])
+        for kind, start, end in session["records"]:
+            if kind == SessionJournal.UNDO:
+                if not self.undo_move():
+                    raise ValueError("Undo with nothing to undo")
+            elif kind == SessionJournal.REDO:
+                if not self.redo_move():
+                    raise ValueError("Redo with nothing to redo")
+            else:
+                piece = self.board.get_piece(*square_coords(start))
+                target = square_coords(end)
+                moves = self._get_valid_moves_for_simulation(self.board, piece) if piece else {}
+                if target not in moves:
+                    raise ValueError(f"Illegal move {start}-{end} in the journal")
+                self.store_move()
+                self.board.move(piece, *target)
+                if moves[target]:
+                    self.board.remove(moves[target])
+                self.turn = WHITE if self.turn == RED else RED
+        self.invalidate()
+    
+    def close(self, keep_session=False):
+        """Leave the game: disconnect from the server, and keep or drop the autosave"""
+        if self.network:
+            self.network.close()
+        if self.journal:
+            if keep_session:
+                self.journal.close()
+            else:
+                self.journal.discard()
+            self.journal = None
+    
     def change_turn(self):
         """Switch to the other player's turn"""
         if self.selected:
@@ -1793,48 +3457,107 @@ class Game:
         if not red_has_moves or self.board.red_left <= 0:
             self.game_over = True
             self.winner = "WHITE WINS!"
-            # Update Firebase stats for winner
+            # Queue Firebase stats for winner; the write happens in the background
             if self.firebase_auth and self.firebase_auth.local_id:
                 if self.game_mode == "human_vs_ai" and self.ai_color == WHITE:
-                    self.firebase_auth.update_user_stats(win=False)  # Human lost
+                    self.firebase_auth.stats_queue.enqueue(win=False)  # Human lost
                 else:
-                    self.firebase_auth.update_user_stats(win=(self.turn != RED))
+                    self.firebase_auth.stats_queue.enqueue(win=(self.turn != RED))
                 
         elif not white_has_moves or self.board.white_left <= 0:
             self.game_over = True
             self.winner = "RED WINS!"
-            # Update Firebase stats for winner
+            # Queue Firebase stats for winner; the write happens in the background
             if self.firebase_auth and self.firebase_auth.local_id:
                 if self.game_mode == "human_vs_ai" and self.ai_color == RED:
-                    self.firebase_auth.update_user_stats(win=False)  # Human lost
+                    self.firebase_auth.stats_queue.enqueue(win=False)  # Human lost
                 else:
-                    self.firebase_auth.update_user_stats(win=(self.turn != WHITE))
+                    self.firebase_auth.stats_queue.enqueue(win=(self.turn != WHITE))
+
+    def sync_network(self):
+        """Apply the newest position and win probabilities from the game server"""
+        probability = self.network.poll_probability()
+        if probability:
+            self.monte_carlo_results = probability
+            self.monte_carlo_total = sum(probability.values())
+        
+        state = self.network.poll()
+        if state is None:
+            if not self.network.connected and not self.game_over:
+                self.game_over = True
+                self.winner = "CONNECTION LOST"
+            return
+        
+        if self.player_color != self.network.color or self.players != self.network.players:
+            self.player_color = self.network.color
+            self.players = self.network.players
+            self.invalidate()  # The side panel shows which colour we play or who we watch
+        
+        if self.selected:
+            self.selected.selected = False
+        self.selected = None
+        self.valid_moves = {}
+        self.move_pending = False
+        self.board = state["board"]
+        self.turn = state["turn"]
+        self.monte_carlo_results = {"RED": 0, "WHITE": 0, "DRAW": 0}
+        self.monte_carlo_total = 0
+        
+        if state["winner"]:
+            winner = state["winner"]
+            self.game_over = True
+            self.winner = "RED WINS!" if winner == RED else "WHITE WINS!"
+            # Queue Firebase stats; the write happens in the background
+            if self.player_color and self.firebase_auth and self.firebase_auth.local_id:
+                self.firebase_auth.stats_queue.enqueue(win=(winner == self.player_color))
+        elif self.auto_monte_carlo and not self.network.server_probability:
+            self.run_monte_carlo_simulation()
+
+    def render_game_over(self, regions):
+        """Dim the final position once, then animate only the winner message"""
+        dirty_rects = []
+        if self.winner_layer is None:
+            self.static_layer = self.build_static_layer()
+            self.repaint(self.win.get_rect(), regions)
+            self.display_winner()
+            self.winner_layer = self.win.copy()
+            dirty_rects.append(self.win.get_rect())
+        
+        text_rect = pygame.Rect((0, 0), FONT_LARGE.size(self.winner))
+        text_rect.center = (WIDTH//2, HEIGHT//2)
+        # Room for the glow drawn above the text
+        winner_rect = text_rect.union(text_rect.move(0, -10))
+        for rect in [winner_rect] + self.overlay_rects:
+            self.win.blit(self.winner_layer, rect, rect)
+        self.draw_winner_text()
+        return dirty_rects or [winner_rect] + self.overlay_rects
 
     def display_winner(self):
-        """Display winner message with animation"""
-        if self.game_over:
-            # Create semi-transparent overlay
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            self.win.blit(overlay, (0, 0))
-            
-            # Draw winner text with glow effect
-            text = FONT_LARGE.render(self.winner, True, GOLD)
-            text_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2))
-            
-            # Create glow
-            glow_size = int(10 * abs(pygame.math.Vector2(0, 1).rotate(pygame.time.get_ticks() / 3).y))
-            for i in range(glow_size, 0, -2):
-                glow_color = (255, 215, 0, 10 + i * 2)
-                glow_text = FONT_LARGE.render(self.winner, True, glow_color)
-                self.win.blit(glow_text, (text_rect.x, text_rect.y - glow_size + i))
+        """Dim the board and draw the restart prompt"""
+        # Create semi-transparent overlay
+        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+        self.win.blit(overlay, (0, 0))
+        
+        # Draw restart prompt
+        restart_text = TEXT_CACHE.render(FONT_MEDIUM, "🎮 Click to play again", True, WHITE)
+        restart_rect = restart_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 60))
+        self.win.blit(restart_text, restart_rect)
 
-            self.win.blit(text, text_rect)
-            
-            # Draw restart prompt
-            restart_text = FONT_MEDIUM.render("🎮 Click to play again", True, WHITE)
-            restart_rect = restart_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 60))
-            self.win.blit(restart_text, restart_rect)
+    def draw_winner_text(self):
+        """Draw winner message with animation"""
+        # Draw winner text with glow effect
+        text = TEXT_CACHE.render(FONT_LARGE, self.winner, True, GOLD)
+        text_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2))
+        
+        # Create glow
+        glow_size = int(10 * abs(pygame.math.Vector2(0, 1).rotate(pygame.time.get_ticks() / 3).y))
+        for i in range(glow_size, 0, -2):
+            glow_color = (255, 215, 0, 10 + i * 2)
+            glow_text = TEXT_CACHE.render(FONT_LARGE, self.winner, True, glow_color)
+            self.win.blit(glow_text, (text_rect.x, text_rect.y - glow_size + i))
+
+        self.win.blit(text, text_rect)
             
     def run_monte_carlo_simulation(self):
         """Run Monte Carlo simulation in a separate thread"""
@@ -1854,63 +3577,11 @@ class Game:
             self.monte_carlo_total = 0
             
             # Run simulations
-            num_simulations = self.simulation_speed
-            max_moves = 200  # Prevent infinite games
-            
-            for _ in range(num_simulations):
-                # Create a copy of the current game state
-                board_copy = self.board.copy()
-                current_turn = self.turn
-                move_count = 0
-                
-                # Play a random game until completion
-                while True:
-                    # Check for winner
-                    red_pieces = board_copy.get_all_pieces(RED)
-                    white_pieces = board_copy.get_all_pieces(WHITE)
-                    
-                    if not red_pieces:
-                        self.monte_carlo_results["WHITE"] += 1
-                        break
-                    elif not white_pieces:
-                        self.monte_carlo_results["RED"] += 1
-                        break
-                    
-                    # Check for moves
-                    valid_moves_exist = False
-                    pieces = board_copy.get_all_pieces(current_turn)
-                    random.shuffle(pieces)  # Randomize piece selection
-                    
-                    for piece in pieces:
-                        moves = self._get_valid_moves_for_simulation(board_copy, piece)
-                        if moves:
-                            valid_moves_exist = True
-                            # Choose a random move
-                            move_pos, skipped = random.choice(list(moves.items()))
-                            
-                            # Execute the move
-                            row, col = move_pos
-                            board_copy.move(piece, row, col)
-                            if skipped:
-                                board_copy.remove(skipped)
-                            break
-                    
-                    if not valid_moves_exist:
-                        # Current player has no valid moves
-                        if current_turn == RED:
-                            self.monte_carlo_results["WHITE"] += 1
-                        else:
-                            self.monte_carlo_results["RED"] += 1
-                        break
-                    
-                    # Switch turn
-                    current_turn = WHITE if current_turn == RED else RED
-                    move_count += 1
-                    
-                    # Check for draw (too many moves)
-                    if move_count >= max_moves:
-                        self.monte_carlo_results["DRAW"] += 1
-                        break
+            for _ in range(self.simulation_speed):
+                start_time = time.perf_counter()
+                result = self._run_playout(self.board.copy(), self.turn)
+                PROFILER.add("monte_carlo", time.perf_counter() - start_time)
+                self.monte_carlo_results[result] += 1
                 
                 # Update total
                 self.monte_carlo_total += 1
@@ -1920,6 +3591,65 @@ class Game:
                     time.sleep(0.01)  # Small delay to allow UI updates
         finally:
             self.monte_carlo_running = False
+            # Wake the main loop if it is idle so the final result is drawn
+            if self.win is not None:
+                pygame.event.post(pygame.event.Event(REDRAW_EVENT))
+    
+    def _run_playout(self, board_copy, current_turn, max_moves=200):
+        """Play a random game on board_copy and return the result key ("RED", "WHITE" or "DRAW")"""
+        move_count = 0  # Capped at max_moves to prevent infinite games
+        tablebase = get_endgame_tablebase()
+        
+        while True:
+            # Check for winner
+            red_pieces = board_copy.get_all_pieces(RED)
+            white_pieces = board_copy.get_all_pieces(WHITE)
+            
+            if not red_pieces:
+                return "WHITE"
+            elif not white_pieces:
+                return "RED"
+            
+            # Few pieces left: finish with the exact tablebase result
+            if tablebase:
+                probe = tablebase.probe(board_copy, current_turn)
+                if probe:
+                    result = probe[0]
+                    if result == EndgameTablebase.DRAW:
+                        return "DRAW"
+                    winner = current_turn if result == EndgameTablebase.WIN else (WHITE if current_turn == RED else RED)
+                    return "RED" if winner == RED else "WHITE"
+            
+            # Check for moves
+            valid_moves_exist = False
+            pieces = board_copy.get_all_pieces(current_turn)
+            random.shuffle(pieces)  # Randomize piece selection
+            
+            for piece in pieces:
+                moves = self._get_valid_moves_for_simulation(board_copy, piece)
+                if moves:
+                    valid_moves_exist = True
+                    # Choose a random move
+                    move_pos, skipped = random.choice(list(moves.items()))
+                    
+                    # Execute the move
+                    row, col = move_pos
+                    board_copy.move(piece, row, col)
+                    if skipped:
+                        board_copy.remove(skipped)
+                    break
+            
+            if not valid_moves_exist:
+                # Current player has no valid moves
+                return "WHITE" if current_turn == RED else "RED"
+            
+            # Switch turn
+            current_turn = WHITE if current_turn == RED else RED
+            move_count += 1
+            
+            # Check for draw (too many moves)
+            if move_count >= max_moves:
+                return "DRAW"
     
     def _get_valid_moves_for_simulation(self, board, piece):
         """Get valid moves for a piece in simulation (without modifying the game state)"""
@@ -2004,7 +3734,7 @@ class Game:
         
         return moves
     
-    def minimax(self, board, depth, alpha, beta, is_maximizing, is_red_player):
+    def minimax(self, board, depth, alpha, beta, is_maximizing, is_red_player, ply=0):
         """
         Minimax algorithm with alpha-beta pruning
         - board: current board state
@@ -2012,98 +3742,239 @@ class Game:
         - alpha, beta: bounds for pruning
         - is_maximizing: whether current player is maximizing
         - is_red_player: whether AI is playing as red
+        - ply: distance from the root of the search
+        
+        Raises SearchTimeout once self.search_deadline (a time.perf_counter
+        value) has passed.
         """
+        stats = self.search_stats
+        stats.nodes += 1
+        if (self.search_deadline is not None and stats.nodes % DEADLINE_CHECK_NODES == 0 and
+                time.perf_counter() > self.search_deadline):
+            raise SearchTimeout()
+        to_move = RED if is_red_player == is_maximizing else WHITE
+        accumulator = self.value_net and self.search_accumulator(board, ply)
+        
+        # Exact result from the endgame tablebases (the root still needs a move)
+        if ply > 0:
+            score = self.tablebase_score(board, to_move, ply)
+            if score is not None:
+                return (score if is_maximizing else -score), None
+        
         # Terminal conditions
         if depth == 0 or board.red_left == 0 or board.white_left == 0:
-            return board.evaluate() if is_red_player else -board.evaluate(), None
+            stats.leaf_evals += 1
+            if not accumulator:
+                score = board.evaluate()
+            elif board.red_left and board.white_left:
+                score = accumulator.evaluate()
+            else:
+                score = self.value_net.WIN_SCORE if board.red_left else -self.value_net.WIN_SCORE
+            return score if is_red_player else -score, None
+        
+        # Reuse what an earlier search found for this position: a score if it searched at least
+        # as deep, otherwise its best move to try first
+        table = self.transposition_table
+        tt_move = None
+        if table is not None:
+            key = board.hash_key(to_move)
+            stats.tt_probes += 1
+            entry = table.probe(key)
+            if entry:
+                score, entry_depth, bound, tt_move = entry
+                if not is_red_player:
+                    score, bound = -score, self.flip_bound(bound)
+                if ply > 0 and entry_depth >= depth and (
+                        bound == TranspositionTable.EXACT or
+                        (bound == TranspositionTable.LOWER and score >= beta) or
+                        (bound == TranspositionTable.UPPER and score <= alpha)):
+                    stats.tt_hits += 1
+                    return score, None
         
         # Initialize best move
         best_move = None
+        best_eval = float('-inf') if is_maximizing else float('inf')
+        original_alpha, original_beta = alpha, beta
+        
+        # Get all valid moves for the side to move, the table's best move first
+        moves = []
+        for piece in board.get_all_pieces(to_move):
+            for move, skipped in self._get_valid_moves_for_simulation(board, piece).items():
+                moves.append((piece, move, skipped))
+        if tt_move:
+            for i, (piece, move, skipped) in enumerate(moves):
+                if (square_index(piece.row, piece.col), square_index(*move)) == tt_move:
+                    moves.insert(0, moves.pop(i))
+                    break
         
-        if is_maximizing:
-            # Maximizing player
-            max_eval = float('-inf')
-            color = RED if is_red_player else WHITE
+        # The children are leaves: the value network scores them all in one batch
+        if depth == 1 and self.value_net is not None:
+            return self.evaluate_children(board, moves, is_maximizing, is_red_player, ply)
+        
+        # Try each move
+        for move_index, (piece, move, skipped) in enumerate(moves):
+            # Create temporary board
+            temp_board = board.copy()
+            temp_piece = temp_board.get_piece(piece.row, piece.col)
+            if temp_piece == 0:  # Make sure piece is not 0
+                continue
             
-            # Get all valid moves for current player
-            for piece in board.get_all_pieces(color):
-                valid_moves = self.get_valid_moves(piece)
-                
-                # Try each move
-                for move, skipped in valid_moves.items():
-                    # Create temporary board
-                    temp_board = board.copy()
-                    temp_piece = temp_board.get_piece(piece.row, piece.col)
-                    
-                    if temp_piece != 0:  # Make sure piece is not 0
-                        # Make move on temporary board
-                        temp_board.move(temp_piece, move[0], move[1])
-                        if skipped:
-                            temp_board.remove(skipped)
-                        
-                        # Recursive evaluation
-                        eval, _ = self.minimax(temp_board, depth - 1, alpha, beta, False, is_red_player)
-                        
-                        # Update best move
-                        if eval > max_eval:
-                            max_eval = eval
-                            best_move = (piece, move)
-                        
-                        # Alpha-beta pruning
-                        alpha = max(alpha, eval)
-                        if beta <= alpha:
-                            break
+            # Make move on temporary board (and on the value network's sums)
+            if accumulator:
+                accumulator.push(*move_changes(piece, move, skipped))
+            temp_board.move(temp_piece, move[0], move[1])
+            if skipped:
+                temp_board.remove(skipped)
             
-            return max_eval, best_move
-        else:
-            # Minimizing player
-            min_eval = float('inf')
-            color = WHITE if is_red_player else RED
+            # Recursive evaluation
+            eval, _ = self.minimax(temp_board, depth - 1, alpha, beta, not is_maximizing, is_red_player, ply + 1)
+            if accumulator:
+                accumulator.pop()
             
-            # Get all valid moves for opponent
-            for piece in board.get_all_pieces(color):
-                valid_moves = self.get_valid_moves(piece)
-                
-                # Try each move
-                for move, skipped in valid_moves.items():
-                    # Create temporary board
-                    temp_board = board.copy()
-                    temp_piece = temp_board.get_piece(piece.row, piece.col)
-                    
-                    if temp_piece != 0:  # Make sure piece is not 0
-                        # Make move on temporary board
-                        temp_board.move(temp_piece, move[0], move[1])
-                        if skipped:
-                            temp_board.remove(skipped)
-                        
-                        # Recursive evaluation
-                        eval, _ = self.minimax(temp_board, depth - 1, alpha, beta, True, is_red_player)
-                        
-                        # Update best move
-                        if eval < min_eval:
-                            min_eval = eval
-                            best_move = (piece, move)
-                        
-                        # Alpha-beta pruning
-                        beta = min(beta, eval)
-                        if beta <= alpha:
-                            break
+            # Update best move and the pruning bounds (a lost position still needs a move)
+            if is_maximizing:
+                if eval > best_eval or best_move is None:
+                    best_eval = eval
+                    best_move = (piece, move)
+                alpha = max(alpha, eval)
+            else:
+                if eval < best_eval or best_move is None:
+                    best_eval = eval
+                    best_move = (piece, move)
+                beta = min(beta, eval)
             
-            return min_eval, best_move
+            # Alpha-beta pruning: no other move of this position can matter
+            if beta <= alpha:
+                stats.record_cutoff(move_index)
+                break
+        
+        # Tablebase scores depend on the distance from the root, so they are not stored
+        if table is not None and best_move and abs(best_eval) < TABLEBASE_WIN_SCORE / 2:
+            if best_eval <= original_alpha:
+                bound = TranspositionTable.UPPER
+            elif best_eval >= original_beta:
+                bound = TranspositionTable.LOWER
+            else:
+                bound = TranspositionTable.EXACT
+            score = best_eval
+            if not is_red_player:
+                score, bound = -score, self.flip_bound(bound)
+            piece, move = best_move
+            table.store(key, score, depth, bound, (square_index(piece.row, piece.col), square_index(*move)))
+        
+        return best_eval, best_move
+    
+    def tablebase_score(self, board, to_move, ply):
+        """Score of a tablebase position for to_move, ply plies from the root, or None if it is not in them"""
+        tablebase = get_endgame_tablebase()
+        probe = tablebase.probe(board, to_move) if tablebase else None
+        if not probe:
+            return None
+        self.search_stats.tb_hits += 1
+        result, plies = probe
+        if result == EndgameTablebase.DRAW:
+            return 0
+        # Prefer quicker wins and slower losses
+        score = TABLEBASE_WIN_SCORE - ply - plies
+        return score if result == EndgameTablebase.WIN else -score
+    
+    def search_accumulator(self, board, ply):
+        """The value network's accumulator, restarted at board when it is the root of a search"""
+        if ply == 0:
+            if self.accumulator is None or self.accumulator.net is not self.value_net:
+                self.accumulator = self.value_net.accumulator()
+            self.accumulator.refresh(board.bitboards())
+        return self.accumulator
+    
+    def evaluate_children(self, board, moves, is_maximizing, is_red_player, ply):
+        """minimax of a depth 1 node: every child that is not in the tablebases is scored in one network batch"""
+        stats = self.search_stats
+        child_to_move = RED if is_red_player != is_maximizing else WHITE
+        tablebase = get_endgame_tablebase()
+        scores = [0] * len(moves)
+        leaves, leaf_indexes = [], []
+        for index, (piece, move, skipped) in enumerate(moves):
+            stats.nodes += 1
+            if tablebase and board.red_left + board.white_left - len(skipped) <= tablebase.max_pieces:
+                child = board.copy()
+                child.move(child.get_piece(piece.row, piece.col), move[0], move[1])
+                if skipped:
+                    child.remove(skipped)
+                score = self.tablebase_score(child, child_to_move, ply + 1)
+                if score is not None:
+                    scores[index] = -score if is_maximizing else score
+                    continue
+            
+            opponents_left = (board.white_left if piece.color == RED else board.red_left) - len(skipped)
+            if opponents_left == 0:
+                score = self.value_net.WIN_SCORE if piece.color == RED else -self.value_net.WIN_SCORE
+                scores[index] = score if is_red_player else -score
+            else:
+                leaves.append(move_changes(piece, move, skipped))
+                leaf_indexes.append(index)
+        
+        # Only the upper layers run: the children's sums are the parent's plus a few weight rows
+        if leaves:
+            stats.leaf_evals += len(leaves)
+            for index, score in zip(leaf_indexes, self.accumulator.evaluate_children(leaves)):
+                scores[index] = score if is_red_player else -score
+        
+        if not moves:
+            return (float('-inf') if is_maximizing else float('inf')), None
+        best = (max if is_maximizing else min)(range(len(moves)), key=scores.__getitem__)
+        piece, move, _ = moves[best]
+        return scores[best], (piece, move)
+    
+    def search(self, board, depth, is_red_player, deadline=None):
+        """Search to depth and return (score, best move, depth reached)
+        
+        With a transposition table or a deadline (a time.perf_counter()
+        value) the search deepens one ply at a time: shallow iterations
+        leave best moves in the table that make the deeper ones prune
+        sooner, and a search that runs out of time returns the deepest
+        iteration it finished. Depth 1 always finishes.
+        """
+        result = (0, None, 0)
+        first_depth = 1 if self.transposition_table is not None or deadline is not None else depth
+        for iteration_depth in range(first_depth, depth + 1):
+            self.search_deadline = deadline if iteration_depth > 1 else None
+            try:
+                score, best_move = self.minimax(board, iteration_depth, float('-inf'), float('inf'), True, is_red_player)
+            except SearchTimeout:
+                break
+            finally:
+                self.search_deadline = None
+            result = (score, best_move, iteration_depth)
+        return result
+    
+    @staticmethod
+    def flip_bound(bound):
+        """The bound of a score seen from the other side"""
+        if bound == TranspositionTable.LOWER:
+            return TranspositionTable.UPPER
+        if bound == TranspositionTable.UPPER:
+            return TranspositionTable.LOWER
+        return bound
     
     def ai_move(self):
         """Make a move for the AI using minimax algorithm"""
         # Set thinking depth based on difficulty
-        if self.ai_difficulty == "easy":
-            depth = 2
-        elif self.ai_difficulty == "medium":
-            depth = 4
-        else:  # hard
-            depth = 6
+        depth = AI_DEPTHS.get(self.ai_difficulty, AI_DEPTHS["hard"])
         
         # Use minimax to find best move
         is_red_player = self.ai_color == RED
-        _, best_move = self.minimax(self.board, depth, float('-inf'), float('inf'), True, is_red_player)
+        self.search_stats = SearchStats(depth)
+        start_time = time.perf_counter()
+        with PROFILER.section("ai"):
+            # Early positions come straight from the opening book
+            best_move = self.book_move()
+            if best_move:
+                self.search_stats.book_hit = True
+            else:
+                _, best_move, _ = self.search(self.board, depth, is_red_player)
+        self.search_stats.elapsed = time.perf_counter() - start_time
+        self.last_search_stats = self.search_stats
+        self.log_search_stats(self.search_stats)
         
         if best_move:
             piece, move = best_move
@@ -2120,6 +3991,7 @@ class Game:
             pygame.time.delay(500)  # Pause to show selection
             
             # Make the move
+            start = (piece.row, piece.col)
             self.board.move(piece, row, col)
             skipped = self.valid_moves.get((row, col), [])
             if skipped:
@@ -2127,10 +3999,82 @@ class Game:
             
             # Change turn
             self.change_turn()
+            self.journal_move(start, move)
             return True
         
         # No valid moves for AI
         return False
+    
+    def book_move(self):
+        """Look the current position up in the opening book, returning (piece, move) or None"""
+        book = get_opening_book()
+        if book is None:
+            return None
+        
+        choice = book.choose(self.board, self.turn)
+        if not choice:
+            return None
+        
+        # Only play book moves that are legal here (guards against hash collisions)
+        (from_row, from_col), move = choice
+        piece = self.board.get_piece(from_row, from_col)
+        if not piece or piece.color != self.turn or move not in self.get_valid_moves(piece):
+            return None
+        return piece, move
+    
+    def log_search_stats(self, stats):
+        """Write the statistics of one AI search to the structured search log"""
+        record = {
+            "time": datetime.now().isoformat(),
+            "difficulty": self.ai_difficulty,
+            "ai_color": "RED" if self.ai_color == RED else "WHITE",
+            "move_number": len(self.move_history),
+            "red_left": self.board.red_left,
+            "white_left": self.board.white_left,
+            **stats.as_dict()
+        }
+        level = logging.WARNING if stats.elapsed >= SLOW_MOVE_SECONDS else logging.INFO
+        search_logger.log(level, json.dumps(record))
+
+def wait_for_events(timeout):
+    """Block until an event arrives or timeout ms pass, then return every queued event"""
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+def new_game(screen, username, game_menu, firebase_auth):
+    """Start a game in the mode picked in the menu; None if the game server can't be reached"""
+    network = None
+    if game_menu.game_mode in ("online", "spectate"):
+        id_token = firebase_auth.tokens.get_token() if firebase_auth and firebase_auth.local_id else None
+        try:
+            network = NetworkClient(GAME_SERVER, username, watch=game_menu.game_mode == "spectate",
+                                    id_token=id_token)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not reach the game server at {GAME_SERVER}: {e}")
+            return None
+    
+    game = Game(screen, username, game_menu.game_mode, game_menu.ai_difficulty, firebase_auth=firebase_auth,
+                network=network)
+    if network is None:
+        # Pick up the game left unfinished when the window last closed, then keep autosaving
+        difficulty = game_menu.ai_difficulty if game_menu.game_mode == "human_vs_ai" else None
+        session = SessionJournal.load(SESSION_FILE)
+        saved_as = session and (session["username"], session["game_mode"], session["ai_difficulty"])
+        if saved_as == (username or "", game_menu.game_mode, difficulty):
+            try:
+                game.resume_session(session)
+                print(f"♻️ Resumed your unfinished game ({len(game.move_history)} moves in)")
+            except ValueError as e:
+                print(f"⚠️ Could not resume the saved game: {e}")
+                game = Game(screen, username, game_menu.game_mode, game_menu.ai_difficulty,
+                            firebase_auth=firebase_auth)
+        game.journal = SessionJournal(SESSION_FILE, username, game_menu.game_mode, difficulty, game)
+    # Run initial Monte Carlo simulation; spectators get theirs from the server
+    if game_menu.game_mode != "spectate":
+        game.run_monte_carlo_simulation()
+    return game
 
 def main():
     """Main game loop"""
@@ -2146,59 +4090,94 @@ def main():
     username = None
     firebase_auth = FirestoreAuth()
     
+    # Structured log of AI search statistics
+    search_handler = logging.FileHandler(SEARCH_LOG_FILE)
+    search_handler.setFormatter(logging.Formatter("%(message)s"))
+    search_logger.addHandler(search_handler)
+    search_logger.setLevel(logging.INFO)
+    
     # Main loop
     running = True
     clock = pygame.time.Clock()
     
     while running:
-        clock.tick(60)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            
-            if current_screen == "login":
-                result = login_screen.handle_event(event)
-                if result:  # Successful login
-                    username = result
-                    game_menu = GameMenu(screen, username, firebase_auth)
-                    current_screen = "menu"
-            
-            elif current_screen == "menu":
-                result = game_menu.handle_event(event)
-                if result == "start_game":
-                    game = Game(screen, username, game_menu.game_mode, game_menu.ai_difficulty, firebase_auth=firebase_auth)
-                    current_screen = "game"
-                    # Run initial Monte Carlo simulation
-                    game.run_monte_carlo_simulation()
-                elif result == "logout":
-                    login_screen = LoginScreen(screen)
-                    current_screen = "login"
-            
-            elif current_screen == "game":
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = pygame.mouse.get_pos()
+        # Draw at the animation rate while something moves; otherwise sleep until an event arrives
+        animating = current_screen != "game" or game.is_animating() or PROFILER.show_overlay
+        if animating:
+            clock.tick(ANIMATION_FPS)
+            events = pygame.event.get()
+        else:
+            events = wait_for_events(IDLE_WAIT_MS)
+        PROFILER.begin_frame()
+        
+        with PROFILER.section("events"):
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    PROFILER.handle_key(event.key)
+                elif event.type == pygame.VIDEORESIZE:
+                    SPRITES.rebuild()
+                    if game:
+                        game.invalidate()
+                
+                if current_screen == "login":
+                    result = login_screen.handle_event(event)
+                    if result:  # Successful login
+                        username = result
+                        firebase_auth = login_screen.firebase  # The signed-in session
+                        game_menu = GameMenu(screen, username, firebase_auth)
+                        current_screen = "menu"
+                
+                elif current_screen == "menu":
+                    result = game_menu.handle_event(event)
+                    if result == "start_game":
+                        game = new_game(screen, username, game_menu, firebase_auth)
+                        if game:
+                            current_screen = "game"
+                    elif result == "logout":
+                        firebase_auth.stats_queue.stop()  # Unsent stats stay journaled
+                        login_screen = LoginScreen(screen)
+                        current_screen = "login"
+                
+                elif current_screen == "game":
+                    if event.type == pygame.MOUSEBUTTONDOWN:
+                        pos = pygame.mouse.get_pos()
+                        
+                        if not game.game_over:
+                            result = game.select(pos)
+                            if result == "menu":
+                                game.close()
+                                current_screen = "menu"
+                        else:
+                            # Restart game if clicked after game over; online this looks for a new opponent
+                            game.close()
+                            game = new_game(screen, username, game_menu, firebase_auth) or game
                     
-                    if not game.game_over:
-                        result = game.select(pos)
-                        if result == "menu":
-                            current_screen = "menu"
+                    elif event.type == pygame.KEYDOWN:
+                        game.handle_key(event.key)
+        
+        # Draw current screen; an idle wait that timed out has nothing new to show
+        if events or animating:
+            with PROFILER.section("render"):
+                if current_screen == "game":
+                    # The game screen updates only the rectangles that changed
+                    game.update()
+                else:
+                    if current_screen == "login":
+                        login_screen.draw()
                     else:
-                        # Restart game if clicked after game over
-                        game = Game(screen, username, game_menu.game_mode, game_menu.ai_difficulty, firebase_auth=firebase_auth)
-                        # Run initial Monte Carlo simulation for new game
-                        game.run_monte_carlo_simulation()
-        
-        # Draw current screen
-        if current_screen == "login":
-            login_screen.draw()
-        elif current_screen == "menu":
-            game_menu.draw()
-        elif current_screen == "game":
-            game.update()
+                        game_menu.draw()
+                    
+                    PROFILER.draw_overlay(screen)
+                    pygame.display.update()
         
-        pygame.display.update()
+        PROFILER.end_frame()
     
+    PROFILER.stop_capture()
+    if game:
+        game.close(keep_session=True)  # An unfinished local game is resumed next time
+    firebase_auth.stats_queue.stop()
     pygame.quit()
     sys.exit()
 
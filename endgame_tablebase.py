@@ -0,0 +1,260 @@
+"""Endgame tablebase generator for AI Checkers Master.
+
+Solves every position with up to --pieces pieces by retrograde analysis and
+writes one win/loss/draw table per material signature into the tablebase
+directory (see checkers.EndgameTablebase for the file format). Search and
+Monte Carlo playouts probe the tables to stop early with an exact result.
+
+Signatures are solved from fewest pieces up, and with fewer men first, so
+every capture or promotion leads into a table that is already finished.
+Within a signature, positions with no moves are losses; the analysis then
+works backwards from them, one ply per pass: a position is a win if some
+move reaches a loss for the opponent, and a loss if every move reaches a
+win for the opponent. Whatever is left unresolved is a draw.
+
+The rules are the game's own: moves come from Game._get_valid_moves_for_simulation,
+and a side with no pieces or no moves loses.
+
+Usage:
+    python endgame_tablebase.py                 # up to 3 pieces
+    python endgame_tablebase.py --pieces 4
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from array import array
+from itertools import product
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+from checkers import (RED, WHITE, TABLEBASE_DIR, TABLEBASE_SQUARES, Board, EndgameTablebase, Game,
+                      material_signature, piece_kind, square_coords, square_index,
+                      tablebase_index, tablebase_size)
+
+INVALID, DRAW, WIN, LOSS = EndgameTablebase.INVALID, EndgameTablebase.DRAW, EndgameTablebase.WIN, EndgameTablebase.LOSS
+MAX_PLIES = (1 << 14) - 1  # Largest distance an entry can hold
+
+
+def signatures(max_pieces):
+    """Every material signature with both sides on the board, in solving order"""
+    result = []
+    for signature in product(range(max_pieces + 1), repeat=4):
+        red_men, red_kings, white_men, white_kings = signature
+        if red_men + red_kings and white_men + white_kings and sum(signature) <= max_pieces:
+            result.append(signature)
+    # Captures remove a piece and promotions turn a man into a king
+    result.sort(key=lambda signature: (sum(signature), signature[0] + signature[2]))
+    return result
+
+
+def unrank(rank, count):
+    """Positions (ascending) of the combination with the given combinatorial rank"""
+    positions = []
+    for i in range(count, 0, -1):
+        position = i - 1
+        while math.comb(position + 1, i) <= rank:
+            position += 1
+        rank -= math.comb(position, i)
+        positions.append(position)
+    return positions[::-1]
+
+
+def decode(signature, index):
+    """Turn a table index back into (squares_by_kind, turn)"""
+    turn = RED if index % 2 == 0 else WHITE
+    index //= 2
+
+    squares_by_kind = [None] * 4
+    for kind in range(3, -1, -1):
+        allowed = TABLEBASE_SQUARES[kind]
+        combinations = math.comb(len(allowed), signature[kind])
+        rank = index % combinations
+        index //= combinations
+        squares_by_kind[kind] = [allowed[position] for position in unrank(rank, signature[kind])]
+
+    return squares_by_kind, turn
+
+
+def build_board(squares_by_kind):
+    """Board for a tablebase position, or None if two pieces share a square"""
+    pieces = []
+    occupied = set()
+    for kind, squares in enumerate(squares_by_kind):
+        for square in squares:
+            if square in occupied:
+                return None
+            occupied.add(square)
+            row, col = square_coords(square)
+            pieces.append((row, col, RED if kind < 2 else WHITE, kind % 2 == 1))
+    return Board.from_pieces(pieces)
+
+
+def position_squares(board):
+    """Sorted square indices of each piece type on the board"""
+    squares_by_kind = ([], [], [], [])
+    for piece in board.get_all_pieces(RED) + board.get_all_pieces(WHITE):
+        squares_by_kind[piece_kind(piece)].append(square_index(piece.row, piece.col))
+    for squares in squares_by_kind:
+        squares.sort()
+    return squares_by_kind
+
+
+class Solver:
+    """Solves signatures in order, keeping finished tables in memory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.game = Game(None)  # Used only for its move generator
+        self.tables = {}
+
+    def load(self, signature):
+        """Read a previously generated table; returns False if there is none"""
+        path = os.path.join(self.directory, EndgameTablebase.filename(signature))
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            data = f.read()
+        values = array("H")
+        values.frombytes(data[EndgameTablebase.HEADER.size:])
+        if sys.byteorder == "big":
+            values.byteswap()
+        if len(values) != tablebase_size(signature):
+            return False
+        self.tables[signature] = values
+        return True
+
+    def save(self, signature, values):
+        """Write a finished table to the tablebase directory"""
+        path = os.path.join(self.directory, EndgameTablebase.filename(signature))
+        data = array("H", values)
+        if sys.byteorder == "big":
+            data.byteswap()
+        with open(path + ".tmp", "wb") as f:
+            f.write(EndgameTablebase.HEADER.pack(EndgameTablebase.MAGIC, EndgameTablebase.VERSION,
+                                                 *signature, len(values)))
+            f.write(data.tobytes())
+        os.replace(path + ".tmp", path)
+
+    def child_value(self, child, turn):
+        """Stored entry of a finished position in another signature"""
+        if not child.red_left or not child.white_left:
+            return LOSS  # The side to move has no pieces left
+        return self.tables[material_signature(child)][tablebase_index(position_squares(child), turn)]
+
+    def solve(self, signature):
+        """Solve every position of one signature"""
+        size = tablebase_size(signature)
+        values = array("H", bytes(2 * size))
+
+        # Positions still to resolve: index -> (internal children, fastest external win, all external
+        # children won by the opponent, slowest such win)
+        pending = {}
+        for index in range(size):
+            squares_by_kind, turn = decode(signature, index)
+            board = build_board(squares_by_kind)
+            if board is None:
+                continue
+
+            next_turn = WHITE if turn == RED else RED
+            internal = []
+            win_plies = None
+            all_lost = True
+            slowest_loss = 0
+            has_moves = False
+
+            for piece in board.get_all_pieces(turn):
+                for move, skipped in self.game._get_valid_moves_for_simulation(board, piece).items():
+                    has_moves = True
+                    child = board.copy()
+                    child.move(child.get_piece(piece.row, piece.col), move[0], move[1])
+                    if skipped:
+                        child.remove(skipped)
+
+                    if child.red_left and child.white_left and material_signature(child) == signature:
+                        internal.append(tablebase_index(position_squares(child), next_turn))
+                        continue
+
+                    entry = self.child_value(child, next_turn)
+                    result, plies = entry & 3, entry >> 2
+                    if result == LOSS:
+                        win_plies = plies if win_plies is None else min(win_plies, plies)
+                    elif result == WIN:
+                        slowest_loss = max(slowest_loss, plies)
+                    else:
+                        all_lost = False
+
+            if not has_moves:
+                values[index] = LOSS
+            else:
+                pending[index] = (internal, win_plies, all_lost, slowest_loss)
+
+        # Work backwards from the decided positions one ply at a time
+        passes = 0
+        while pending:
+            passes += 1
+            updates = []
+            for index, (internal, win_plies, all_lost, slowest_loss) in pending.items():
+                for child_index in internal:
+                    entry = values[child_index]
+                    result = entry & 3
+                    if result == LOSS:
+                        plies = entry >> 2
+                        win_plies = plies if win_plies is None else min(win_plies, plies)
+                    elif result == WIN:
+                        slowest_loss = max(slowest_loss, entry >> 2)
+                    else:
+                        all_lost = False
+
+                if win_plies is not None:
+                    updates.append((index, WIN | min(win_plies + 1, MAX_PLIES) << 2))
+                elif all_lost:
+                    updates.append((index, LOSS | min(slowest_loss + 1, MAX_PLIES) << 2))
+
+            if not updates:
+                break
+            for index, entry in updates:
+                values[index] = entry
+                del pending[index]
+
+        for index in pending:
+            values[index] = DRAW
+
+        self.tables[signature] = values
+        return values, passes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases")
+    parser.add_argument("--pieces", type=int, default=3, help="largest total number of pieces to solve")
+    parser.add_argument("--directory", default=TABLEBASE_DIR, help="directory the tables are written to")
+    parser.add_argument("--force", action="store_true", help="regenerate tables that already exist")
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    solver = Solver(args.directory)
+
+    for signature in signatures(args.pieces):
+        name = EndgameTablebase.filename(signature)
+        if not args.force and solver.load(signature):
+            print(f"{name}: already generated")
+            continue
+
+        start_time = time.perf_counter()
+        values, passes = solver.solve(signature)
+        solver.save(signature, values)
+
+        counts = {result: 0 for result in (WIN, LOSS, DRAW)}
+        for entry in values:
+            if entry & 3:
+                counts[entry & 3] += 1
+        print(f"{name}: {counts[WIN]} wins, {counts[LOSS]} losses, {counts[DRAW]} draws "
+              f"({passes} passes, {time.perf_counter() - start_time:.1f}s)")
+
+    print(f"🏁 Tablebases for up to {args.pieces} pieces written to {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
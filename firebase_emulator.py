@@ -0,0 +1,295 @@
+"""Local stand-in for the Firebase services used by AI Checkers Master.
+
+Serves the Identity Toolkit, secure token and Firestore REST endpoints that
+FirestoreAuth calls, keeping accounts and documents in memory, so sign-up,
+sign-in, token refresh and stats updates can be exercised offline, in CI or
+under load (see load_test.py). Point the game at it with:
+
+    FIREBASE_EMULATOR_URL=http://127.0.0.1:9099 python checkers.py
+
+Only what the game uses is implemented: accounts:signUp,
+accounts:signInWithPassword, accounts:lookup (how game_server.py checks an
+ID token), token refresh, document GET and PATCH, and
+documents:commit with update writes, exists preconditions, increment and
+REQUEST_TIME transforms.
+
+Usage:
+    python firebase_emulator.py                     # listen on 127.0.0.1:9099
+    python firebase_emulator.py --port 9100 --token-lifetime 60
+"""
+
+import argparse
+import json
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9099
+DEFAULT_TOKEN_LIFETIME = 3600  # Seconds an ID token is valid, as reported in expiresIn
+
+AUTH_PREFIX = "/identitytoolkit.googleapis.com/v1/accounts:"
+TOKEN_PATH = "/securetoken.googleapis.com/v1/token"
+FIRESTORE_PREFIX = "/v1/"
+
+
+def now_timestamp():
+    """Current time in Firestore's timestamp format"""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FirebaseState:
+    """Accounts, tokens and documents of the emulated project"""
+
+    def __init__(self, token_lifetime):
+        self.token_lifetime = token_lifetime
+        self.lock = threading.Lock()
+        self.accounts = {}        # email -> {"localId", "password"}
+        self.id_tokens = {}       # ID token -> (localId, expiry on the monotonic clock)
+        self.refresh_tokens = {}  # refresh token -> localId
+        self.documents = {}       # full document name -> fields
+        self.commits = 0
+
+    def issue_tokens(self, local_id):
+        """New ID and refresh tokens for an account"""
+        id_token = secrets.token_hex(16)
+        refresh_token = secrets.token_hex(16)
+        self.id_tokens[id_token] = (local_id, time.monotonic() + self.token_lifetime)
+        self.refresh_tokens[refresh_token] = local_id
+        return id_token, refresh_token
+
+
+def error(code, message, status):
+    """Firebase-style error body"""
+    return code, {"error": {"code": code, "message": message, "status": status}}
+
+
+def apply_increment(current, increment):
+    """Add an increment transform to a field value, keeping integers as integers"""
+    if "integerValue" in increment and (current is None or "integerValue" in current):
+        base = int(current["integerValue"]) if current else 0
+        return {"integerValue": str(base + int(increment["integerValue"]))}
+    base = float(next(iter(current.values()))) if current else 0.0
+    return {"doubleValue": base + float(next(iter(increment.values())))}
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoints
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+            return {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+        return json.loads(raw) if raw else {}
+
+    def authenticated_user(self):
+        """localId of the bearer token, or None if it is missing, unknown or expired"""
+        header = self.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return None
+        local_id, expires_at = self.state.id_tokens.get(header[len("Bearer "):], (None, 0))
+        return local_id if time.monotonic() < expires_at else None
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def dispatch(self, method):
+        path = unquote(urlsplit(self.path).path)
+        try:
+            body = self.read_body() if method != "GET" else {}
+        except ValueError:
+            self.send_json(*error(400, "Invalid JSON payload", "INVALID_ARGUMENT"))
+            return
+
+        if method == "POST" and path.startswith(AUTH_PREFIX):
+            result = self.accounts(path[len(AUTH_PREFIX):], body)
+        elif method == "POST" and path == TOKEN_PATH:
+            result = self.refresh(body)
+        elif path.startswith(FIRESTORE_PREFIX):
+            if self.authenticated_user() is None:
+                result = error(401, "Missing or invalid authentication.", "UNAUTHENTICATED")
+            elif method == "POST" and path.endswith("/documents:commit"):
+                result = self.commit(body)
+            elif method == "GET":
+                result = self.get_document(path[len(FIRESTORE_PREFIX):])
+            elif method == "PATCH":
+                result = self.patch_document(path[len(FIRESTORE_PREFIX):], body)
+            else:
+                result = error(404, "Not found", "NOT_FOUND")
+        else:
+            result = error(404, "Not found", "NOT_FOUND")
+        self.send_json(*result)
+
+    def accounts(self, action, body):
+        """accounts:signUp, accounts:signInWithPassword and accounts:lookup"""
+        if action == "lookup":
+            return self.lookup(body)
+        email = body.get("email", "").lower()
+        password = body.get("password", "")
+        if "@" not in email:
+            return error(400, "INVALID_EMAIL", "INVALID_ARGUMENT")
+
+        state = self.state
+        with state.lock:
+            if action == "signUp":
+                if email in state.accounts:
+                    return error(400, "EMAIL_EXISTS", "INVALID_ARGUMENT")
+                if len(password) < 6:
+                    return error(400, "WEAK_PASSWORD : Password should be at least 6 characters", "INVALID_ARGUMENT")
+                state.accounts[email] = {"localId": secrets.token_hex(14), "password": password}
+            elif action == "signInWithPassword":
+                if email not in state.accounts:
+                    return error(400, "EMAIL_NOT_FOUND", "INVALID_ARGUMENT")
+                if state.accounts[email]["password"] != password:
+                    return error(400, "INVALID_PASSWORD", "INVALID_ARGUMENT")
+            else:
+                return error(404, "Not found", "NOT_FOUND")
+
+            local_id = state.accounts[email]["localId"]
+            id_token, refresh_token = state.issue_tokens(local_id)
+        return 200, {"localId": local_id, "email": email, "idToken": id_token,
+                     "refreshToken": refresh_token, "expiresIn": str(state.token_lifetime)}
+
+    def lookup(self, body):
+        """The account an ID token belongs to, if the token is known and unexpired"""
+        state = self.state
+        with state.lock:
+            local_id, expires_at = state.id_tokens.get(body.get("idToken"), (None, 0))
+            if time.monotonic() >= expires_at:
+                return error(400, "INVALID_ID_TOKEN", "INVALID_ARGUMENT")
+            email = next(email for email, account in state.accounts.items() if account["localId"] == local_id)
+        return 200, {"users": [{"localId": local_id, "email": email}]}
+
+    def refresh(self, body):
+        """securetoken token endpoint (grant_type=refresh_token)"""
+        state = self.state
+        with state.lock:
+            local_id = state.refresh_tokens.pop(body.get("refresh_token"), None)
+            if body.get("grant_type") != "refresh_token" or local_id is None:
+                return error(400, "INVALID_REFRESH_TOKEN", "INVALID_ARGUMENT")
+            id_token, refresh_token = state.issue_tokens(local_id)
+        return 200, {"id_token": id_token, "refresh_token": refresh_token,
+                     "expires_in": str(state.token_lifetime), "user_id": local_id, "token_type": "Bearer"}
+
+    def get_document(self, name):
+        with self.state.lock:
+            fields = self.state.documents.get(name)
+        if fields is None:
+            return error(404, f"No document to update: {name}", "NOT_FOUND")
+        return 200, {"name": name, "fields": fields}
+
+    def patch_document(self, name, body):
+        """PATCH without an update mask replaces the document's fields"""
+        with self.state.lock:
+            self.state.documents[name] = dict(body.get("fields", {}))
+            fields = self.state.documents[name]
+        return 200, {"name": name, "fields": fields}
+
+    def commit(self, body):
+        """Apply every write atomically, or none if a precondition fails"""
+        state = self.state
+        with state.lock:
+            # Check all preconditions before changing anything
+            for write in body.get("writes", []):
+                precondition = write.get("currentDocument", {})
+                name = write.get("update", {}).get("name") or write.get("transform", {}).get("document")
+                if "exists" in precondition and (name in state.documents) != precondition["exists"]:
+                    if precondition["exists"]:
+                        return error(404, f"No document to update: {name}", "NOT_FOUND")
+                    return error(409, f"Document already exists: {name}", "ALREADY_EXISTS")
+
+            commit_time = now_timestamp()
+            results = []
+            for write in body.get("writes", []):
+                if "update" in write:
+                    update = write["update"]
+                    state.documents[update["name"]] = dict(update.get("fields", {}))
+                    results.append({"updateTime": commit_time})
+                elif "transform" in write:
+                    transform = write["transform"]
+                    fields = state.documents.setdefault(transform["document"], {})
+                    transform_results = []
+                    for field_transform in transform.get("fieldTransforms", []):
+                        path = field_transform["fieldPath"]
+                        if "increment" in field_transform:
+                            fields[path] = apply_increment(fields.get(path), field_transform["increment"])
+                        elif field_transform.get("setToServerValue") == "REQUEST_TIME":
+                            fields[path] = {"timestampValue": commit_time}
+                        transform_results.append(fields.get(path))
+                    results.append({"updateTime": commit_time, "transformResults": transform_results})
+            state.commits += 1
+        return 200, {"writeResults": results, "commitTime": commit_time}
+
+
+class EmulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Room for load tests opening many connections at once
+
+    def __init__(self, address, token_lifetime=DEFAULT_TOKEN_LIFETIME, verbose=False):
+        super().__init__(address, EmulatorHandler)
+        self.state = FirebaseState(token_lifetime)
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_background(host=DEFAULT_HOST, port=0, token_lifetime=DEFAULT_TOKEN_LIFETIME):
+    """Start an emulator on a background thread; port 0 picks a free port"""
+    server = EmulatorServer((host, port), token_lifetime)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for Firebase Auth and Firestore")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--token-lifetime", type=int, default=DEFAULT_TOKEN_LIFETIME,
+                        help="seconds an ID token is valid (small values exercise token refresh)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    server = EmulatorServer((args.host, args.port), args.token_lifetime, args.verbose)
+    print(f"🔥 Firebase emulator listening on {server.url}")
+    print(f"   FIREBASE_EMULATOR_URL={server.url} python checkers.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
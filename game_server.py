@@ -0,0 +1,604 @@
+"""Multiplayer game server for AI Checkers Master.
+
+Hosts online matches for many players in one asyncio process. Public
+players are paired by rating (leaderboard.Matchmaker) as they join, and
+players left waiting are paired once their rating windows have widened
+enough (every MATCH_SWEEP_INTERVAL). Each room keeps the authoritative Board,
+checks every move with the game's own rules engine
+(Game._get_valid_moves_for_simulation) and pushes the new position to both
+players. checkers.NetworkClient is the client side: the pygame Game only
+mirrors what the server sends.
+
+Messages are the binary frames of protocol.py:
+
+    client -> server   AUTH (Firebase ID token), JOIN (name, room or "" for the next public match),
+                       MOVE (from, to), LEAVE, WATCH (room or "" for the featured match)
+    server -> client   WAITING (room), START (side, room, opponent), STATE (position), ERROR (text),
+                       WATCHING (room, players), DELTA (move), PROBABILITY (playout results)
+
+Each connection is an asyncio.BufferedProtocol that receives straight into
+a protocol.FrameBuffer, so frames are parsed in place without copying.
+
+Any number of spectators can watch a match. A new spectator gets the
+current position as a keyframe. After that, each move is encoded once as a
+DELTA frame and the same bytes object is written to every spectator, so a
+move costs O(1) per spectator. The featured match is the one with the most
+spectators; if no match is being played, "" waits for the next one. With
+AI workers, spectators also get Monte Carlo win probabilities, at most one
+update per PROBABILITY_INTERVAL per match.
+
+A side with no pieces or no moves loses; a player who leaves a match in
+progress forfeits it. Names are taken as sent and only shown. A signed-in
+client sends its Firebase ID token in AUTH before JOIN; the server checks
+it with Firebase (accounts:lookup, in a worker thread) and holds the
+client's later frames until it knows the account. Only matches between
+two different verified accounts are rated with Elo, on the leaderboard by
+uid, which is saved as a snapshot every SNAPSHOT_INTERVAL seconds and on
+shutdown.
+
+With --ai-workers, joining the room "ai:easy", "ai:medium" or "ai:hard"
+starts a match against the AI. Its moves come from a shared
+ai_service.AIService, so all AI matches together use at most that many
+processes. If the service can't answer within AI_MOVE_BUDGET, the AI plays
+a one-ply move instead.
+
+Usage:
+    python game_server.py                          # listens on 0.0.0.0:8765
+    python game_server.py --port 9000 --stats-interval 10
+    python game_server.py --ai-workers 4
+    python game_server.py --leaderboard ratings.json
+"""
+
+import argparse
+import asyncio
+import sys
+import uuid
+
+import requests
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+import protocol
+from ai_service import AIService
+from checkers import (AI_DEPTHS, FIREBASE_API_KEY, FIREBASE_AUTH_URL, HTTP_TIMEOUT, RED, SIDES, WHITE, Board, Game,
+                      get_http_session, square_coords, square_index)
+from leaderboard import LEADERBOARD_FILE, Leaderboard, Matchmaker
+
+DEFAULT_PORT = 8765
+MAX_WRITE_BUFFER = 256 * 1024  # Clients that fall this far behind on reading are disconnected
+MAX_NAME_LENGTH = 32
+AI_MOVE_BUDGET = 2.0  # Seconds the AI service may take for one move
+PROBABILITY_INTERVAL = 1.0  # Fewest seconds between win-probability updates of one match
+SPECTATOR_PLAYOUTS = 100  # Playouts behind each win-probability update
+PROBABILITY_BUDGET = 0.5  # Seconds the AI service may take for them
+SNAPSHOT_INTERVAL = 60  # Seconds between leaderboard snapshots
+MATCH_SWEEP_INTERVAL = 1.0  # Seconds between looks for waiting players whose windows now allow a match
+
+
+def other(color):
+    return WHITE if color == RED else RED
+
+
+def verify_id_token(id_token):
+    """uid of the Firebase account an ID token belongs to, or None if Firebase does not accept it"""
+    try:
+        response = get_http_session().post(f"{FIREBASE_AUTH_URL}:lookup?key={FIREBASE_API_KEY}",
+                                           json={"idToken": id_token}, timeout=HTTP_TIMEOUT)
+        users = response.json().get("users") if response.ok else None
+    except (requests.RequestException, ValueError):
+        return None
+    return users[0].get("localId") if users else None
+
+
+class Player:
+    """One connected client"""
+    __slots__ = ("transport", "name", "uid", "pending", "room", "color", "watching")
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.name = "Guest"
+        self.uid = None  # Firebase uid, once the client's ID token is verified
+        self.pending = None  # Frames received while the ID token is being verified
+        self.room = None
+        self.color = None
+        self.watching = None  # Room whose moves we get as a spectator
+
+    def send(self, data):
+        """Queue encoded data without waiting; a client that stops reading is dropped"""
+        transport = self.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            transport.abort()  # connection_lost then forfeits the client's match
+            return
+        transport.write(data)
+
+
+class AIPlayer:
+    """The AI's seat in a match; its moves come from the AI service"""
+    __slots__ = ("name", "uid", "room", "color", "depth")
+
+    def __init__(self, difficulty):
+        self.name = f"AI ({difficulty.capitalize()})"
+        self.uid = None  # Never rated
+        self.room = None
+        self.color = None
+        self.depth = AI_DEPTHS[difficulty]
+
+    def send(self, data):
+        pass
+
+
+class Room:
+    """One match: the authoritative position, its players and its spectators"""
+    __slots__ = ("room_id", "board", "turn", "players", "winner", "rated", "spectators", "moves_played",
+                 "probability", "probability_at", "probability_task")
+
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.board = Board()
+        self.turn = RED
+        self.players = {}  # Colour -> Player
+        self.winner = None
+        self.rated = None  # ((red uid, name), (white uid, name)) if the result goes on the leaderboard
+        self.spectators = set()
+        self.moves_played = 0
+        self.probability = None  # PROBABILITY frame of the current position, once computed
+        self.probability_at = float("-inf")  # Event loop time of the last probability update
+        self.probability_task = None
+
+    def side(self, color):
+        return SIDES[color] if color else protocol.NO_SIDE
+
+    def state(self, last_move=None):
+        return protocol.encode_state(self.board.bitboards(), SIDES[self.turn], self.side(self.winner), last_move)
+
+    def watching(self):
+        names = [self.players[color].name if color in self.players else "" for color in (RED, WHITE)]
+        return protocol.encode_watching(self.room_id, *names)
+
+    def broadcast(self, data):
+        for player in self.players.values():
+            player.send(data)
+
+    def fan_out(self, data):
+        """Send one encoded frame to every spectator"""
+        for spectator in self.spectators:
+            spectator.send(data)
+
+
+class GameServer:
+    """Matchmaking, rooms and move validation; one instance serves every connection"""
+
+    def __init__(self, ai=None, leaderboard=None):
+        self.rules = Game(None)  # Used only for its move generator
+        self.ai = ai
+        self.ai_tasks = set()
+        self.auth_tasks = set()
+        self.leaderboard = leaderboard or Leaderboard()
+        self.matchmaker = Matchmaker()  # Public rooms with one player waiting, by rating
+        self.rooms = {}
+        self.lobby = set()  # Spectators waiting for the next match to start
+        self.players = 0
+        self.moves = 0
+        self.games_started = 0
+        self.games_finished = 0
+
+    def dispatch(self, player, kind, payload):
+        if player.pending is not None:
+            player.pending.append((kind, bytes(payload)))  # The payload view is reused once we return
+            return
+        if kind == protocol.AUTH:
+            self.authenticate(player, protocol.decode_auth(payload))
+        elif kind == protocol.JOIN:
+            self.join(player, *protocol.decode_join(payload))
+        elif kind == protocol.MOVE:
+            self.move(player, *protocol.decode_move(payload))
+        elif kind == protocol.LEAVE:
+            self.leave(player)
+        elif kind == protocol.WATCH:
+            self.watch(player, protocol.decode_watch(payload))
+        else:
+            player.send(protocol.encode_error(f"Unknown message type {kind}"))
+
+    def authenticate(self, player, id_token):
+        """Look up the account of an ID token; the player's next frames wait for the answer"""
+        if player.room is not None:
+            player.send(protocol.encode_error("Already in a match"))
+            return
+        player.uid = None
+        player.pending = []
+        task = asyncio.get_running_loop().create_task(self.verify(player, id_token))
+        self.auth_tasks.add(task)
+        task.add_done_callback(self.auth_tasks.discard)
+
+    async def verify(self, player, id_token):
+        """Set the player's uid from Firebase, then handle the frames held back meanwhile"""
+        uid = await asyncio.get_running_loop().run_in_executor(None, verify_id_token, id_token)
+        pending, player.pending = player.pending, None
+        if player.transport.is_closing():
+            return
+        player.uid = uid
+        if uid is None:
+            player.send(protocol.encode_error("Sign-in could not be verified; your matches will not be rated"))
+        try:
+            for kind, payload in pending:
+                self.dispatch(player, kind, payload)
+        except protocol.ProtocolError as e:
+            player.send(protocol.encode_error(str(e)))
+            player.transport.close()
+
+    def join(self, player, name, room_id):
+        """Put the player in a private room or pair them with the next public player"""
+        if player.room is not None:
+            player.send(protocol.encode_error("Already in a match"))
+            return
+        player.name = name[:MAX_NAME_LENGTH] or "Guest"
+        self.unwatch(player)
+
+        if room_id.startswith("ai:"):
+            difficulty = room_id[3:]
+            if self.ai is None or difficulty not in AI_DEPTHS:
+                player.send(protocol.encode_error("No AI opponent of that kind on this server"))
+                return
+            room_id = f"ai-{uuid.uuid4().hex[:12]}"
+            room = self.rooms[room_id] = Room(room_id)
+            ai_player = AIPlayer(difficulty)
+            ai_player.color = WHITE
+            ai_player.room = room
+            room.players[WHITE] = ai_player
+        elif room_id:
+            room_id = room_id[:MAX_NAME_LENGTH]
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = Room(room_id)
+            elif len(room.players) == 2:
+                player.send(protocol.encode_error("Room is full"))
+                return
+        else:
+            rating = self.leaderboard.rating(player.uid)
+            now = asyncio.get_running_loop().time()
+            room = self.matchmaker.pop_match(rating, now)
+            if room is None:
+                room_id = uuid.uuid4().hex[:12]
+                room = self.rooms[room_id] = Room(room_id)
+                self.matchmaker.add(room, rating, now)
+
+        player.color = RED if RED not in room.players else WHITE
+        player.room = room
+        room.players[player.color] = player
+        if len(room.players) < 2:
+            player.send(protocol.encode_waiting(room.room_id))
+            return
+        self.start(room)
+
+    def pair_waiting(self, room, other_room):
+        """Move the player waiting in other_room, and its spectators, into room and start the match"""
+        player = next(iter(other_room.players.values()))
+        self.rooms.pop(other_room.room_id, None)
+        other_room.players.clear()
+        # start() sends them the new room's players and position as a keyframe
+        for spectator in other_room.spectators:
+            spectator.watching = room
+        room.spectators |= other_room.spectators
+        other_room.spectators.clear()
+        player.color = RED if RED not in room.players else WHITE
+        player.room = room
+        room.players[player.color] = player
+        self.start(room)
+
+    def start(self, room):
+        """Begin the match of a room that has both players"""
+        self.matchmaker.remove(room)  # A public room may also be joined by its id
+        self.games_started += 1
+        red, white = room.players[RED], room.players[WHITE]
+        if red.uid and white.uid and red.uid != white.uid:
+            room.rated = ((red.uid, red.name), (white.uid, white.name))
+        for color, member in room.players.items():
+            member.send(protocol.encode_start(SIDES[color], room.room_id, room.players[other(color)].name))
+        room.broadcast(room.state())
+        room.fan_out(room.watching() + room.state())  # Spectators of a private room learn who plays
+        for spectator in self.lobby:
+            self.subscribe(spectator, room)
+        self.lobby.clear()
+        self.after_move(room)
+
+    def watch(self, player, room_id):
+        """Make the player a spectator of a match, or of the next one to start"""
+        if player.room is not None:
+            player.send(protocol.encode_error("Already playing a match"))
+            return
+        self.unwatch(player)
+
+        if room_id:
+            room = self.rooms.get(room_id[:MAX_NAME_LENGTH])
+            if room is None:
+                player.send(protocol.encode_error("No such match"))
+                return
+        else:
+            room = self.featured()
+            if room is None:
+                self.lobby.add(player)
+                player.send(protocol.encode_waiting(""))
+                return
+        self.subscribe(player, room)
+
+    def featured(self):
+        """The match in progress with the most spectators, or None"""
+        return max((room for room in self.rooms.values() if len(room.players) == 2 and room.winner is None),
+                   key=lambda room: len(room.spectators), default=None)
+
+    def subscribe(self, player, room):
+        """Add a spectator and send them the current position as a keyframe"""
+        player.watching = room
+        room.spectators.add(player)
+        player.send(room.watching() + room.state() + (room.probability or b""))
+        self.request_probability(room)
+
+    def unwatch(self, player):
+        self.lobby.discard(player)
+        room = player.watching
+        if room is not None:
+            room.spectators.discard(player)
+            player.watching = None
+
+    def move(self, player, start, end):
+        """Play a move for the player if it is their turn and the move is legal"""
+        room = player.room
+        if room is None or len(room.players) < 2:
+            player.send(protocol.encode_error("No match in progress"))
+            return
+
+        if player.color != room.turn:
+            error = "Not your turn"
+        elif start >= 32 or end >= 32:
+            error = "Squares must be numbers from 0 to 31"
+        else:
+            error = self.play(room, start, end)
+
+        if error:
+            # The current position lets the client drop its pending move
+            player.send(protocol.encode_error(error) + room.state())
+
+    def after_move(self, room):
+        """Start the AI's reply if it is the AI's turn"""
+        if isinstance(room.players.get(room.turn), AIPlayer):
+            task = asyncio.get_running_loop().create_task(self.ai_move(room))
+            self.ai_tasks.add(task)
+            task.add_done_callback(self.ai_tasks.discard)
+
+    async def ai_move(self, room):
+        """Ask the AI service for the AI's move and play it"""
+        ai_player = room.players[room.turn]
+        future = self.ai.best_move(room.board.bitboards(), room.turn, ai_player.depth, AI_MOVE_BUDGET)
+        try:
+            move = (await asyncio.wrap_future(future))["move"]
+        except (TimeoutError, RuntimeError):
+            move = None
+        if room.winner is not None or room.room_id not in self.rooms:
+            return  # The human left while the AI was thinking
+
+        if move is None:
+            # The service is overloaded: a one-ply search is cheap enough to run here
+            _, best_move, _ = self.rules.search(room.board, 1, room.turn == RED)
+            piece, target = best_move
+            move = (square_index(piece.row, piece.col), square_index(*target))
+
+        self.play(room, *move)
+
+    def play(self, room, start, end):
+        """Apply a move and send it to players and spectators; returns an error message if it is illegal"""
+        board = room.board
+        piece = board.get_piece(*square_coords(start))
+        if piece == 0 or piece.color != room.turn:
+            return "No piece of yours on that square"
+
+        target = square_coords(end)
+        moves = self.rules._get_valid_moves_for_simulation(board, piece)
+        if target not in moves:
+            return "Illegal move"
+
+        was_king = piece.king
+        board.move(piece, *target)
+        captured = 0
+        if moves[target]:
+            for skipped in moves[target]:
+                captured |= 1 << square_index(skipped.row, skipped.col)
+            board.remove(moves[target])
+        room.turn = other(room.turn)
+        if not self.has_moves(board, room.turn):
+            room.winner = other(room.turn)
+
+        self.moves += 1
+        room.moves_played += 1
+        room.probability = None
+        room.broadcast(room.state((start, end)))
+        if room.spectators:
+            crowned = piece.king and not was_king
+            room.fan_out(protocol.encode_delta(start, end, captured, crowned, SIDES[room.turn],
+                                               room.side(room.winner)))
+        if room.winner is not None:
+            self.finish(room)
+        else:
+            self.after_move(room)
+            self.request_probability(room)
+        return None
+
+    def has_moves(self, board, color):
+        return any(self.rules._get_valid_moves_for_simulation(board, piece) for piece in board.get_all_pieces(color))
+
+    def request_probability(self, room):
+        """Start a win-probability update for a watched match unless one is already due"""
+        if self.ai is None or not room.spectators or room.probability_task is not None:
+            return
+        room.probability_task = asyncio.get_running_loop().create_task(self.update_probability(room))
+
+    async def update_probability(self, room):
+        """Send spectators the playout results of the current position, throttled per match"""
+        loop = asyncio.get_running_loop()
+        moves_played = room.moves_played
+        try:
+            await asyncio.sleep(max(0.0, room.probability_at + PROBABILITY_INTERVAL - loop.time()))
+            moves_played = room.moves_played  # Moves made meanwhile are skipped over
+            future = self.ai.playouts(room.board.bitboards(), room.turn, SPECTATOR_PLAYOUTS, PROBABILITY_BUDGET)
+            try:
+                results = await asyncio.wrap_future(future)
+            except (TimeoutError, RuntimeError):
+                return
+            room.probability_at = loop.time()
+            if room.moves_played == moves_played and room.winner is None:
+                room.probability = protocol.encode_probability(results["RED"], results["WHITE"], results["DRAW"])
+                room.fan_out(room.probability)
+        finally:
+            room.probability_task = None
+            if room.moves_played != moves_played and room.winner is None:
+                self.request_probability(room)  # The position changed while the playouts ran
+
+    def leave(self, player):
+        """Take the player out of their room or stop them watching; leaving a match in progress forfeits it"""
+        self.unwatch(player)
+        room = player.room
+        if room is None:
+            return
+        player.room = None
+        del room.players[player.color]
+        self.matchmaker.remove(room)
+
+        if room.players and room.winner is None:
+            room.winner = other(player.color)
+            state = room.state()
+            room.broadcast(state)
+            room.fan_out(state)
+            self.finish(room)
+        elif not room.players:
+            self.rooms.pop(room.room_id, None)
+            self.release_spectators(room)
+
+    def finish(self, room):
+        """Close a decided match and rate it; its players may join another"""
+        self.games_finished += 1
+        if room.rated:
+            red, white = room.rated
+            (winner, winner_name), (loser, loser_name) = (red, white) if room.winner == RED else (white, red)
+            self.leaderboard.record(winner, loser, winner_name, loser_name)
+        self.rooms.pop(room.room_id, None)
+        for member in room.players.values():
+            member.room = None
+        room.players.clear()
+        self.release_spectators(room)
+
+    def release_spectators(self, room):
+        """Detach the spectators of a closed room; they may watch another match"""
+        for spectator in room.spectators:
+            spectator.watching = None
+        room.spectators.clear()
+        if room.probability_task is not None:
+            room.probability_task.cancel()
+
+    async def report(self, interval):
+        """Print load figures every interval seconds"""
+        last_moves = self.moves
+        while True:
+            await asyncio.sleep(interval)
+            rate = (self.moves - last_moves) / interval
+            last_moves = self.moves
+            spectators = len(self.lobby) + sum(len(room.spectators) for room in self.rooms.values())
+            line = (f"📊 {self.players} players, {spectators} spectators, {len(self.rooms)} rooms, "
+                    f"{rate:.0f} moves/s, {self.games_started} games started, {self.games_finished} finished")
+            if self.ai:
+                metrics = self.ai.metrics()
+                line += (f", AI queue {metrics['queue_depth']}, AI p95 {metrics['latency_ms']['p95']:.0f} ms, "
+                         f"{metrics['expired']} expired")
+            print(line)
+
+    async def match_waiting(self, interval):
+        """Every interval seconds, pair waiting players whose rating windows have grown to allow it"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            for room, other_room in self.matchmaker.sweep(loop.time()):
+                self.pair_waiting(room, other_room)
+
+    async def snapshot_leaderboard(self, interval):
+        """Save the leaderboard every interval seconds if it changed"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.leaderboard.dirty:
+                self.leaderboard.save()
+
+
+class ClientConnection(asyncio.BufferedProtocol):
+    """asyncio protocol for one client: frames are parsed where they were received"""
+
+    def __init__(self, server):
+        self.server = server
+        self.frames = protocol.FrameBuffer(8 * 1024)
+        self.player = None
+
+    def connection_made(self, transport):
+        self.player = Player(transport)
+        self.server.players += 1
+
+    def get_buffer(self, sizehint):
+        return self.frames.writable()
+
+    def buffer_updated(self, nbytes):
+        self.frames.advance(nbytes)
+        try:
+            for kind, payload in self.frames.frames():
+                self.server.dispatch(self.player, kind, payload)
+        except protocol.ProtocolError as e:
+            self.player.send(protocol.encode_error(str(e)))
+            self.player.transport.close()
+
+    def connection_lost(self, exc):
+        self.server.leave(self.player)
+        self.server.players -= 1
+
+
+async def serve(host, port, stats_interval, ai=None, leaderboard=None):
+    game_server = GameServer(ai, leaderboard)
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: ClientConnection(game_server), host, port, backlog=4096)
+    print(f"♟️ Game server listening on {host}:{port}")
+
+    reporter = asyncio.create_task(game_server.report(stats_interval)) if stats_interval else None
+    snapshots = asyncio.create_task(game_server.snapshot_leaderboard(SNAPSHOT_INTERVAL))
+    sweeps = asyncio.create_task(game_server.match_waiting(MATCH_SWEEP_INTERVAL))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if reporter:
+            reporter.cancel()
+        snapshots.cancel()
+        sweeps.cancel()
+        if game_server.leaderboard.dirty:
+            game_server.leaderboard.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host online checkers matches")
+    parser.add_argument("--host", default="0.0.0.0", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--stats-interval", type=float, default=30,
+                        help="seconds between load reports (0 turns them off)")
+    parser.add_argument("--ai-workers", type=int, default=0,
+                        help="processes for AI opponents (0 turns AI matches off)")
+    parser.add_argument("--leaderboard", default=LEADERBOARD_FILE, help="leaderboard snapshot to load and save")
+    args = parser.parse_args()
+
+    leaderboard = Leaderboard(args.leaderboard)
+    print(f"🏆 {len(leaderboard.players)} rated players loaded from {args.leaderboard}")
+    ai = AIService(args.ai_workers) if args.ai_workers > 0 else None
+    try:
+        asyncio.run(serve(args.host, args.port, args.stats_interval, ai, leaderboard))
+    except KeyboardInterrupt:
+        print("👋 Game server stopped")
+    finally:
+        if ai:
+            ai.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+"""Headless setup for the command-line tools of AI Checkers Master.
+
+Importing this module points SDL at its dummy video and audio drivers and
+hides pygame's greeting, so that importing checkers opens no window and
+needs no display or sound card. Tools import it before checkers:
+
+    import headless  # Before checkers
+    from checkers import Board, Game
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
@@ -0,0 +1,294 @@
+"""Ratings, leaderboard and matchmaking for online matches.
+
+game_server.py rates every finished match between two signed-in players
+with Elo and keeps the ratings here. Players are keyed by their Firebase
+uid, which the server has verified; their names are only for display.
+
+- Leaderboard holds each player's rating, record and name. Its
+  RatingIndex is a Fenwick tree over whole rating points, so the rank of a
+  player and the top N are found in O(log MAX_RATING) steps instead of by
+  sorting everyone.
+- The leaderboard is saved as a JSON snapshot (written to a temporary file
+  and renamed into place) and the index is rebuilt from it at startup.
+- Matchmaker pairs public players of similar rating. A waiting player
+  accepts a wider rating gap the longer they wait, and two players are
+  paired once the gap suits both of them: when one joins, or later when
+  the server sweeps the queue.
+
+Usage:
+    python leaderboard.py                          # top 10 of leaderboard.json
+    python leaderboard.py --top 50 --player <uid>  # top 50 and one player's rank
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+from itertools import count
+
+LEADERBOARD_FILE = "leaderboard.json"
+SNAPSHOT_VERSION = 2  # Version 1 was keyed by the unverified names players gave
+INITIAL_RATING = 1200.0
+K_FACTOR = 32  # Most rating points one game can move
+MAX_RATING = 4000  # Ratings are clamped to 0..MAX_RATING in the index
+MATCH_WINDOW = 100  # Rating gap a player accepts as soon as they join
+MATCH_WINDOW_GROWTH = 25  # Extra gap accepted per second of waiting
+MAX_MATCH_WINDOW = 800
+
+
+def expected_score(rating, opponent_rating):
+    """Elo probability that a player beats an opponent"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def elo_update(winner_rating, loser_rating, k=K_FACTOR):
+    """New (winner, loser) ratings after a decisive game"""
+    change = k * (1 - expected_score(winner_rating, loser_rating))
+    return winner_rating + change, loser_rating - change
+
+
+class RatingIndex:
+    """Players grouped by whole rating point, counted in a Fenwick tree"""
+
+    def __init__(self, max_rating=MAX_RATING):
+        self.max_rating = max_rating
+        self.tree = [0] * (max_rating + 2)  # 1-based: tree[point + 1] covers rating point
+        self.buckets = {}  # Rating point -> set of uids
+        self.count = 0
+
+    def point(self, rating):
+        return min(max(int(round(rating)), 0), self.max_rating)
+
+    def add(self, uid, rating):
+        point = self.point(rating)
+        self.buckets.setdefault(point, set()).add(uid)
+        self._update(point, 1)
+
+    def remove(self, uid, rating):
+        point = self.point(rating)
+        bucket = self.buckets[point]
+        bucket.remove(uid)
+        if not bucket:
+            del self.buckets[point]
+        self._update(point, -1)
+
+    def rank(self, rating):
+        """1 + the number of players rated above rating"""
+        return self.count - self._at_most(self.point(rating)) + 1
+
+    def top_points(self):
+        """Yield rating points from the highest down, skipping empty ones"""
+        taken = 0
+        while taken < self.count:
+            point = self._lowest_reaching(self.count - taken)
+            yield point
+            taken += len(self.buckets[point])
+
+    def _update(self, point, delta):
+        self.count += delta
+        i = point + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _at_most(self, point):
+        """Players rated at or below point"""
+        total = 0
+        i = point + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _lowest_reaching(self, k):
+        """Lowest point with at least k players rated at or below it"""
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if position + step < len(self.tree) and self.tree[position + step] < k:
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+        return position  # tree index position + 1 is the point position
+
+
+class Leaderboard:
+    """Ratings and win/loss records of every rated player, with an O(log n) rank index"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.players = {}  # uid -> [rating, wins, losses, name]
+        self.index = RatingIndex()
+        self.dirty = False  # Changed since the last snapshot
+        if path and os.path.exists(path):
+            self.load()
+
+    def rating(self, uid):
+        player = self.players.get(uid)
+        return player[0] if player else INITIAL_RATING
+
+    def record(self, winner, loser, winner_name="", loser_name=""):
+        """Rate a decisive game between two uids, noting their current names; returns the new (winner, loser) ratings"""
+        winner_entry = self._entry(winner, winner_name)
+        loser_entry = self._entry(loser, loser_name)
+        new_ratings = elo_update(winner_entry[0], loser_entry[0])
+        for uid, entry, rating in ((winner, winner_entry, new_ratings[0]), (loser, loser_entry, new_ratings[1])):
+            self.index.remove(uid, entry[0])
+            entry[0] = rating
+            self.index.add(uid, rating)
+        winner_entry[1] += 1
+        loser_entry[2] += 1
+        self.dirty = True
+        return new_ratings
+
+    def rank(self, uid):
+        """1-based position of a rated player (ties share a rank), or None"""
+        player = self.players.get(uid)
+        return self.index.rank(player[0]) if player else None
+
+    def top(self, n):
+        """The n best players as (uid, name, rating, wins, losses), best first"""
+        result = []
+        for point in self.index.top_points():
+            uids = sorted(self.index.buckets[point], key=lambda uid: (-self.players[uid][0], uid))
+            for uid in uids:
+                rating, wins, losses, name = self.players[uid]
+                result.append((uid, name, rating, wins, losses))
+            if len(result) >= n:
+                break
+        return result[:n]
+
+    def _entry(self, uid, name):
+        entry = self.players.get(uid)
+        if entry is None:
+            entry = self.players[uid] = [INITIAL_RATING, 0, 0, name]
+            self.index.add(uid, INITIAL_RATING)
+        elif name:
+            entry[3] = name
+        return entry
+
+    def save(self):
+        """Write a snapshot; a crash mid-write leaves the previous one intact"""
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "players": self.players}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def load(self):
+        with open(self.path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path} is not a version {SNAPSHOT_VERSION} leaderboard snapshot")
+        self.players = {uid: list(entry) for uid, entry in snapshot["players"].items()}
+        self.index = RatingIndex()
+        for uid, entry in self.players.items():
+            self.index.add(uid, entry[0])
+        self.dirty = False
+
+
+class Matchmaker:
+    """Players waiting for a public match, kept sorted by rating"""
+
+    def __init__(self):
+        self.queue = []  # Sorted (rating, order, joined at, key)
+        self.entries = {}  # Key -> its queue tuple
+        self.order = count()  # Breaks rating ties, so keys are never compared
+
+    def __len__(self):
+        return len(self.queue)
+
+    def add(self, key, rating, now):
+        entry = (rating, next(self.order), now, key)
+        bisect.insort(self.queue, entry)
+        self.entries[key] = entry
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            del self.queue[bisect.bisect_left(self.queue, entry)]
+
+    @staticmethod
+    def window(entry, now):
+        """Largest rating gap a queue entry accepts at time now"""
+        return min(MATCH_WINDOW + MATCH_WINDOW_GROWTH * (now - entry[2]), MAX_MATCH_WINDOW)
+
+    def pop_match(self, rating, now):
+        """Take the waiting key closest in rating within both its window and a new player's, or None"""
+        below = bisect.bisect_left(self.queue, (rating,)) - 1
+        above = below + 1
+        queue = self.queue
+        while below >= 0 or above < len(queue):
+            # Walk outwards taking the nearer neighbour, so gaps only grow
+            if above >= len(queue) or (below >= 0 and rating - queue[below][0] <= queue[above][0] - rating):
+                entry = queue[below]
+                below -= 1
+            else:
+                entry = queue[above]
+                above += 1
+            gap = abs(entry[0] - rating)
+            if gap > MATCH_WINDOW:  # The new player's window; it only grows while they wait
+                return None
+            if gap <= self.window(entry, now):
+                self.remove(entry[3])
+                return entry[3]
+        return None
+
+    def sweep(self, now):
+        """Take every pair of waiting keys whose windows have grown to allow their gap; returns [(key, key), ...]"""
+        queue = self.queue
+        paired = set()
+        pairs = []
+        for i, entry in enumerate(queue):
+            if i in paired:
+                continue
+            window = self.window(entry, now)
+            # Partners above in rating order, nearest first; lower ones already had their turn
+            for j in range(i + 1, len(queue)):
+                partner = queue[j]
+                gap = partner[0] - entry[0]
+                if gap > window:
+                    break
+                if j not in paired and gap <= self.window(partner, now):
+                    paired.update((i, j))
+                    pairs.append((entry[3], partner[3]))
+                    break
+        for first, second in pairs:
+            self.remove(first)
+            self.remove(second)
+        return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the online leaderboard")
+    parser.add_argument("--snapshot", default=LEADERBOARD_FILE, help="leaderboard snapshot written by game_server.py")
+    parser.add_argument("--top", type=int, default=10, help="number of players to list")
+    parser.add_argument("--player", help="also show the rank of the player with this Firebase uid")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.snapshot):
+        print(f"❌ No leaderboard at {args.snapshot}")
+        return 1
+    leaderboard = Leaderboard(args.snapshot)
+
+    print(f"🏆 Top {args.top} of {len(leaderboard.players)} rated players")
+    for position, (uid, name, rating, wins, losses) in enumerate(leaderboard.top(args.top), 1):
+        print(f"{position:>4}. {name:<32} {rating:7.1f}  {wins}W {losses}L  {uid}")
+
+    if args.player:
+        rank = leaderboard.rank(args.player)
+        if rank is None:
+            print(f"{args.player} has not played a rated match")
+        else:
+            name = leaderboard.players[args.player][3]
+            print(f"{name} ({args.player}): rank {rank}, rating {leaderboard.rating(args.player):.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
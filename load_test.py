@@ -0,0 +1,139 @@
+"""Load test for the stats write path of AI Checkers Master.
+
+Simulates many players at once: each signs up through FirestoreAuth and
+then records finished games with update_user_stats, exactly as the game's
+background write queue does. Reports commit throughput and latency
+percentiles, and checks that every player's counters on the server match
+the games they played (lost updates would show up as mismatches).
+
+Runs against a Firebase emulator (firebase_emulator.py). By default one is
+started in-process; pass --url to target one running elsewhere.
+
+Usage:
+    python load_test.py                              # 50 players x 20 games
+    python load_test.py --players 200 --games 50
+    python load_test.py --url http://127.0.0.1:9099
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_player(checkers, index, games, barrier, results):
+    """Sign up one player, then record games as fast as the server allows"""
+    auth = checkers.FirestoreAuth()
+    ok, message = auth.sign_up(f"load{index}-{uuid.uuid4().hex[:8]}@example.com", "password123")
+    if not ok:
+        results["errors"].append(f"player {index}: sign-up failed: {message}")
+        barrier.abort()
+        return
+
+    barrier.wait()
+    latencies = []
+    recorded = wins = 0
+    for _ in range(games):
+        win = random.random() < 0.5
+        start = time.perf_counter()
+        counters = auth.update_user_stats(win=win, game_id=uuid.uuid4().hex)
+        latencies.append(time.perf_counter() - start)
+        if counters is None:
+            results["errors"].append(f"player {index}: update failed")
+            continue
+        recorded += 1
+        wins += win
+
+    profile = auth.get_user_profile() or {}
+    expected = {"games_played": recorded, "wins": wins, "losses": recorded - wins}
+    actual = {key: profile.get(key) for key in expected}
+    with results["lock"]:
+        results["latencies"].extend(latencies)
+        if actual != expected:
+            results["mismatches"].append(f"player {index}: expected {expected}, server has {actual}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure stats write throughput and latency")
+    parser.add_argument("--players", type=int, default=50, help="concurrent simulated players")
+    parser.add_argument("--games", type=int, default=20, help="games recorded per player")
+    parser.add_argument("--url", help="emulator to target (default: start one in-process)")
+    parser.add_argument("--seed", type=int, default=1234, help="random seed for game results")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        os.environ["FIREBASE_EMULATOR_URL"] = args.url
+    else:
+        import firebase_emulator
+        server = firebase_emulator.start_in_background()
+        os.environ["FIREBASE_EMULATOR_URL"] = server.url
+
+    # Import after the emulator URL is set, so every Firebase URL points at it
+    import checkers
+    checkers.HTTP_POOL_SIZE = max(checkers.HTTP_POOL_SIZE, args.players)
+    checkers.STATS_DB_FILE = ":memory:"  # Sign-in starts the write queue; keep its store off disk
+    random.seed(args.seed)
+
+    results = {"lock": threading.Lock(), "latencies": [], "errors": [], "mismatches": []}
+    barrier = threading.Barrier(args.players + 1)
+    threads = [threading.Thread(target=run_player, args=(checkers, i, args.games, barrier, results))
+               for i in range(args.players)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        barrier.wait()  # Every player has signed up; start the clock
+    except threading.BrokenBarrierError:
+        pass
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = results["latencies"]
+    report = {
+        "players": args.players,
+        "games_per_player": args.games,
+        "commits": len(latencies),
+        "elapsed_sec": elapsed,
+        "commits_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies, default=0.0) * 1000
+        },
+        "errors": len(results["errors"]),
+        "mismatched_players": len(results["mismatches"])
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    for line in (results["errors"] + results["mismatches"])[:10]:
+        print(line, file=sys.stderr)
+    if server:
+        server.shutdown()
+    return 1 if results["errors"] or results["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
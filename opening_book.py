@@ -0,0 +1,143 @@
+"""Opening book generator for AI Checkers Master.
+
+Walks the game tree from the starting position to a configurable ply,
+scores every move of each position with a deep minimax search and writes
+the best moves, weighted by score, to a sorted binary table that
+Game.ai_move looks up through a memory map (see checkers.OpeningBook).
+
+Every move is expanded for the first few plies so common human replies stay
+in book; after that only the book's own moves are followed.
+
+Usage:
+    python opening_book.py                      # 8 plies, depth 6
+    python opening_book.py --plies 10 --depth 8 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+from checkers import OPENING_BOOK_FILE, RED, WHITE, Board, Game, OpeningBook, square_index
+
+WEIGHT_SCALE = 1000  # Weight given to the best move of a position
+
+_game = None
+
+
+def _search_game():
+    """Headless Game used only for its move generator and minimax"""
+    global _game
+    if _game is None:
+        _game = Game(None)
+    return _game
+
+
+def apply_move(board, piece, move, skipped):
+    """Return a copy of board with the move played"""
+    child = board.copy()
+    child_piece = child.get_piece(piece.row, piece.col)
+    child.move(child_piece, move[0], move[1])
+    if skipped:
+        child.remove(skipped)
+    return child
+
+
+def legal_moves(board, turn):
+    """List every (piece, move, skipped) available to turn"""
+    game = _search_game()
+    moves = []
+    for piece in board.get_all_pieces(turn):
+        for move, skipped in game._get_valid_moves_for_simulation(board, piece).items():
+            moves.append((piece, move, skipped))
+    return moves
+
+
+def score_moves(job):
+    """Search every move of a position; returns [(from_square, to_square, score), ...] best first"""
+    board, turn, depth = job
+    game = _search_game()
+    is_red_player = turn == RED
+
+    scored = []
+    for piece, move, skipped in legal_moves(board, turn):
+        child = apply_move(board, piece, move, skipped)
+        score, _ = game.minimax(child, depth - 1, float('-inf'), float('inf'), False, is_red_player)
+        scored.append((square_index(piece.row, piece.col), square_index(*move), score))
+
+    scored.sort(key=lambda entry: entry[2], reverse=True)
+    return scored
+
+
+def pick_book_moves(scored, top, margin):
+    """Keep up to top moves within margin of the best, weighted by how close they are"""
+    if not scored:
+        return []
+    best = scored[0][2]
+
+    chosen = []
+    for from_square, to_square, score in scored[:top]:
+        gap = best - score
+        if gap > margin:
+            break
+        weight = WEIGHT_SCALE if margin <= 0 else round(WEIGHT_SCALE * 0.5 ** (gap / margin))
+        chosen.append((from_square, to_square, max(1, weight)))
+    return chosen
+
+
+def generate(plies, depth, top, margin, branch_plies, workers):
+    """Build the book records by searching the tree level by level"""
+    board = Board()
+    frontier = {board.hash_key(RED): (board, RED)}
+    records = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for ply in range(plies):
+            start_time = time.perf_counter()
+            positions = list(frontier.items())
+            jobs = [(board, turn, depth) for _, (board, turn) in positions]
+            next_frontier = {}
+
+            for (key, (board, turn)), scored in zip(positions, pool.map(score_moves, jobs)):
+                chosen = pick_book_moves(scored, top, margin)
+                records.extend((key, from_square, to_square, weight) for from_square, to_square, weight in chosen)
+
+                # Expand every reply early on, then only the book's own moves
+                book_moves = {(from_square, to_square) for from_square, to_square, _ in chosen}
+                next_turn = WHITE if turn == RED else RED
+                for piece, move, skipped in legal_moves(board, turn):
+                    if ply >= branch_plies and (square_index(piece.row, piece.col), square_index(*move)) not in book_moves:
+                        continue
+                    child = apply_move(board, piece, move, skipped)
+                    next_frontier.setdefault(child.hash_key(next_turn), (child, next_turn))
+
+            print(f"Ply {ply + 1}/{plies}: {len(positions)} positions, {len(records)} book moves "
+                  f"({time.perf_counter() - start_time:.1f}s)")
+            frontier = next_frontier
+
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the opening book")
+    parser.add_argument("--plies", type=int, default=8, help="plies from the start position covered by the book")
+    parser.add_argument("--depth", type=int, default=6, help="minimax depth used to score each move")
+    parser.add_argument("--top", type=int, default=3, help="maximum book moves stored per position")
+    parser.add_argument("--margin", type=float, default=0.15,
+                        help="moves scoring more than this below the best are left out")
+    parser.add_argument("--branch-plies", type=int, default=2,
+                        help="plies in which every move is expanded, not just book moves")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="search processes")
+    parser.add_argument("--output", default=OPENING_BOOK_FILE, help="book file to write")
+    args = parser.parse_args()
+
+    records = generate(args.plies, args.depth, args.top, args.margin, args.branch_plies, args.workers)
+    OpeningBook.write(args.output, records)
+    print(f"📖 Wrote {len(records)} book moves to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Binary wire protocol between game_server.py and checkers.NetworkClient.
+
+Every message is one frame: a 4-byte header (payload length as u16, protocol
+version, message type) followed by the payload. All integers are
+little-endian. A move is two square bytes, so a whole move frame is 6 bytes.
+A position is a fixed 20-byte payload: one u32 bitboard of the 32 dark
+squares (see checkers.square_index) per piece type (red men, red kings,
+white men, white kings), then the side to move, the winner and the last
+move.
+
+Spectators get one position (a keyframe) when they start watching and
+then only a 9-byte delta per move: from and to squares, a u32 mask of the
+captured squares, whether the piece was crowned, the side to move and the
+winner. apply_delta turns a delta into the next position's bitboards.
+
+Text fields (names, room ids) are UTF-8 with a u8 length prefix; an error
+message and an AUTH frame's Firebase ID token take the rest of their
+payload. Sides are 1 for red and 2 for
+white, with 0 meaning nobody.
+
+FrameBuffer splits a received byte stream into frames without copying:
+payloads are memoryview slices of its buffer that the decode functions
+read with struct.unpack_from.
+"""
+
+import struct
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("<HBB")  # Payload length, protocol version, message type
+MAX_PAYLOAD = 4096  # Longest payload either side accepts; Firebase ID tokens run over 1 KB
+
+# Client -> server
+JOIN = 1  # Name, room ("" for the next public match)
+MOVE = 2  # From square, to square
+LEAVE = 3  # Also stops watching
+WATCH = 4  # Room ("" for the featured match)
+AUTH = 5  # Firebase ID token of a signed-in player, sent before JOIN
+# Server -> client
+WAITING = 16  # Room
+START = 17  # Our side, room, opponent's name
+STATE = 18  # Position
+ERROR = 19  # Message text
+DELTA = 20  # One move of a watched match
+WATCHING = 21  # Room, red player's name, white player's name
+PROBABILITY = 22  # Red wins, white wins and draws in the server's latest playouts
+
+MOVE_BODY = struct.Struct("<BB")
+POSITION = struct.Struct("<4IBBBB")  # Bitboards per piece type, side to move, winner, last move from and to
+DELTA_BODY = struct.Struct("<BBIBBB")  # From, to, captured squares, crowned, side to move, winner
+PROBABILITY_BODY = struct.Struct("<HHH")
+SIDE = struct.Struct("<B")
+TEXT_LENGTH = struct.Struct("<B")
+
+NO_SIDE, SIDE_RED, SIDE_WHITE = 0, 1, 2
+NO_SQUARE = 0xFF  # Last move of a position nobody has moved in yet
+
+
+class ProtocolError(ValueError):
+    """Raised for frames that break the protocol"""
+
+
+def frame(kind, payload=b""):
+    """Header and payload of one message"""
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload of {len(payload)} bytes is over the {MAX_PAYLOAD} byte limit")
+    return HEADER.pack(len(payload), PROTOCOL_VERSION, kind) + payload
+
+
+def pack_text(text):
+    """A length-prefixed UTF-8 text field, cut to 255 bytes"""
+    data = text.encode("utf-8")[:255]
+    return TEXT_LENGTH.pack(len(data)) + data
+
+
+def unpack_text(payload, offset):
+    """Read a text field; returns (text, offset after it)"""
+    if offset >= len(payload):
+        raise ProtocolError("Truncated text field")
+    (length,) = TEXT_LENGTH.unpack_from(payload, offset)
+    end = offset + 1 + length
+    if end > len(payload):
+        raise ProtocolError("Truncated text field")
+    return str(payload[offset + 1:end], "utf-8", "replace"), end
+
+
+def encode_join(name, room=""):
+    return frame(JOIN, pack_text(name) + pack_text(room))
+
+
+def decode_join(payload):
+    """(name, room) of a JOIN payload"""
+    name, offset = unpack_text(payload, 0)
+    room, _ = unpack_text(payload, offset)
+    return name, room
+
+
+def encode_auth(id_token):
+    return frame(AUTH, id_token.encode("ascii"))
+
+
+def decode_auth(payload):
+    return str(payload, "ascii", "replace")
+
+
+def encode_move(start, end):
+    return frame(MOVE, MOVE_BODY.pack(start, end))
+
+
+def decode_move(payload):
+    """(from square, to square) of a MOVE payload"""
+    if len(payload) != MOVE_BODY.size:
+        raise ProtocolError("Move payloads are 2 bytes")
+    return MOVE_BODY.unpack_from(payload)
+
+
+def encode_leave():
+    return frame(LEAVE)
+
+
+def encode_waiting(room):
+    return frame(WAITING, pack_text(room))
+
+
+def decode_waiting(payload):
+    return unpack_text(payload, 0)[0]
+
+
+def encode_start(side, room, opponent):
+    return frame(START, SIDE.pack(side) + pack_text(room) + pack_text(opponent))
+
+
+def decode_start(payload):
+    """(our side, room, opponent's name) of a START payload"""
+    if not payload:
+        raise ProtocolError("Empty start payload")
+    room, offset = unpack_text(payload, SIDE.size)
+    opponent, _ = unpack_text(payload, offset)
+    return payload[0], room, opponent
+
+
+def encode_state(bitboards, turn, winner=NO_SIDE, last_move=None):
+    start, end = last_move if last_move else (NO_SQUARE, NO_SQUARE)
+    return frame(STATE, POSITION.pack(*bitboards, turn, winner, start, end))
+
+
+def decode_state(payload):
+    """(bitboards, side to move, winner, last move or None) of a STATE payload"""
+    if len(payload) != POSITION.size:
+        raise ProtocolError(f"State payloads are {POSITION.size} bytes")
+    red_men, red_kings, white_men, white_kings, turn, winner, start, end = POSITION.unpack_from(payload)
+    last_move = None if start == NO_SQUARE else (start, end)
+    return (red_men, red_kings, white_men, white_kings), turn, winner, last_move
+
+
+def encode_watch(room=""):
+    return frame(WATCH, pack_text(room))
+
+
+def decode_watch(payload):
+    return unpack_text(payload, 0)[0]
+
+
+def encode_watching(room, red_name, white_name):
+    return frame(WATCHING, pack_text(room) + pack_text(red_name) + pack_text(white_name))
+
+
+def decode_watching(payload):
+    """(room, red player's name, white player's name) of a WATCHING payload"""
+    room, offset = unpack_text(payload, 0)
+    red_name, offset = unpack_text(payload, offset)
+    white_name, _ = unpack_text(payload, offset)
+    return room, red_name, white_name
+
+
+def encode_delta(start, end, captured, crowned, turn, winner=NO_SIDE):
+    return frame(DELTA, DELTA_BODY.pack(start, end, captured, crowned, turn, winner))
+
+
+def decode_delta(payload):
+    """(from, to, captured squares mask, crowned, side to move, winner) of a DELTA payload"""
+    if len(payload) != DELTA_BODY.size:
+        raise ProtocolError(f"Delta payloads are {DELTA_BODY.size} bytes")
+    return DELTA_BODY.unpack_from(payload)
+
+
+def apply_delta(bitboards, start, end, captured, crowned):
+    """Bitboards of the position after a delta's move"""
+    boards = list(bitboards)
+    source = 1 << start
+    for kind, bits in enumerate(boards):
+        if bits & source:
+            boards[kind] = bits & ~source
+            # Men are kinds 0 and 2; a crowned man lands on its side's king mask
+            boards[kind + 1 if crowned else kind] |= 1 << end
+            break
+    else:
+        raise ProtocolError(f"Delta moves a piece from empty square {start}")
+    return tuple(bits & ~captured for bits in boards)
+
+
+def encode_probability(red_wins, white_wins, draws):
+    return frame(PROBABILITY, PROBABILITY_BODY.pack(red_wins, white_wins, draws))
+
+
+def decode_probability(payload):
+    """(red wins, white wins, draws) of a PROBABILITY payload"""
+    if len(payload) != PROBABILITY_BODY.size:
+        raise ProtocolError(f"Probability payloads are {PROBABILITY_BODY.size} bytes")
+    return PROBABILITY_BODY.unpack_from(payload)
+
+
+def encode_error(message):
+    return frame(ERROR, message.encode("utf-8")[:MAX_PAYLOAD])
+
+
+def decode_error(payload):
+    return str(payload, "utf-8", "replace")
+
+
+class FrameBuffer:
+    """Receive buffer that splits a byte stream into frames without copying
+
+    Data is received straight into the buffer (writable() and advance(),
+    which fit socket.recv_into and asyncio.BufferedProtocol). frames()
+    yields each complete frame's payload as a memoryview slice of the
+    buffer; a payload is only valid until the next call to writable().
+    """
+
+    def __init__(self, size=64 * 1024):
+        self.buffer = bytearray(max(size, 2 * (HEADER.size + MAX_PAYLOAD)))
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First byte not yet parsed
+        self.end = 0  # End of the received data
+
+    def writable(self):
+        """Free space at the end of the buffer to receive into"""
+        if len(self.buffer) - self.end < HEADER.size + MAX_PAYLOAD:
+            # Move the unfinished frame to the front; it is never longer than one frame
+            remaining = self.end - self.start
+            self.buffer[:remaining] = bytes(self.view[self.start:self.end])
+            self.start, self.end = 0, remaining
+        return self.view[self.end:]
+
+    def advance(self, nbytes):
+        """Mark nbytes of the writable space as received"""
+        self.end += nbytes
+
+    def frames(self):
+        """Yield (message type, payload) for every complete frame received"""
+        while self.end - self.start >= HEADER.size:
+            length, version, kind = HEADER.unpack_from(self.buffer, self.start)
+            if version != PROTOCOL_VERSION:
+                raise ProtocolError(f"Unsupported protocol version {version}")
+            if length > MAX_PAYLOAD:
+                raise ProtocolError(f"Payload of {length} bytes is over the {MAX_PAYLOAD} byte limit")
+            payload_start = self.start + HEADER.size
+            frame_end = payload_start + length
+            if frame_end > self.end:
+                break
+            self.start = frame_end
+            yield kind, self.view[payload_start:frame_end]
+        if self.start == self.end:
+            self.start = self.end = 0
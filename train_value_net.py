@@ -0,0 +1,123 @@
+"""Value network trainer for AI Checkers Master.
+
+Trains the network of value_net.py on self-play positions labelled with
+their game's result: the dataset of tune_eval.py, generated on the spot
+if there is none. Every training position is also learned colour-flipped
+(board turned round, colours and result swapped). Whole games are held
+out and scored after every epoch against Board.evaluate with the best k
+for its weights, on the tuner's loss. The best epoch's network is written
+to value_net.npz only if it beats Board.evaluate on those games;
+otherwise it goes to value_net.candidate.npz and value_net.npz stays as
+it was (--force replaces it anyway). checkers.AI_EVALUATORS chooses the
+difficulties that use it.
+
+Usage:
+    python train_value_net.py --dataset selfplay.npz            # train on tune_eval.py's positions
+    python train_value_net.py --games 2000 --hidden 64 32 --epochs 40 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+    from value_net import INPUTS, ValueNet, encode, flip
+except ImportError:
+    np = None
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+import tune_eval
+from checkers import EVAL_WEIGHTS, VALUE_NET_FILE
+
+
+def mean_squared_error(logits, results):
+    """The tuner's loss: mean squared error between sigmoid(logit) and the results"""
+    return float(np.mean((1 / (1 + np.exp(-logits)) - results) ** 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the value network on self-play games")
+    parser.add_argument("--dataset", help="tune_eval.py .npz file to reuse the positions from (and save them to)")
+    parser.add_argument("--games", type=int, default=1000, help="self-play games to generate without a dataset")
+    parser.add_argument("--depth", type=int, default=2, help="search depth of the self-play games")
+    parser.add_argument("--random-plies", type=int, default=6, help="random opening plies of each game")
+    parser.add_argument("--epsilon", type=float, default=0.05, help="chance of a random move after the opening")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies before a game is adjudicated")
+    parser.add_argument("--hidden", type=int, nargs="+", default=[64, 32], help="sizes of the hidden layers")
+    parser.add_argument("--epochs", type=int, default=30, help="passes over the training positions")
+    parser.add_argument("--batch-size", type=int, default=256, help="positions per gradient step")
+    parser.add_argument("--learning-rate", type=float, default=1e-3, help="Adam step size")
+    parser.add_argument("--weight-decay", type=float, default=1e-4, help="L2 penalty on the weights")
+    parser.add_argument("--output", default=VALUE_NET_FILE, help="network file to write")
+    parser.add_argument("--force", action="store_true",
+                        help="replace the network file even if the network does no better than Board.evaluate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="self-play worker processes")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first self-play game and of the weights")
+    args = parser.parse_args()
+    if not 1 <= len(args.hidden) <= 2:
+        parser.error("--hidden takes one or two layer sizes")
+
+    if np is None:
+        print("❌ The value network needs NumPy: pip install numpy")
+        return 1
+
+    start = time.perf_counter()
+    if args.dataset and os.path.exists(args.dataset):
+        with np.load(args.dataset) as data:
+            bitboards, results, games = data["bitboards"], data["results"], data["games"]
+        print(f"📂 {len(bitboards)} positions loaded from {args.dataset}")
+    else:
+        bitboards, results, games = tune_eval.generate(args)
+        if args.dataset:
+            np.savez_compressed(args.dataset, bitboards=bitboards, results=results, games=games)
+    if not len(bitboards):
+        print("❌ No positions to train on")
+        return 1
+
+    inputs = encode(bitboards)
+    results = results.astype(np.float32)
+    validation = games % round(1 / tune_eval.VALIDATION_SHARE) == 0
+    train_inputs = np.concatenate((inputs[~validation], flip(inputs[~validation])))
+    train_results = np.concatenate((results[~validation], 1 - results[~validation]))
+    print(f"🧮 {len(train_inputs)} training (with flips) and {validation.sum()} validation positions")
+
+    # Baseline: Board.evaluate with its current weights and the best k for them
+    features = tune_eval.feature_matrix(bitboards)
+    weights = np.array(EVAL_WEIGHTS)
+    k = tune_eval.fit_k(features[~validation], results[~validation], weights)
+    classic = tune_eval.loss(features[validation], results[validation], weights, k)
+
+    net = ValueNet.random(args.hidden, args.seed)
+    best = {"loss": float("inf"), "epoch": 0, "layers": None}
+
+    def report(epoch):
+        # Keep the epoch that does best on the held-out games
+        error = mean_squared_error(net.forward(inputs[validation]), results[validation])
+        print(f"📉 Epoch {epoch}: validation loss {error:.5f} (Board.evaluate {classic:.5f})")
+        if error < best["loss"]:
+            layers = [(weights.copy(), biases.copy()) for weights, biases in net.layers]
+            best.update(loss=error, epoch=epoch, layers=layers)
+
+    net.train(train_inputs, train_results, args.epochs, args.batch_size, args.learning_rate, args.weight_decay,
+              args.seed, report)
+    net = ValueNet(best["layers"])
+    shape = "-".join(map(str, [INPUTS, *net.hidden, 1]))
+    # A network that does no better never replaces the one the game plays with
+    if best["loss"] >= classic and not args.force:
+        root, ext = os.path.splitext(args.output)
+        output = f"{root}.candidate{ext}"
+        net.save(output)
+        print(f"⚠️ Validation loss {best['loss']:.5f} is no better than Board.evaluate's {classic:.5f}; "
+              f"{args.output} left as it was, {shape} network written to {output} (--force to replace) "
+              f"in {time.perf_counter() - start:.1f}s")
+        return 0
+    net.save(args.output)
+    print(f"✅ {shape} network from epoch {best['epoch']} written to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
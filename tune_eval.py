@@ -0,0 +1,299 @@
+"""Evaluation weight tuner for AI Checkers Master.
+
+Fits the weights of Board.evaluate to self-play results, Texel style:
+the engine plays itself (random opening plies and the odd random move
+keep the games varied), every quiet position (no capture available) is
+labelled with the game's final result for red, and the weights are fitted
+so that sigmoid(k * evaluation) predicts those results.
+
+The features of all positions are computed at once as a NumPy matrix
+straight from their bitboards, so the loss and its gradient over the whole
+dataset are two matrix products per step. The material weight stays fixed
+as the unit of the scale, k is fitted to it first, and the other weights
+are fitted by gradient descent (Adam). A tenth of the games is held out to
+check the fit generalises.
+
+The result is written to eval_weights.json, which checkers.py loads at
+startup, but only if the new weights lower the validation loss and, with
+--match, score at least half of the games against the current ones.
+Otherwise they go to eval_weights.candidate.json for a look, and
+eval_weights.json stays as it was; --force replaces it anyway.
+
+Usage:
+    python tune_eval.py                                   # 1000 self-play games at depth 2
+    python tune_eval.py --games 5000 --workers 8 --dataset selfplay.npz --match 40
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import headless  # noqa: F401 - before checkers: the tool never opens a window
+import checkers
+from checkers import (EVAL_FEATURES, EVAL_WEIGHTS_FILE, RED, ROWS, WHITE, Board, EndgameTablebase, Game, SearchStats,
+                      get_endgame_tablebase, square_coords)
+from opening_book import apply_move, legal_moves
+
+VALIDATION_SHARE = 0.1  # Share of the games held out from the fit
+FIXED_FEATURE = "material"  # Its weight is the unit the others are measured in
+FEATURE_CHECK_POSITIONS = 200  # Positions whose NumPy features are checked against Board.eval_features
+FEATURE_CHUNK = 1 << 16  # Positions unpacked into square arrays at a time
+ADJUDICATION_MARGIN = 2  # Pieces ahead that win a game stopped at --max-plies (fewer is a draw)
+
+_game = None
+
+
+def _init_worker():
+    global _game
+    _game = Game(None)  # Used for its search
+
+
+def play_game(seed, depths, weights, random_plies, epsilon, max_plies):
+    """Play one game; depths and weights are (red, white). Returns (quiet positions, red's score)"""
+    rng = random.Random(seed)
+    tablebase = get_endgame_tablebase()
+    board, turn = Board(), RED
+    positions = []
+    for ply in range(max_plies):
+        moves = legal_moves(board, turn)
+        if not moves:
+            return positions, 0.0 if turn == RED else 1.0
+        probe = tablebase.probe(board, turn) if tablebase else None
+        if probe:
+            if probe[0] == EndgameTablebase.DRAW:
+                return positions, 0.5
+            return positions, 1.0 if (probe[0] == EndgameTablebase.WIN) == (turn == RED) else 0.0
+        if not any(skipped for _, _, skipped in moves):
+            positions.append(board.bitboards())
+
+        side = 0 if turn == RED else 1
+        if ply < random_plies or rng.random() < epsilon:
+            piece, move, skipped = rng.choice(moves)
+        else:
+            checkers.EVAL_WEIGHTS = weights[side]
+            _game.search_stats = SearchStats(depths[side])
+            _, best_move, _ = _game.search(board, depths[side], turn == RED)
+            piece, move, skipped = next(entry for entry in moves if (entry[0], entry[1]) == best_move)
+        board = apply_move(board, piece, move, skipped)
+        turn = WHITE if turn == RED else RED
+    # Too long: shallow searches often cannot convert a lead, so a clear one still wins
+    lead = board.red_left - board.white_left
+    if abs(lead) >= ADJUDICATION_MARGIN:
+        return positions, 1.0 if lead > 0 else 0.0
+    return positions, 0.5
+
+
+def self_play(seed, depth, random_plies, epsilon, max_plies):
+    """Worker entry point: one self-play game with the current weights"""
+    weights = (checkers.EVAL_WEIGHTS, checkers.EVAL_WEIGHTS)
+    return play_game(seed, (depth, depth), weights, random_plies, epsilon, max_plies)
+
+
+def match_game(job):
+    """Worker entry point: one game between two sets of weights; returns red's score"""
+    seed, depth, weights, random_plies, max_plies = job
+    return play_game(seed, (depth, depth), weights, random_plies, 0.0, max_plies)[1]
+
+
+def generate(args):
+    """Self-play bitboards (n, 4), results (n,) and game numbers (n,) as NumPy arrays"""
+    bitboards, results, games = [], [], []
+    start = time.perf_counter()
+    seeds = range(args.seed, args.seed + args.games)
+    play = partial(self_play, depth=args.depth, random_plies=args.random_plies, epsilon=args.epsilon,
+                   max_plies=args.max_plies)
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker) as pool:
+        played = pool.map(play, seeds)
+        for game, (positions, result) in enumerate(played):
+            bitboards.extend(positions)
+            results.extend([result] * len(positions))
+            games.extend([game] * len(positions))
+            if (game + 1) % 100 == 0:
+                print(f"🎲 {game + 1}/{args.games} games, {len(bitboards)} positions "
+                      f"({time.perf_counter() - start:.0f}s)")
+    return (np.array(bitboards, dtype=np.uint32).reshape(-1, 4), np.array(results, dtype=np.float64),
+            np.array(games, dtype=np.int64))
+
+
+def square_tables():
+    """Row and center value of each of the 32 dark squares"""
+    rows = np.array([square_coords(index)[0] for index in range(32)], dtype=np.float64)
+    cols = np.array([square_coords(index)[1] for index in range(32)], dtype=np.float64)
+    return rows, 7 - np.abs(cols - 3.5) - np.abs(rows - 3.5)
+
+
+def feature_matrix(bitboards):
+    """Board.eval_features of every position, as an (n, len(EVAL_FEATURES)) matrix"""
+    rows, center = square_tables()
+    features = np.empty((len(bitboards), len(EVAL_FEATURES)))
+    shifts = np.arange(32, dtype=np.uint32)
+    for start in range(0, len(bitboards), FEATURE_CHUNK):
+        chunk = bitboards[start:start + FEATURE_CHUNK]
+        # One 0/1 array of squares per piece kind: red men, red kings, white men, white kings
+        red_men, red_kings, white_men, white_kings = (
+            ((chunk[:, kind, None] >> shifts) & 1).astype(np.float64) for kind in range(4))
+        red, white = red_men + red_kings, white_men + white_kings
+        features[start:start + FEATURE_CHUNK] = np.column_stack((
+            red.sum(1) - white.sum(1),
+            red_kings.sum(1) - white_kings.sum(1),
+            red @ (ROWS - 1 - rows) - white @ rows,
+            (red - white) @ center,
+            red_men @ (rows == ROWS - 1) - white_men @ (rows == 0),
+        ))
+    return features
+
+
+def check_features(bitboards, features):
+    """Make sure the NumPy features match Board.eval_features"""
+    for bits, row in zip(bitboards[:FEATURE_CHECK_POSITIONS], features):
+        expected = Board.from_bitboards(tuple(int(bit) for bit in bits)).eval_features()
+        if not np.allclose(row, expected):
+            raise RuntimeError(f"feature mismatch for {tuple(bits)}: {row} != {expected}")
+
+
+def loss(features, results, weights, k):
+    """Mean squared error between sigmoid(k * evaluation) and the results"""
+    predicted = 1 / (1 + np.exp(-k * (features @ weights)))
+    return float(np.mean((predicted - results) ** 2))
+
+
+def loss_gradient(features, results, weights, k):
+    predicted = 1 / (1 + np.exp(-k * (features @ weights)))
+    return 2 * k * (features.T @ ((predicted - results) * predicted * (1 - predicted))) / len(results)
+
+
+def fit_k(features, results, weights):
+    """The k that best maps evaluations with the given weights to results"""
+    candidates = np.geomspace(0.01, 10, 200)
+    return float(min(candidates, key=lambda k: loss(features, results, weights, k)))
+
+
+def fit_weights(features, results, weights, k, iterations, learning_rate):
+    """Adam on every weight but FIXED_FEATURE's"""
+    weights = weights.copy()
+    trainable = np.array([name != FIXED_FEATURE for name in EVAL_FEATURES], dtype=np.float64)
+    first = np.zeros_like(weights)
+    second = np.zeros_like(weights)
+    beta1, beta2 = 0.9, 0.999
+    for step in range(1, iterations + 1):
+        gradient = loss_gradient(features, results, weights, k) * trainable
+        first = beta1 * first + (1 - beta1) * gradient
+        second = beta2 * second + (1 - beta2) * gradient ** 2
+        weights -= learning_rate * (first / (1 - beta1 ** step)) / (np.sqrt(second / (1 - beta2 ** step)) + 1e-12)
+    return weights
+
+
+def play_match(args, old_weights, new_weights):
+    """Score of new_weights against old_weights over args.match games, colors alternating"""
+    jobs = []
+    for game in range(args.match):
+        weights = (new_weights, old_weights) if game % 2 == 0 else (old_weights, new_weights)
+        # Both games of a pair share a seed, so each set of weights plays the same opening from both sides
+        seed = args.seed + args.games + game // 2
+        jobs.append((seed, args.match_depth, weights, args.random_plies, args.max_plies))
+    score = 0.0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker) as pool:
+        for game, red_score in enumerate(pool.map(match_game, jobs)):
+            score += red_score if game % 2 == 0 else 1 - red_score
+    return score
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights on self-play games")
+    parser.add_argument("--games", type=int, default=1000, help="self-play games to generate")
+    parser.add_argument("--depth", type=int, default=2, help="search depth of the self-play games")
+    parser.add_argument("--random-plies", type=int, default=6, help="random opening plies of each game")
+    parser.add_argument("--epsilon", type=float, default=0.05, help="chance of a random move after the opening")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies before a game is adjudicated, in self-play and match games")
+    parser.add_argument("--dataset", help="NumPy .npz file to reuse the self-play positions from (and save them to)")
+    parser.add_argument("--iterations", type=int, default=2000, help="gradient descent steps")
+    parser.add_argument("--learning-rate", type=float, default=0.01, help="Adam step size")
+    parser.add_argument("--output", default=EVAL_WEIGHTS_FILE, help="weights file to write")
+    parser.add_argument("--match", type=int, default=0, help="games of new against current weights to play")
+    parser.add_argument("--match-depth", type=int, default=4, help="search depth of the match games")
+    parser.add_argument("--force", action="store_true",
+                        help="replace the weights file even if the new weights do no better")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first self-play game")
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ The tuner needs NumPy: pip install numpy")
+        return 1
+
+    start = time.perf_counter()
+    if args.dataset and os.path.exists(args.dataset):
+        with np.load(args.dataset) as data:
+            bitboards, results, games = data["bitboards"], data["results"], data["games"]
+        print(f"📂 {len(bitboards)} positions loaded from {args.dataset}")
+    else:
+        bitboards, results, games = generate(args)
+        if args.dataset:
+            np.savez_compressed(args.dataset, bitboards=bitboards, results=results, games=games)
+    if not len(bitboards):
+        print("❌ No positions to tune on")
+        return 1
+
+    features = feature_matrix(bitboards)
+    check_features(bitboards, features)
+    # Whole games are held out, so no position is both trained and validated on
+    validation = games % round(1 / VALIDATION_SHARE) == 0
+    train = ~validation
+    print(f"🧮 {train.sum()} training and {validation.sum()} validation positions "
+          f"from {len(np.unique(games))} games ({time.perf_counter() - start:.1f}s)")
+
+    old_weights = np.array(checkers.EVAL_WEIGHTS)
+    k = fit_k(features[train], results[train], old_weights)
+    new_weights = fit_weights(features[train], results[train], old_weights, k, args.iterations, args.learning_rate)
+    before = {"train": loss(features[train], results[train], old_weights, k),
+              "validation": loss(features[validation], results[validation], old_weights, k)}
+    after = {"train": loss(features[train], results[train], new_weights, k),
+             "validation": loss(features[validation], results[validation], new_weights, k)}
+
+    print(f"📉 k = {k:.4f}; loss {before['train']:.5f} -> {after['train']:.5f} "
+          f"(validation {before['validation']:.5f} -> {after['validation']:.5f})")
+    for name, old, new in zip(EVAL_FEATURES, old_weights, new_weights):
+        print(f"   {name:<12} {old:9.4f} -> {new:9.4f}")
+
+    better = after["validation"] < before["validation"]
+    result = {
+        "weights": {name: round(float(weight), 6) for name, weight in zip(EVAL_FEATURES, new_weights)},
+        "k": k,
+        "positions": int(len(bitboards)),
+        "loss": {"before": before, "after": after},
+    }
+    if args.match:
+        score = play_match(args, tuple(old_weights), tuple(float(weight) for weight in new_weights))
+        print(f"⚔️ New weights scored {score:g}/{args.match} against the current ones at depth {args.match_depth}")
+        better = better and score >= args.match / 2
+        result["match"] = {"score": score, "games": args.match, "depth": args.match_depth}
+
+    # Weights that do no better never replace the ones the game plays with
+    output = args.output
+    if not better and not args.force:
+        root, ext = os.path.splitext(args.output)
+        output = f"{root}.candidate{ext}"
+    temp_path = f"{output}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(temp_path, output)
+    if output != args.output:
+        print(f"⚠️ New weights do no better; {args.output} left as it was, candidate written to {output} "
+              f"(--force to replace) in {time.perf_counter() - start:.1f}s")
+        return 0
+    print(f"✅ Weights written to {args.output} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Value network evaluator for AI Checkers Master.
+
+A small multilayer perceptron that maps a position to red's chances of
+winning. Its input layer has one 0/1 input per piece kind (red man, red
+king, white man, white king) and dark square, 128 in all, followed by one
+or two ReLU hidden layers and a single output: the logit of red winning,
+which the search uses in place of Board.evaluate. Everything runs in
+NumPy on the CPU. The search hands the network all children of a node at
+once (see Game.evaluate_children), so one matrix product per layer scores
+the whole batch.
+
+The search does not run the first layer from scratch either. An
+Accumulator keeps the first-layer sums of the positions along the current
+search line: a move adds the weight rows of the inputs it turns on (the
+piece on its new square, crowned or not) and subtracts those it turns off
+(its old square and the captured pieces), on make, and the previous sums
+come back on unmake. A leaf then only costs the small upper layers.
+
+train_value_net.py trains it; checkers.AI_EVALUATORS chooses the
+difficulties that use it.
+"""
+
+import os
+
+import numpy as np
+
+INPUTS = 4 * 32  # Piece kind x dark square, input kind * 32 + square
+SHIFTS = np.arange(32, dtype=np.uint32)
+FLIP_KINDS = [2, 3, 0, 1]  # Piece kinds with the colours swapped
+
+
+def encode(bitboards):
+    """(n, INPUTS) network inputs of an (n, 4) array of Board.bitboards masks"""
+    return ((bitboards[:, :, None] >> SHIFTS) & 1).reshape(len(bitboards), INPUTS).astype(np.float32)
+
+
+def flip(inputs):
+    """The same positions with the board turned round and the colours swapped"""
+    return inputs.reshape(-1, 4, 32)[:, FLIP_KINDS, ::-1].reshape(-1, INPUTS)
+
+
+class ValueNet:
+    """Multilayer perceptron from piece-square inputs to the logit of red winning"""
+    WIN_SCORE = 50.0  # Score of a position where one side has no pieces left
+
+    def __init__(self, layers):
+        self.layers = layers  # [(weights, biases), ...], ReLU between them
+
+    @classmethod
+    def random(cls, hidden, seed=0):
+        """An untrained network with He-initialised weights"""
+        rng = np.random.default_rng(seed)
+        sizes = [INPUTS, *hidden, 1]
+        return cls([(rng.normal(0, np.sqrt(2 / fan_in), (fan_in, fan_out)).astype(np.float32),
+                     np.zeros(fan_out, dtype=np.float32)) for fan_in, fan_out in zip(sizes, sizes[1:])])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            count = len(data.files) // 2
+            return cls([(data[f"w{i}"], data[f"b{i}"]) for i in range(count)])
+
+    def save(self, path):
+        """Write the weights; a crash mid-write leaves the previous file intact"""
+        temp_path = f"{path}.tmp.npz"
+        arrays = {}
+        for i, (weights, biases) in enumerate(self.layers):
+            arrays[f"w{i}"], arrays[f"b{i}"] = weights, biases
+        np.savez(temp_path, **arrays)
+        os.replace(temp_path, path)
+
+    @property
+    def hidden(self):
+        return [weights.shape[1] for weights, _ in self.layers[:-1]]
+
+    def forward(self, inputs):
+        """Logits of a batch of inputs"""
+        weights, biases = self.layers[0]
+        return self.upper(inputs @ weights + biases)
+
+    def upper(self, sums):
+        """Logits of a batch of first-layer sums (everything after the first weight matrix)"""
+        activations = np.maximum(sums, 0)
+        for weights, biases in self.layers[1:-1]:
+            activations = np.maximum(activations @ weights + biases, 0)
+        weights, biases = self.layers[-1]
+        return (activations @ weights + biases)[:, 0]
+
+    def accumulator(self):
+        return Accumulator(self)
+
+    def evaluate(self, bitboards):
+        """Red's scores of a list of Board.bitboards tuples, in the same order"""
+        bitboards = np.array(bitboards, dtype=np.uint32).reshape(-1, 4)
+        scores = self.forward(encode(bitboards)).astype(np.float64)
+        scores[(bitboards[:, 0] | bitboards[:, 1]) == 0] = -self.WIN_SCORE
+        scores[(bitboards[:, 2] | bitboards[:, 3]) == 0] = self.WIN_SCORE
+        return scores.tolist()
+
+    def train(self, inputs, results, epochs, batch_size, learning_rate, weight_decay, seed=0, report=None):
+        """Minimise the cross-entropy between sigmoid(logit) and the results with Adam"""
+        rng = np.random.default_rng(seed)
+        params = [array for layer in self.layers for array in layer]
+        first = [np.zeros_like(param) for param in params]
+        second = [np.zeros_like(param) for param in params]
+        beta1, beta2 = 0.9, 0.999
+        step = 0
+        for epoch in range(1, epochs + 1):
+            order = rng.permutation(len(inputs))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                gradients = self.gradients(inputs[batch], results[batch])
+                step += 1
+                for i, (param, gradient) in enumerate(zip(params, gradients)):
+                    if param.ndim == 2:
+                        gradient = gradient + weight_decay * param
+                    first[i] = beta1 * first[i] + (1 - beta1) * gradient
+                    second[i] = beta2 * second[i] + (1 - beta2) * gradient ** 2
+                    param -= (learning_rate * (first[i] / (1 - beta1 ** step)) /
+                              (np.sqrt(second[i] / (1 - beta2 ** step)) + 1e-8))
+            if report:
+                report(epoch)
+
+    def gradients(self, inputs, results):
+        """Cross-entropy gradients of every weight and bias, in self.layers order"""
+        activations = [inputs]
+        for weights, biases in self.layers[:-1]:
+            activations.append(np.maximum(activations[-1] @ weights + biases, 0))
+        weights, biases = self.layers[-1]
+        logits = (activations[-1] @ weights + biases)[:, 0]
+        delta = ((1 / (1 + np.exp(-logits)) - results) / len(results))[:, None].astype(np.float32)
+
+        gradients = []
+        for (weights, _), layer_inputs in zip(reversed(self.layers), reversed(activations)):
+            gradients.append(delta.sum(0))
+            gradients.append(layer_inputs.T @ delta)
+            delta = (delta @ weights.T) * (layer_inputs > 0)
+        return gradients[::-1]  # Back to (w0, b0, w1, b1, ...)
+
+
+class Accumulator:
+    """First-layer sums of a ValueNet for each position on the search line, the current one on top
+
+    A move is given as (input turned on, inputs turned off), see
+    checkers.move_changes.
+    """
+
+    def __init__(self, net):
+        self.net = net
+        self.weights, self.biases = net.layers[0]
+        self.stack = []
+
+    def refresh(self, bitboards):
+        """Start a new search line at a position, summing its inputs from scratch"""
+        inputs = encode(np.array([bitboards], dtype=np.uint32))[0]
+        self.stack = [self.biases + inputs @ self.weights]
+
+    def push(self, added, removed):
+        """Make a move"""
+        weights = self.weights
+        sums = self.stack[-1] + weights[added]
+        for index in removed:
+            sums -= weights[index]
+        self.stack.append(sums)
+
+    def pop(self):
+        """Unmake the last move"""
+        self.stack.pop()
+
+    def evaluate(self):
+        """Red's score of the current position"""
+        return float(self.net.upper(self.stack[-1][None])[0])
+
+    def evaluate_children(self, moves):
+        """Red's scores of the positions after each (added, removed) move, in one batch"""
+        weights = self.weights
+        # Every move turns off its piece's old square; only captures turn off more
+        sums = self.stack[-1] + weights[[added for added, _ in moves]] - weights[[removed[0] for _, removed in moves]]
+        for child, (_, removed) in enumerate(moves):
+            for index in removed[1:]:
+                sums[child] -= weights[index]
+        return self.net.upper(sums).tolist()